@@ -159,12 +159,16 @@ class MessagesResponse {
   final int total;
   final int pages;
   final int currentPage;
+  final String? nextCursor; // 游标分页时的下一页游标
+  final bool hasMore;
 
   MessagesResponse({
     required this.messages,
     required this.total,
     required this.pages,
     required this.currentPage,
+    this.nextCursor,
+    this.hasMore = false,
   });
 
   factory MessagesResponse.fromJson(Map<String, dynamic> json) {
@@ -175,6 +179,8 @@ class MessagesResponse {
       total: json['total'] ?? 0,
       pages: json['pages'] ?? 0,
       currentPage: json['current_page'] ?? 1,
+      nextCursor: json['next_cursor'],
+      hasMore: json['has_more'] ?? false,
     );
   }
 }
@@ -21,8 +21,8 @@ class _MessagesScreenState extends State<MessagesScreen> {
   List<ChatMessage> _messages = [];
   MessageStats? _stats;
   bool _isLoading = false;
-  int _currentPage = 1;
-  int _totalPages = 1;
+  String? _nextCursor;
+  bool _hasMore = false;
   String? _selectedDate;
   String? _keyword;
 
@@ -45,7 +45,7 @@ class _MessagesScreenState extends State<MessagesScreen> {
   void _onScroll() {
     if (_scrollController.position.pixels >=
         _scrollController.position.maxScrollExtent - 200) {
-      if (!_isLoading && _currentPage < _totalPages) {
+      if (!_isLoading && _hasMore) {
         _loadMoreMessages();
       }
     }
@@ -56,14 +56,14 @@ class _MessagesScreenState extends State<MessagesScreen> {
     try {
       final response = await _provider.api.getMessages(
         widget.chat.id,
-        page: 1,
+        cursor: '',
         keyword: _keyword,
         date: _selectedDate,
       );
       setState(() {
         _messages = response.messages;
-        _currentPage = response.currentPage;
-        _totalPages = response.pages;
+        _nextCursor = response.nextCursor;
+        _hasMore = response.hasMore;
       });
     } catch (e) {
       if (mounted) {
@@ -77,19 +77,19 @@ class _MessagesScreenState extends State<MessagesScreen> {
   }
 
   Future<void> _loadMoreMessages() async {
-    if (_isLoading) return;
+    if (_isLoading || _nextCursor == null) return;
     setState(() => _isLoading = true);
     try {
       final response = await _provider.api.getMessages(
         widget.chat.id,
-        page: _currentPage + 1,
+        cursor: _nextCursor,
         keyword: _keyword,
         date: _selectedDate,
       );
       setState(() {
         _messages.addAll(response.messages);
-        _currentPage = response.currentPage;
-        _totalPages = response.pages;
+        _nextCursor = response.nextCursor;
+        _hasMore = response.hasMore;
       });
     } catch (e) {
       // Ignore
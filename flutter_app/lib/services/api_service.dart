@@ -18,6 +18,42 @@ class ApiService {
 
   String get baseUrl => _baseUrl;
 
+  // ==================== 后台任务 API ====================
+
+  /// 提交后台任务并轮询到结束，返回 {success, ...任务结果} 或 {success: false, error}
+  Future<Map<String, dynamic>> _runJob(String path, {Object? data}) async {
+    final response = await _dio.post('$_baseUrl$path', data: data);
+    final submitted = Map<String, dynamic>.from(response.data);
+    final jobId = submitted['job_id'];
+    if (submitted['success'] == false || jobId == null) {
+      return submitted;
+    }
+
+    while (true) {
+      await Future.delayed(const Duration(seconds: 1));
+      final job = (await _dio.get('$_baseUrl/api/jobs/$jobId')).data;
+      switch (job['status']) {
+        case 'success':
+          return {
+            'success': true,
+            'job_id': jobId,
+            ...?(job['result'] as Map<String, dynamic>?),
+          };
+        case 'failed':
+        case 'cancelled':
+          return {
+            'success': false,
+            'job_id': jobId,
+            'error': job['error'] ?? '任务已取消',
+          };
+      }
+    }
+  }
+
+  Future<void> cancelJob(int jobId) async {
+    await _dio.post('$_baseUrl/api/jobs/$jobId/cancel');
+  }
+
   // ==================== 统计 API ====================
 
   Future<Stats> getStats() async {
@@ -82,17 +118,23 @@ class ApiService {
 
   // ==================== 消息 API ====================
 
+  // 传入 cursor 时使用游标分页（第一页传空字符串）
   Future<MessagesResponse> getMessages(
     int chatId, {
     int page = 1,
     int perPage = 50,
+    String? cursor,
     String? keyword,
     String? date,
   }) async {
     final params = <String, dynamic>{
-      'page': page,
       'per_page': perPage,
     };
+    if (cursor != null) {
+      params['cursor'] = cursor;
+    } else {
+      params['page'] = page;
+    }
     if (keyword != null && keyword.isNotEmpty) {
       params['keyword'] = keyword;
     }
@@ -112,8 +154,7 @@ class ApiService {
   }
 
   Future<Map<String, dynamic>> fetchMessages() async {
-    final response = await _dio.post('$_baseUrl/api/fetch-messages');
-    return response.data;
+    return _runJob('/api/fetch-messages');
   }
 
   // ==================== AI总结 API ====================
@@ -162,8 +203,11 @@ class ApiService {
     } else {
       data['days'] = 7; // 默认7天
     }
-    final response = await _dio.post('$_baseUrl/api/generate-summary', data: data);
-    return response.data['summary'] ?? '';
+    final result = await _runJob('/api/generate-summary', data: data);
+    if (result['success'] == false) {
+      throw Exception(result['error'] ?? '生成总结失败');
+    }
+    return result['summary'] ?? '';
   }
 
   Future<void> deleteSummary(int summaryId) async {
@@ -196,12 +240,11 @@ class ApiService {
 
   Future<Map<String, dynamic>> analyzeTasks(int chatId,
       {int days = 7, bool force = false}) async {
-    final response = await _dio.post('$_baseUrl/api/analyze-tasks', data: {
+    return _runJob('/api/analyze-tasks', data: {
       'chat_id': chatId,
       'days': days,
       'force': force,
     });
-    return response.data;
   }
 
   // ==================== 日程 API ====================
@@ -250,7 +293,10 @@ class ApiService {
   }
 
   Future<void> runAutoJob(int jobId) async {
-    await _dio.post('$_baseUrl/api/auto-jobs/$jobId/run');
+    final result = await _runJob('/api/auto-jobs/$jobId/run');
+    if (result['success'] == false) {
+      throw Exception(result['error'] ?? '执行任务失败');
+    }
   }
 
   // ==================== 设置 API ====================
@@ -26,6 +26,7 @@ __version__ = "1.0.0"
 __author__ = "NapCat-QCE Contributors"
 
 from .client import NapCatQCE
+from .async_client import AsyncNapCatQCE
 from .auto_token import (
     AutoTokenClient,
     connect,
@@ -40,6 +41,9 @@ from .launcher import (
     find_napcat_qce_path,
     find_qq_path,
 )
+from .transport import TransportConfig
+from .cache import CacheConfig, ResponseCache
+from .metrics import MetricsRegistry, get_registry
 from .config import (
     ExportConfig,
     ConfigManager,
@@ -87,6 +91,7 @@ from .exceptions import (
 __all__ = [
     # 主客户端
     "NapCatQCE",
+    "AsyncNapCatQCE",
     "AutoTokenClient",
     "connect",
     "auto_discover_token",
@@ -100,6 +105,13 @@ __all__ = [
     "find_napcat_qce_path",
     "find_qq_path",
 
+    # 传输、缓存配置与指标
+    "TransportConfig",
+    "CacheConfig",
+    "ResponseCache",
+    "MetricsRegistry",
+    "get_registry",
+
     # 配置管理
     "ExportConfig",
     "ConfigManager",
@@ -0,0 +1,850 @@
+"""
+NapCat-QCE 异步客户端
+====================
+
+基于 aiohttp 的异步客户端，接口与 NapCatQCE 保持一致，
+适合在一个事件循环中同时驱动大量请求（如批量导出数百个聊天）。
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional, Dict, Any, List, Callable, AsyncGenerator, Awaitable, Sequence, Union
+from urllib.parse import urljoin
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+from .types import (
+    ChatType,
+    TaskStatus,
+    Group,
+    GroupMember,
+    Friend,
+    UserInfo,
+    Message,
+    ExportTask,
+    ScheduledExport,
+    StickerPack,
+    ExportFile,
+    SystemInfo,
+    MessageFilter,
+    ExportOptions,
+    ScheduledExportConfig,
+)
+from .exceptions import NetworkError
+from .client import MessagesAPI, _parse_response, _create_cache, _raise_for_task, _UIN_INDEX_KEY
+from .transport import TransportConfig
+from .cache import CacheConfig
+from .metrics import MetricsRegistry, RequestMetrics
+from .websocket import DEFAULT_MIN_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL
+
+
+async def _aiter_pages(
+    fetch_page: Callable[[int], Awaitable[tuple]],
+    prefetch: int = 1,
+) -> AsyncGenerator[Any, None]:
+    """按页码依次获取分页数据，后台任务预取后续页面，参数同 client._iter_pages"""
+    if prefetch <= 0:
+        page = 1
+        while True:
+            items, has_next = await fetch_page(page)
+            yield items
+            if not has_next:
+                return
+            page += 1
+
+    pages: "asyncio.Queue[tuple]" = asyncio.Queue(maxsize=prefetch)
+
+    async def producer():
+        page = 1
+        while True:
+            try:
+                items, has_next = await fetch_page(page)
+                entry = (items, has_next, None)
+            except Exception as e:
+                entry = (None, False, e)
+
+            # 队列满时等待消费者
+            await pages.put(entry)
+            if not entry[1]:
+                return
+            page += 1
+
+    task = asyncio.ensure_future(producer())
+
+    try:
+        while True:
+            items, has_next, error = await pages.get()
+            if error is not None:
+                raise error
+            yield items
+            if not has_next:
+                return
+    finally:
+        task.cancel()
+
+
+class AsyncBaseAPI:
+    """异步 API 基类"""
+
+    def __init__(self, client: "AsyncNapCatQCE"):
+        self._client = client
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        return await self._client._request(method, endpoint, params, json_data, **kwargs)
+
+    async def _cached(
+        self,
+        resource: str,
+        key: tuple,
+        loader: Callable[[], Awaitable[Any]],
+        refresh: bool = False,
+    ) -> Any:
+        """通过客户端缓存读取数据，参数同 BaseAPI._cached"""
+        cache = self._client.cache
+        if cache is None:
+            return await loader()
+
+        if not refresh:
+            value = cache.get(resource, key)
+            if value is not None:
+                return value
+
+        value = await loader()
+        cache.set(resource, key, value)
+        return value
+
+
+class AsyncGroupsAPI(AsyncBaseAPI):
+    """群组 API（异步）"""
+
+    async def get_all(
+        self,
+        page: int = 1,
+        limit: int = 999,
+        force_refresh: bool = False,
+    ) -> List[Group]:
+        """获取所有群组，参数同 GroupsAPI.get_all"""
+        async def load():
+            data = await self._request(
+                "GET",
+                "/api/groups",
+                params={
+                    "page": page,
+                    "limit": limit,
+                    "forceRefresh": str(force_refresh).lower(),
+                },
+            )
+            groups_data = data.get("groups", [])
+            return [Group.from_dict(g) for g in groups_data]
+
+        return list(await self._cached("groups", (page, limit), load, refresh=force_refresh))
+
+    async def get(self, group_code: str, force_refresh: bool = False) -> Dict[str, Any]:
+        """获取群组详情，参数同 GroupsAPI.get"""
+        return await self._request(
+            "GET",
+            f"/api/groups/{group_code}",
+            params={"forceRefresh": str(force_refresh).lower()},
+        )
+
+    async def get_members(
+        self,
+        group_code: str,
+        force_refresh: bool = False,
+    ) -> List[GroupMember]:
+        """获取群成员列表，参数同 GroupsAPI.get_members"""
+        async def load():
+            data = await self._request(
+                "GET",
+                f"/api/groups/{group_code}/members",
+                params={"forceRefresh": str(force_refresh).lower()},
+            )
+            if isinstance(data, list):
+                return [GroupMember.from_dict(m) for m in data]
+            return []
+
+        return list(
+            await self._cached("members", (str(group_code),), load, refresh=force_refresh)
+        )
+
+
+class AsyncFriendsAPI(AsyncBaseAPI):
+    """好友 API（异步）"""
+
+    async def get_all(
+        self,
+        page: int = 1,
+        limit: int = 999,
+        force_refresh: bool = False,
+    ) -> List[Friend]:
+        """获取所有好友，参数同 FriendsAPI.get_all"""
+        async def load():
+            data = await self._request(
+                "GET",
+                "/api/friends",
+                params={"page": page, "limit": limit},
+            )
+            friends_data = data.get("friends", [])
+            friends = [Friend.from_dict(f) for f in friends_data]
+            if self._client.cache is not None:
+                # 好友列表重新加载后，QQ 号索引在下次查找时按新列表重建
+                self._client.cache.invalidate("friends", _UIN_INDEX_KEY)
+            return friends
+
+        return list(await self._cached("friends", (page, limit), load, refresh=force_refresh))
+
+    async def get_uid(self, uin: str, force_refresh: bool = False) -> Optional[str]:
+        """根据 QQ 号查找好友 UID，参数同 FriendsAPI.get_uid"""
+        async def build_index():
+            friends = await self.get_all(force_refresh=force_refresh)
+            return {f.uin: f.uid for f in friends}
+
+        index = await self._cached("friends", _UIN_INDEX_KEY, build_index, refresh=force_refresh)
+        return index.get(str(uin))
+
+    async def get(self, uid: str, no_cache: bool = False) -> Dict[str, Any]:
+        """获取好友详情，参数同 FriendsAPI.get"""
+        return await self._request(
+            "GET",
+            f"/api/friends/{uid}",
+            params={"no_cache": str(no_cache).lower()},
+        )
+
+
+class AsyncUsersAPI(AsyncBaseAPI):
+    """用户 API（异步）"""
+
+    async def get(self, uid: str, no_cache: bool = False) -> UserInfo:
+        """获取用户信息，参数同 UsersAPI.get"""
+        async def load():
+            data = await self._request(
+                "GET",
+                f"/api/users/{uid}",
+                params={"no_cache": str(no_cache).lower()},
+            )
+            return UserInfo.from_dict(data)
+
+        return await self._cached("users", (uid,), load, refresh=no_cache)
+
+
+class AsyncMessagesAPI(AsyncBaseAPI):
+    """消息 API（异步）"""
+
+    _normalize_chat_type = MessagesAPI._normalize_chat_type
+    _normalize_format = MessagesAPI._normalize_format
+
+    async def fetch(
+        self,
+        chat_type,  # int 或 ChatType
+        peer_uid: str,
+        filter: Optional[MessageFilter] = None,
+        batch_size: int = 5000,
+        page: int = 1,
+        limit: int = 50,
+    ) -> Dict[str, Any]:
+        """批量获取消息，参数和返回值同 MessagesAPI.fetch"""
+        data = await self._fetch_page(chat_type, peer_uid, filter, batch_size, page, limit)
+
+        messages = [Message.from_dict(m) for m in data.get("messages", [])]
+
+        return {
+            "messages": messages,
+            "total_count": data.get("totalCount", 0),
+            "current_page": data.get("currentPage", 1),
+            "total_pages": data.get("totalPages", 1),
+            "has_next": data.get("hasNext", False),
+            "cache_hit": data.get("cacheHit", False),
+        }
+
+    async def _fetch_page(
+        self,
+        chat_type,
+        peer_uid: str,
+        filter: Optional[MessageFilter],
+        batch_size: int,
+        page: int,
+        limit: int,
+    ) -> Dict[str, Any]:
+        """请求一页消息，返回未解析的响应数据"""
+        peer = {"chatType": self._normalize_chat_type(chat_type), "peerUid": peer_uid}
+        body = {
+            "peer": peer,
+            "batchSize": batch_size,
+            "page": page,
+            "limit": limit,
+        }
+        if filter:
+            body["filter"] = filter.to_dict()
+
+        return await self._request("POST", "/api/messages/fetch", json_data=body)
+
+    async def fetch_all(
+        self,
+        chat_type,  # int 或 ChatType
+        peer_uid: str,
+        filter: Optional[MessageFilter] = None,
+        batch_size: int = 5000,
+        page_size: int = 100,
+        prefetch: int = 1,
+    ) -> AsyncGenerator[List[Message], None]:
+        """
+        获取所有消息（异步生成器），参数同 MessagesAPI.fetch_all
+
+        Example:
+            >>> async for messages in client.messages.fetch_all(2, "123456789"):
+            ...     print(len(messages))
+        """
+        async def fetch_page(page: int):
+            data = await self._fetch_page(chat_type, peer_uid, filter, batch_size, page, page_size)
+            messages = [Message.from_dict(m) for m in data.get("messages", [])]
+            return messages, data.get("hasNext", False)
+
+        async for messages in _aiter_pages(fetch_page, prefetch):
+            if messages:
+                yield messages
+
+    async def iter_messages(
+        self,
+        chat_type,  # int 或 ChatType
+        peer_uid: str,
+        filter: Optional[MessageFilter] = None,
+        batch_size: int = 5000,
+        page_size: int = 100,
+        prefetch: int = 1,
+        keep_raw: bool = True,
+        raw_fields: Optional[Sequence[str]] = None,
+    ) -> AsyncGenerator[Message, None]:
+        """逐条获取所有消息（异步生成器），参数同 MessagesAPI.iter_messages"""
+        async def fetch_page(page: int):
+            data = await self._fetch_page(chat_type, peer_uid, filter, batch_size, page, page_size)
+            return data.get("messages", []), data.get("hasNext", False)
+
+        async for raw_messages in _aiter_pages(fetch_page, prefetch):
+            for i, raw in enumerate(raw_messages):
+                raw_messages[i] = None
+                yield Message.from_dict(raw, keep_raw=keep_raw, raw_fields=raw_fields)
+
+    async def export(
+        self,
+        chat_type,  # int 或 ChatType
+        peer_uid: str,
+        format = "JSON",  # str 或 ExportFormat
+        filter: Optional[MessageFilter] = None,
+        options: Optional[ExportOptions] = None,
+        session_name: Optional[str] = None,
+    ) -> ExportTask:
+        """创建导出任务，参数同 MessagesAPI.export"""
+        peer = {"chatType": self._normalize_chat_type(chat_type), "peerUid": peer_uid}
+        body: Dict[str, Any] = {
+            "peer": peer,
+            "format": self._normalize_format(format),
+        }
+        if filter:
+            body["filter"] = filter.to_dict()
+        if options:
+            body["options"] = options.to_dict()
+        if session_name:
+            body["sessionName"] = session_name
+
+        data = await self._request("POST", "/api/messages/export", json_data=body)
+        return ExportTask.from_dict(data)
+
+    async def quick_export(
+        self,
+        chat_type,  # int 或 ChatType
+        peer_uid: str,
+        format = "HTML",  # str 或 ExportFormat
+        days: Optional[int] = None,
+        filter: Optional[MessageFilter] = None,
+        options: Optional[ExportOptions] = None,
+        session_name: Optional[str] = None,
+        timeout: float = 600,
+        on_progress: Optional[Callable[[ExportTask], None]] = None,
+    ) -> ExportTask:
+        """快速导出（创建任务并等待完成），参数同 MessagesAPI.quick_export"""
+        if days is not None and filter is None:
+            filter = MessageFilter.last_days(days)
+
+        task = await self.export(
+            chat_type=chat_type,
+            peer_uid=peer_uid,
+            format=format,
+            filter=filter,
+            options=options,
+            session_name=session_name,
+        )
+
+        return await self._client.tasks.wait_for_completion(
+            task.id,
+            timeout=timeout,
+            on_progress=on_progress,
+        )
+
+
+class AsyncTasksAPI(AsyncBaseAPI):
+    """任务 API（异步）"""
+
+    async def get_all(self) -> List[ExportTask]:
+        """获取所有导出任务"""
+        data = await self._request("GET", "/api/tasks")
+        tasks_data = data.get("tasks", [])
+        return [ExportTask.from_dict(t) for t in tasks_data]
+
+    async def get(self, task_id: str) -> ExportTask:
+        """获取指定任务"""
+        data = await self._request("GET", f"/api/tasks/{task_id}")
+        return ExportTask.from_dict(data)
+
+    async def delete(self, task_id: str) -> bool:
+        """删除任务"""
+        await self._request("DELETE", f"/api/tasks/{task_id}")
+        return True
+
+    async def delete_original_files(self, task_id: str) -> bool:
+        """删除 ZIP 导出任务的原始文件"""
+        await self._request("DELETE", f"/api/tasks/{task_id}/original-files")
+        return True
+
+    async def wait_for_completion(
+        self,
+        task_id: str,
+        timeout: float = 300,
+        poll_interval: Optional[float] = None,
+        on_progress: Optional[Callable[[ExportTask], None]] = None,
+    ) -> ExportTask:
+        """
+        等待任务完成，参数同 TasksAPI.wait_for_completion
+
+        与同步客户端的回退轮询相同：间隔从 DEFAULT_MIN_POLL_INTERVAL 开始指数增长，
+        上限为 poll_interval（默认 DEFAULT_MAX_POLL_INTERVAL），任务状态变化时重置。
+
+        Raises:
+            TimeoutError: 超时
+            APIError: 任务失败
+        """
+        max_interval = poll_interval or DEFAULT_MAX_POLL_INTERVAL
+        interval = min(DEFAULT_MIN_POLL_INTERVAL, max_interval)
+        deadline = time.monotonic() + timeout
+        last = None
+        while True:
+            task = await self.get(task_id)
+
+            if last is None or (task.status, task.progress) != (last.status, last.progress):
+                interval = min(DEFAULT_MIN_POLL_INTERVAL, max_interval)
+                if on_progress:
+                    on_progress(task)
+            last = task
+
+            if task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED):
+                _raise_for_task(task)
+                return task
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"等待任务完成超时: {task_id}")
+
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
+
+
+class AsyncScheduledExportsAPI(AsyncBaseAPI):
+    """定时导出 API（异步）"""
+
+    async def create(self, config: ScheduledExportConfig) -> ScheduledExport:
+        """创建定时导出任务"""
+        data = await self._request("POST", "/api/scheduled-exports", json_data=config.to_dict())
+        return ScheduledExport.from_dict(data)
+
+    async def get_all(self) -> List[ScheduledExport]:
+        """获取所有定时导出任务"""
+        data = await self._request("GET", "/api/scheduled-exports")
+        exports_data = data.get("scheduledExports", [])
+        return [ScheduledExport.from_dict(e) for e in exports_data]
+
+    async def get(self, export_id: str) -> ScheduledExport:
+        """获取指定定时导出任务"""
+        data = await self._request("GET", f"/api/scheduled-exports/{export_id}")
+        return ScheduledExport.from_dict(data)
+
+    async def update(self, export_id: str, updates: Dict[str, Any]) -> ScheduledExport:
+        """更新定时导出任务"""
+        data = await self._request(
+            "PUT", f"/api/scheduled-exports/{export_id}", json_data=updates
+        )
+        return ScheduledExport.from_dict(data)
+
+    async def delete(self, export_id: str) -> bool:
+        """删除定时导出任务"""
+        await self._request("DELETE", f"/api/scheduled-exports/{export_id}")
+        return True
+
+    async def trigger(self, export_id: str) -> Dict[str, Any]:
+        """手动触发定时导出任务"""
+        return await self._request("POST", f"/api/scheduled-exports/{export_id}/trigger")
+
+    async def get_history(self, export_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """获取执行历史"""
+        data = await self._request(
+            "GET",
+            f"/api/scheduled-exports/{export_id}/history",
+            params={"limit": limit},
+        )
+        return data.get("history", [])
+
+    async def enable(self, export_id: str) -> ScheduledExport:
+        """启用定时导出任务"""
+        return await self.update(export_id, {"enabled": True})
+
+    async def disable(self, export_id: str) -> ScheduledExport:
+        """禁用定时导出任务"""
+        return await self.update(export_id, {"enabled": False})
+
+
+class AsyncStickerPacksAPI(AsyncBaseAPI):
+    """表情包 API（异步）"""
+
+    async def get_all(self, types: Optional[List[str]] = None) -> List[StickerPack]:
+        """获取所有表情包"""
+        params = {}
+        if types:
+            params["types"] = ",".join(types)
+
+        data = await self._request(
+            "GET", "/api/sticker-packs", params=params if params else None
+        )
+        packs_data = data.get("packs", [])
+        return [StickerPack.from_dict(p) for p in packs_data]
+
+    async def export(self, pack_id: str) -> Dict[str, Any]:
+        """导出指定表情包"""
+        return await self._request(
+            "POST", "/api/sticker-packs/export", json_data={"packId": pack_id}
+        )
+
+    async def export_all(self) -> Dict[str, Any]:
+        """导出所有表情包"""
+        return await self._request("POST", "/api/sticker-packs/export-all")
+
+    async def get_export_records(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """获取导出记录"""
+        data = await self._request(
+            "GET", "/api/sticker-packs/export-records", params={"limit": limit}
+        )
+        return data.get("records", [])
+
+
+class AsyncExportFilesAPI(AsyncBaseAPI):
+    """导出文件 API（异步）"""
+
+    async def get_all(self) -> List[ExportFile]:
+        """获取所有导出文件"""
+        data = await self._request("GET", "/api/exports/files")
+        files_data = data.get("files", [])
+        return [ExportFile.from_dict(f) for f in files_data]
+
+    async def get_info(self, file_name: str) -> ExportFile:
+        """获取文件详细信息"""
+        data = await self._request("GET", f"/api/exports/files/{file_name}/info")
+        return ExportFile.from_dict(data)
+
+    async def delete(self, file_name: str) -> bool:
+        """删除导出文件"""
+        await self._request("DELETE", f"/api/exports/files/{file_name}")
+        return True
+
+    def get_preview_url(self, file_name: str) -> str:
+        """获取文件预览 URL"""
+        return f"{self._client.base_url}/api/exports/files/{file_name}/preview"
+
+    def get_download_url(self, file_name: str, is_scheduled: bool = False) -> str:
+        """获取文件下载 URL"""
+        prefix = "scheduled-downloads" if is_scheduled else "downloads"
+        return f"{self._client.base_url}/{prefix}/{file_name}"
+
+
+class AsyncSystemAPI(AsyncBaseAPI):
+    """系统 API（异步）"""
+
+    async def get_info(self) -> SystemInfo:
+        """获取系统信息"""
+        data = await self._request("GET", "/api/system/info")
+        return SystemInfo.from_dict(data)
+
+    async def get_status(self) -> Dict[str, Any]:
+        """获取系统状态"""
+        return await self._request("GET", "/api/system/status")
+
+    async def health_check(self) -> Dict[str, Any]:
+        """健康检查"""
+        return await self._client._request("GET", "/health")
+
+    async def get_security_status(self) -> Dict[str, Any]:
+        """获取安全状态"""
+        return await self._client._request("GET", "/security-status")
+
+
+class AsyncNapCatQCE:
+    """
+    NapCat-QCE Python SDK 异步客户端
+
+    接口与 NapCatQCE 相同，所有请求方法均为协程。
+
+    Example:
+        >>> async with AsyncNapCatQCE(token="your_token") as client:
+        ...     groups = await client.groups.get_all()
+        ...     tasks = [client.export_group(g.group_code, days=1) for g in groups]
+        ...     results = await asyncio.gather(*tasks, return_exceptions=True)
+    """
+
+    DEFAULT_HOST = "localhost"
+    DEFAULT_PORT = 40653
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        timeout: float = 30.0,
+        verify_ssl: bool = True,
+        transport: Optional[TransportConfig] = None,
+        cache: Union[bool, CacheConfig, None] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        """
+        初始化客户端
+
+        Args:
+            token: 访问令牌
+            host: 服务器地址
+            port: 服务器端口
+            timeout: 请求超时时间（秒），未指定 transport 时作为读取超时
+            verify_ssl: 是否验证 SSL 证书
+            transport: 传输配置（连接池、超时、重试），与同步客户端相同
+            cache: 启用客户端缓存，与同步客户端相同
+            metrics: 记录请求耗时的指标注册表，默认使用全局注册表
+        """
+        if not HAS_AIOHTTP:
+            raise ImportError(
+                "aiohttp 库未安装。请运行: pip install aiohttp"
+            )
+
+        self.host = host
+        self.port = port
+        self.token = token
+        self.timeout = timeout
+        self.verify_ssl = verify_ssl
+        self.transport = transport or TransportConfig(read_timeout=timeout)
+        self.cache = _create_cache(cache)
+        self.metrics = RequestMetrics(metrics)
+
+        self.base_url = f"http://{host}:{port}"
+
+        # session 需要在事件循环中创建，首次请求时初始化
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+        # 初始化各 API 模块
+        self.groups = AsyncGroupsAPI(self)
+        self.friends = AsyncFriendsAPI(self)
+        self.users = AsyncUsersAPI(self)
+        self.messages = AsyncMessagesAPI(self)
+        self.tasks = AsyncTasksAPI(self)
+        self.scheduled_exports = AsyncScheduledExportsAPI(self)
+        self.sticker_packs = AsyncStickerPacksAPI(self)
+        self.export_files = AsyncExportFilesAPI(self)
+        self.system = AsyncSystemAPI(self)
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """获取（必要时创建）共享的 aiohttp session"""
+        if self._session is None or self._session.closed:
+            headers = {}
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+
+            # 与同步客户端一致：每个主机最多 max_connections_per_host 个连接，最多 pool_size 个主机
+            connector = aiohttp.TCPConnector(
+                limit=self.transport.total_connections,
+                limit_per_host=self.transport.max_connections_per_host,
+                ssl=None if self.verify_ssl else False,
+            )
+            self._session = aiohttp.ClientSession(
+                headers=headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.transport.connect_timeout,
+                    sock_read=self.transport.read_timeout,
+                ),
+            )
+        return self._session
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """
+        发送 HTTP 请求，重试策略和错误映射与 NapCatQCE._request 相同
+
+        Raises:
+            AuthenticationError: 认证失败
+            ValidationError: 参数验证失败
+            APIError: API 调用失败
+            NetworkError: 网络错误
+        """
+        url = urljoin(self.base_url, endpoint)
+        session = self._get_session()
+        transport = self.transport
+        attempt = 0
+        start = time.perf_counter()
+        status = "error"
+
+        try:
+            while True:
+                try:
+                    async with session.request(
+                        method,
+                        url,
+                        params=params,
+                        json=json_data,
+                        **kwargs,
+                    ) as response:
+                        status_code = response.status
+                        retry_after = response.headers.get("Retry-After")
+                        try:
+                            data = await response.json(content_type=None)
+                        except (json.JSONDecodeError, ValueError):
+                            data = None
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if transport.can_retry(method, attempt):
+                        await asyncio.sleep(transport.get_backoff(attempt))
+                        attempt += 1
+                        continue
+                    if isinstance(e, aiohttp.ClientConnectionError):
+                        raise NetworkError(f"无法连接到服务器: {self.base_url}") from e
+                    raise NetworkError(f"请求超时: {url}") from e
+                except aiohttp.ClientError as e:
+                    raise NetworkError(f"请求失败: {e}") from e
+
+                if transport.should_retry_status(method, status_code, attempt):
+                    await asyncio.sleep(transport.get_backoff(attempt, retry_after))
+                    attempt += 1
+                    continue
+                break
+            status = status_code
+        finally:
+            self.metrics.observe(method, endpoint, status, time.perf_counter() - start, attempt)
+
+        return _parse_response(status_code, data)
+
+    async def authenticate(self, token: str) -> bool:
+        """
+        验证令牌
+
+        Args:
+            token: 访问令牌
+
+        Returns:
+            是否验证成功
+        """
+        try:
+            session = self._get_session()
+            async with session.post(f"{self.base_url}/auth", json={"token": token}) as response:
+                data = await response.json(content_type=None)
+            if data.get("success") and data.get("data", {}).get("authenticated"):
+                self.token = token
+                # 令牌变化后重建 session 以更新认证头
+                await self.close()
+                return True
+            return False
+        except Exception:
+            return False
+
+    async def is_connected(self) -> bool:
+        """检查是否已连接到服务器"""
+        try:
+            await self.system.health_check()
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        """关闭客户端连接"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "AsyncNapCatQCE":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __repr__(self) -> str:
+        return f"AsyncNapCatQCE(host={self.host!r}, port={self.port})"
+
+    # ========================================
+    # 便捷导出方法
+    # ========================================
+
+    async def export_group(
+        self,
+        group_id: str,
+        format: str = "HTML",
+        days: Optional[int] = None,
+        filter: Optional[MessageFilter] = None,
+        session_name: Optional[str] = None,
+        timeout: float = 600,
+        on_progress: Optional[Callable[[ExportTask], None]] = None,
+    ) -> ExportTask:
+        """快速导出群聊记录，参数同 NapCatQCE.export_group"""
+        return await self.messages.quick_export(
+            chat_type=ChatType.GROUP,
+            peer_uid=group_id,
+            format=format,
+            days=days,
+            filter=filter,
+            session_name=session_name,
+            timeout=timeout,
+            on_progress=on_progress,
+        )
+
+    async def export_friend(
+        self,
+        friend_id: str,
+        format: str = "HTML",
+        days: Optional[int] = None,
+        filter: Optional[MessageFilter] = None,
+        session_name: Optional[str] = None,
+        timeout: float = 600,
+        on_progress: Optional[Callable[[ExportTask], None]] = None,
+    ) -> ExportTask:
+        """快速导出私聊记录，参数同 NapCatQCE.export_friend"""
+        # 私聊需要使用 uid，传入 QQ 号时先转换
+        peer_uid = friend_id
+        if not friend_id.startswith("u_"):
+            peer_uid = await self.friends.get_uid(friend_id) or friend_id
+
+        return await self.messages.quick_export(
+            chat_type=ChatType.PRIVATE,
+            peer_uid=peer_uid,
+            format=format,
+            days=days,
+            filter=filter,
+            session_name=session_name,
+            timeout=timeout,
+            on_progress=on_progress,
+        )
@@ -133,6 +133,7 @@ def create_client_with_auto_token(
     port: int = 40653,
     token: Optional[str] = None,
     auto_discover: bool = True,
+    use_async: bool = False,
     **kwargs,
 ):
     """
@@ -143,10 +144,11 @@ def create_client_with_auto_token(
         port: 服务器端口
         token: 手动指定的令牌（优先级最高）
         auto_discover: 是否自动发现令牌
-        **kwargs: 传递给 NapCatQCE 的其他参数
+        use_async: 是否创建异步客户端 AsyncNapCatQCE
+        **kwargs: 传递给客户端的其他参数
 
     Returns:
-        NapCatQCE 客户端实例
+        NapCatQCE 或 AsyncNapCatQCE 客户端实例
 
     Raises:
         AuthenticationError: 无法获取令牌
@@ -167,6 +169,10 @@ def create_client_with_auto_token(
             "3. 确保 NapCat-QCE 服务在本机运行（将自动读取配置文件）"
         )
 
+    if use_async:
+        from .async_client import AsyncNapCatQCE
+        return AsyncNapCatQCE(token=final_token, host=host, port=port, **kwargs)
+
     return NapCatQCE(token=final_token, host=host, port=port, **kwargs)
 
 
@@ -185,6 +191,10 @@ class AutoTokenClient:
         >>>
         >>> # 使用
         >>> groups = client.groups.get_all()
+        >>>
+        >>> # 异步客户端
+        >>> async with AutoTokenClient(use_async=True) as client:
+        ...     groups = await client.groups.get_all()
     """
 
     def __init__(
@@ -193,6 +203,7 @@ class AutoTokenClient:
         port: int = 40653,
         token: Optional[str] = None,
         auto_discover: bool = True,
+        use_async: bool = False,
         **kwargs,
     ):
         """
@@ -203,7 +214,8 @@ class AutoTokenClient:
             port: 服务器端口
             token: 手动指定的令牌
             auto_discover: 是否自动发现令牌
-            **kwargs: 传递给 NapCatQCE 的其他参数
+            use_async: 是否使用异步客户端 AsyncNapCatQCE
+            **kwargs: 传递给客户端的其他参数
         """
         # 尝试从配置获取服务器地址
         if host is None:
@@ -215,6 +227,7 @@ class AutoTokenClient:
             port=port,
             token=token,
             auto_discover=auto_discover,
+            use_async=use_async,
             **kwargs,
         )
 
@@ -228,6 +241,12 @@ class AutoTokenClient:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self._client.close()
 
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._client.close()
+
     @property
     def client(self):
         """获取内部客户端实例"""
@@ -239,6 +258,7 @@ def connect(
     host: Optional[str] = None,
     port: int = 40653,
     token: Optional[str] = None,
+    use_async: bool = False,
 ) -> "AutoTokenClient":
     """
     快速连接到 NapCat-QCE 服务器
@@ -249,6 +269,7 @@ def connect(
         host: 服务器地址（None 时自动检测）
         port: 服务器端口
         token: 手动指定的令牌（可选）
+        use_async: 是否使用异步客户端（方法均为协程）
 
     Returns:
         客户端实例
@@ -257,5 +278,8 @@ def connect(
         >>> from napcat_qce import connect
         >>> client = connect()
         >>> groups = client.groups.get_all()
+        >>>
+        >>> client = connect(use_async=True)
+        >>> groups = await client.groups.get_all()
     """
-    return AutoTokenClient(host=host, port=port, token=token)
+    return AutoTokenClient(host=host, port=port, token=token, use_async=use_async)
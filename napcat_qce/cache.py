@@ -0,0 +1,112 @@
+"""
+NapCat-QCE 客户端缓存
+====================
+
+进程内的 TTL 缓存，用于好友、群组、群成员和用户信息等变化不频繁的数据。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple
+
+
+@dataclass
+class CacheConfig:
+    """
+    缓存配置
+
+    Example:
+        >>> client = NapCatQCE(token="...", cache=CacheConfig(friends_ttl=600))
+    """
+
+    max_entries: int = 512  # 最大条目数，超出时淘汰最久未使用的条目
+
+    # 各资源的过期时间（秒）
+    friends_ttl: float = 300.0
+    groups_ttl: float = 300.0
+    members_ttl: float = 600.0
+    users_ttl: float = 1800.0
+
+
+class ResponseCache:
+    """
+    线程安全的 TTL + LRU 缓存
+
+    条目按 (资源, 键) 存储，资源为 friends / groups / members / users，
+    可以按资源或单个键失效。
+    """
+
+    def __init__(self, config: Optional[CacheConfig] = None):
+        self.config = config or CacheConfig()
+        self._entries: "OrderedDict[Tuple[str, Tuple], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self, resource: str) -> float:
+        return getattr(self.config, f"{resource}_ttl")
+
+    def get(self, resource: str, key: Tuple = ()) -> Optional[Any]:
+        """
+        读取缓存
+
+        Args:
+            resource: 资源名
+            key: 资源内的键
+
+        Returns:
+            缓存的值，不存在或已过期时返回 None
+        """
+        entry_key = (resource, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[entry_key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return value
+
+    def set(self, resource: str, key: Tuple, value: Any):
+        """写入缓存，过期时间取该资源的 TTL"""
+        entry_key = (resource, key)
+        with self._lock:
+            self._entries[entry_key] = (time.monotonic() + self._ttl(resource), value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.config.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, resource: Optional[str] = None, key: Optional[Tuple] = None):
+        """
+        使缓存失效
+
+        Args:
+            resource: 资源名，为 None 时清空全部缓存
+            key: 资源内的键，为 None 时使该资源的所有条目失效
+        """
+        with self._lock:
+            if resource is None:
+                self._entries.clear()
+            elif key is not None:
+                self._entries.pop((resource, key), None)
+            else:
+                for entry_key in [k for k in self._entries if k[0] == resource]:
+                    del self._entries[entry_key]
+
+    def clear(self):
+        """清空缓存"""
+        self.invalidate()
+
+    def stats(self) -> Dict[str, int]:
+        """获取命中统计"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
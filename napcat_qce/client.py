@@ -6,13 +6,18 @@ NapCat-QCE 主客户端
 """
 
 import json
+import queue
 import time
 import threading
-from typing import Optional, Dict, Any, List, Callable, Generator
+from typing import Optional, Dict, Any, List, Callable, Generator, Sequence, Union
 from urllib.parse import urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from .transport import TransportConfig
+from .cache import CacheConfig, ResponseCache
+from .metrics import MetricsRegistry, RequestMetrics
 from .types import (
     ChatType,
     ExportFormat,
@@ -44,6 +49,148 @@ from .exceptions import (
 )
 
 
+def _parse_response(status_code: int, data: Optional[Any]) -> Any:
+    """
+    解析 API 响应并映射错误（同步与异步客户端共用）
+
+    Args:
+        status_code: HTTP 状态码
+        data: 解析后的 JSON 响应体，非 JSON 时为 None
+
+    Returns:
+        响应数据
+
+    Raises:
+        AuthenticationError: 认证失败
+        ValidationError: 参数验证失败
+        TaskNotFoundError: 任务不存在
+        APIError: API 调用失败
+    """
+    if status_code == 401:
+        raise AuthenticationError("认证失败，请检查访问令牌")
+    elif status_code == 403:
+        raise AuthenticationError("访问被拒绝，令牌无效或已过期")
+
+    if data is None:
+        if status_code >= 400:
+            raise APIError(
+                message=f"服务器返回错误: {status_code}",
+                status_code=status_code,
+            )
+        return {}
+
+    # 检查 API 响应
+    if not data.get("success", True):
+        error = data.get("error", {})
+        error_type = error.get("type", "UNKNOWN_ERROR")
+        error_message = error.get("message", "未知错误")
+        error_code = error.get("context", {}).get("code", error_type)
+
+        if error_type == "AUTH_ERROR":
+            raise AuthenticationError(error_message, code=error_code)
+        elif error_type == "VALIDATION_ERROR":
+            raise ValidationError(error_message, code=error_code)
+        elif error_code == "TASK_NOT_FOUND":
+            raise TaskNotFoundError(error.get("context", {}).get("taskId", "unknown"))
+        else:
+            raise APIError(
+                message=error_message,
+                code=error_code,
+                status_code=status_code,
+                details=error,
+            )
+
+    return data.get("data", data)
+
+
+def _iter_pages(
+    fetch_page: Callable[[int], tuple],
+    prefetch: int = 1,
+) -> Generator[Any, None, None]:
+    """
+    按页码依次获取分页数据，后台线程预取后续页面
+
+    Args:
+        fetch_page: 获取一页的函数，参数为页码（从 1 开始），返回 (页面数据, 是否有下一页)
+        prefetch: 预取的页数。队列满时后台线程等待消费者，内存中最多保留
+            prefetch 个待处理的页面；为 0 时不使用后台线程
+
+    Yields:
+        页面数据
+    """
+    if prefetch <= 0:
+        page = 1
+        while True:
+            items, has_next = fetch_page(page)
+            yield items
+            if not has_next:
+                return
+            page += 1
+
+    pages: "queue.Queue[tuple]" = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def producer():
+        page = 1
+        while not stop.is_set():
+            try:
+                items, has_next = fetch_page(page)
+                entry = (items, has_next, None)
+            except Exception as e:
+                entry = (None, False, e)
+
+            # 队列满时等待消费者，消费者提前结束时退出
+            while not stop.is_set():
+                try:
+                    pages.put(entry, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+            if not entry[1]:
+                return
+            page += 1
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            items, has_next, error = pages.get()
+            if error is not None:
+                raise error
+            yield items
+            if not has_next:
+                return
+    finally:
+        stop.set()
+
+
+def _raise_for_task(task: ExportTask):
+    """任务失败或被取消时抛出 APIError"""
+    if task.status == TaskStatus.FAILED:
+        raise APIError(
+            message=f"任务失败: {task.error}",
+            code="TASK_FAILED",
+            details={"task_id": task.id, "error": task.error},
+        )
+    if task.status == TaskStatus.CANCELLED:
+        raise APIError(
+            message="任务已取消",
+            code="TASK_CANCELLED",
+            details={"task_id": task.id},
+        )
+
+
+def _create_cache(cache: Union[bool, CacheConfig, None]) -> Optional[ResponseCache]:
+    """根据客户端的 cache 参数创建缓存"""
+    if isinstance(cache, CacheConfig):
+        return ResponseCache(cache)
+    if cache:
+        return ResponseCache()
+    return None
+
+
 class BaseAPI:
     """API 基类"""
 
@@ -60,6 +207,35 @@ class BaseAPI:
     ) -> Dict[str, Any]:
         return self._client._request(method, endpoint, params, json_data, **kwargs)
 
+    def _cached(
+        self,
+        resource: str,
+        key: tuple,
+        loader: Callable[[], Any],
+        refresh: bool = False,
+    ) -> Any:
+        """
+        通过客户端缓存读取数据
+
+        Args:
+            resource: 缓存资源名
+            key: 资源内的键
+            loader: 缓存未命中时加载数据的函数
+            refresh: 是否跳过缓存并用新数据覆盖
+        """
+        cache = self._client.cache
+        if cache is None:
+            return loader()
+
+        if not refresh:
+            value = cache.get(resource, key)
+            if value is not None:
+                return value
+
+        value = loader()
+        cache.set(resource, key, value)
+        return value
+
 
 class GroupsAPI(BaseAPI):
     """群组 API"""
@@ -76,22 +252,25 @@ class GroupsAPI(BaseAPI):
         Args:
             page: 页码
             limit: 每页数量
-            force_refresh: 是否强制刷新缓存
+            force_refresh: 是否强制刷新缓存（同时跳过客户端缓存）
 
         Returns:
             群组列表
         """
-        data = self._request(
-            "GET",
-            "/api/groups",
-            params={
-                "page": page,
-                "limit": limit,
-                "forceRefresh": str(force_refresh).lower(),
-            },
-        )
-        groups_data = data.get("groups", [])
-        return [Group.from_dict(g) for g in groups_data]
+        def load():
+            data = self._request(
+                "GET",
+                "/api/groups",
+                params={
+                    "page": page,
+                    "limit": limit,
+                    "forceRefresh": str(force_refresh).lower(),
+                },
+            )
+            groups_data = data.get("groups", [])
+            return [Group.from_dict(g) for g in groups_data]
+
+        return list(self._cached("groups", (page, limit), load, refresh=force_refresh))
 
     def get(self, group_code: str, force_refresh: bool = False) -> Dict[str, Any]:
         """
@@ -120,43 +299,82 @@ class GroupsAPI(BaseAPI):
 
         Args:
             group_code: 群号
-            force_refresh: 是否强制刷新
+            force_refresh: 是否强制刷新（同时跳过客户端缓存）
 
         Returns:
             群成员列表
         """
-        data = self._request(
-            "GET",
-            f"/api/groups/{group_code}/members",
-            params={"forceRefresh": str(force_refresh).lower()},
-        )
-        # API 直接返回成员数组
-        if isinstance(data, list):
-            return [GroupMember.from_dict(m) for m in data]
-        return []
+        def load():
+            data = self._request(
+                "GET",
+                f"/api/groups/{group_code}/members",
+                params={"forceRefresh": str(force_refresh).lower()},
+            )
+            # API 直接返回成员数组
+            if isinstance(data, list):
+                return [GroupMember.from_dict(m) for m in data]
+            return []
+
+        return list(self._cached("members", (str(group_code),), load, refresh=force_refresh))
+
+
+# 好友 QQ 号 -> UID 索引在缓存中的键
+_UIN_INDEX_KEY = ("uin_index",)
 
 
 class FriendsAPI(BaseAPI):
     """好友 API"""
 
-    def get_all(self, page: int = 1, limit: int = 999) -> List[Friend]:
+    def get_all(
+        self,
+        page: int = 1,
+        limit: int = 999,
+        force_refresh: bool = False,
+    ) -> List[Friend]:
         """
         获取所有好友
 
         Args:
             page: 页码
             limit: 每页数量
+            force_refresh: 是否跳过客户端缓存
 
         Returns:
             好友列表
         """
-        data = self._request(
-            "GET",
-            "/api/friends",
-            params={"page": page, "limit": limit},
-        )
-        friends_data = data.get("friends", [])
-        return [Friend.from_dict(f) for f in friends_data]
+        def load():
+            data = self._request(
+                "GET",
+                "/api/friends",
+                params={"page": page, "limit": limit},
+            )
+            friends_data = data.get("friends", [])
+            friends = [Friend.from_dict(f) for f in friends_data]
+            if self._client.cache is not None:
+                # 好友列表重新加载后，QQ 号索引在下次查找时按新列表重建
+                self._client.cache.invalidate("friends", _UIN_INDEX_KEY)
+            return friends
+
+        return list(self._cached("friends", (page, limit), load, refresh=force_refresh))
+
+    def get_uid(self, uin: str, force_refresh: bool = False) -> Optional[str]:
+        """
+        根据 QQ 号查找好友 UID
+
+        QQ 号到 UID 的索引在好友列表刷新时构建一次，之后的查找不再请求服务器。
+
+        Args:
+            uin: 好友QQ号
+            force_refresh: 是否重新获取好友列表
+
+        Returns:
+            好友 UID，找不到时返回 None
+        """
+        def build_index():
+            return {f.uin: f.uid for f in self.get_all(force_refresh=force_refresh)}
+
+        index = self._cached("friends", _UIN_INDEX_KEY, build_index, refresh=force_refresh)
+        return index.get(str(uin))
 
     def get(self, uid: str, no_cache: bool = False) -> Dict[str, Any]:
         """
@@ -185,17 +403,20 @@ class UsersAPI(BaseAPI):
 
         Args:
             uid: 用户 UID
-            no_cache: 是否禁用缓存
+            no_cache: 是否禁用缓存（同时跳过客户端缓存）
 
         Returns:
             用户信息
         """
-        data = self._request(
-            "GET",
-            f"/api/users/{uid}",
-            params={"no_cache": str(no_cache).lower()},
-        )
-        return UserInfo.from_dict(data)
+        def load():
+            data = self._request(
+                "GET",
+                f"/api/users/{uid}",
+                params={"no_cache": str(no_cache).lower()},
+            )
+            return UserInfo.from_dict(data)
+
+        return self._cached("users", (uid,), load, refresh=no_cache)
 
 
 class MessagesAPI(BaseAPI):
@@ -236,17 +457,7 @@ class MessagesAPI(BaseAPI):
         Returns:
             包含消息列表和分页信息的字典
         """
-        peer = {"chatType": self._normalize_chat_type(chat_type), "peerUid": peer_uid}
-        body = {
-            "peer": peer,
-            "batchSize": batch_size,
-            "page": page,
-            "limit": limit,
-        }
-        if filter:
-            body["filter"] = filter.to_dict()
-
-        data = self._request("POST", "/api/messages/fetch", json_data=body)
+        data = self._fetch_page(chat_type, peer_uid, filter, batch_size, page, limit)
 
         # 解析消息
         messages = [Message.from_dict(m) for m in data.get("messages", [])]
@@ -260,43 +471,113 @@ class MessagesAPI(BaseAPI):
             "cache_hit": data.get("cacheHit", False),
         }
 
+    def _fetch_page(
+        self,
+        chat_type,
+        peer_uid: str,
+        filter: Optional[MessageFilter],
+        batch_size: int,
+        page: int,
+        limit: int,
+    ) -> Dict[str, Any]:
+        """请求一页消息，返回未解析的响应数据"""
+        peer = {"chatType": self._normalize_chat_type(chat_type), "peerUid": peer_uid}
+        body = {
+            "peer": peer,
+            "batchSize": batch_size,
+            "page": page,
+            "limit": limit,
+        }
+        if filter:
+            body["filter"] = filter.to_dict()
+
+        return self._request("POST", "/api/messages/fetch", json_data=body)
+
+    def iter_messages(
+        self,
+        chat_type,  # int 或 ChatType
+        peer_uid: str,
+        filter: Optional[MessageFilter] = None,
+        batch_size: int = 5000,
+        page_size: int = 100,
+        prefetch: int = 1,
+        keep_raw: bool = True,
+        raw_fields: Optional[Sequence[str]] = None,
+    ) -> Generator[Message, None, None]:
+        """
+        逐条获取所有消息（流式生成器）
+
+        后台线程预取后续页面，内存中最多只有当前页和 prefetch 个待处理的页面，
+        已经产出的消息不再被引用。适合导出完整历史记录。
+
+        Args:
+            chat_type: 聊天类型 (ChatType.PRIVATE, ChatType.GROUP 或 1, 2)
+            peer_uid: 对方 UID 或群号
+            filter: 消息筛选条件
+            batch_size: 批量大小
+            page_size: 每页消息数
+            prefetch: 预取的页数，为 0 时不预取
+            keep_raw: 是否在 Message.raw_data 中保留原始字典
+            raw_fields: 只保留原始字典中的这些字段，例如 ("elements",)
+
+        Yields:
+            消息
+
+        Example:
+            for msg in client.messages.iter_messages(2, "123456789", keep_raw=False):
+                print(msg.msg_time, msg.sender_name)
+        """
+        def fetch_page(page: int):
+            data = self._fetch_page(chat_type, peer_uid, filter, batch_size, page, page_size)
+            return data.get("messages", []), data.get("hasNext", False)
+
+        for raw_messages in _iter_pages(fetch_page, prefetch):
+            for i, raw in enumerate(raw_messages):
+                # 解析后释放该条原始数据
+                raw_messages[i] = None
+                yield Message.from_dict(raw, keep_raw=keep_raw, raw_fields=raw_fields)
+
     def fetch_all(
         self,
         chat_type,  # int 或 ChatType
         peer_uid: str,
         filter: Optional[MessageFilter] = None,
         batch_size: int = 5000,
+        page_size: int = 100,
+        prefetch: int = 1,
     ) -> Generator[List[Message], None, None]:
         """
         获取所有消息（生成器）
 
+        后台线程提前获取后续页面，网络请求与调用方处理当前页同时进行。
+        预取队列满时后台线程暂停，内存中最多保留 prefetch 个待处理的页面。
+
         Args:
             chat_type: 聊天类型 (ChatType.PRIVATE, ChatType.GROUP 或 1, 2)
             peer_uid: 对方 UID 或群号
             filter: 消息筛选条件
             batch_size: 批量大小
+            page_size: 每页消息数
+            prefetch: 预取的页数，为 0 时处理完一页再请求下一页
 
         Yields:
             消息列表（每页）
         """
-        page = 1
-        while True:
+        def fetch_page(page: int):
             result = self.fetch(
                 chat_type=chat_type,
                 peer_uid=peer_uid,
                 filter=filter,
                 batch_size=batch_size,
                 page=page,
-                limit=100,
+                limit=page_size,
             )
-            messages = result["messages"]
+            return result["messages"], result["has_next"]
+
+        for messages in _iter_pages(fetch_page, prefetch):
             if messages:
                 yield messages
 
-            if not result["has_next"]:
-                break
-            page += 1
-
     def export(
         self,
         chat_type,  # int 或 ChatType
@@ -439,20 +720,46 @@ class TasksAPI(BaseAPI):
         self._request("DELETE", f"/api/tasks/{task_id}/original-files")
         return True
 
+    def poll(self, task_ids: List[str]) -> Dict[str, ExportTask]:
+        """
+        一次性查询多个任务的状态
+
+        通过一次任务列表请求获取所有任务，列表中找不到的任务再单独查询。
+
+        Args:
+            task_ids: 任务 ID 列表
+
+        Returns:
+            {task_id: 任务}，已不存在的任务不包含在结果中
+        """
+        wanted = set(task_ids)
+        found = {t.id: t for t in self.get_all() if t.id in wanted}
+
+        for task_id in wanted - set(found):
+            try:
+                found[task_id] = self.get(task_id)
+            except TaskNotFoundError:
+                pass
+
+        return found
+
     def wait_for_completion(
         self,
         task_id: str,
         timeout: float = 300,
-        poll_interval: float = 2,
+        poll_interval: Optional[float] = None,
         on_progress: Optional[Callable[[ExportTask], None]] = None,
     ) -> ExportTask:
         """
         等待任务完成
 
+        通过客户端共享的 TaskCompletionNotifier 等待：WebSocket 可用时由
+        导出事件唤醒，否则回退到自适应的轮询。
+
         Args:
             task_id: 任务 ID
             timeout: 超时时间（秒）
-            poll_interval: 轮询间隔（秒）
+            poll_interval: 回退轮询间隔的上限（秒），默认使用通知器的配置
             on_progress: 进度回调函数
 
         Returns:
@@ -462,32 +769,14 @@ class TasksAPI(BaseAPI):
             TimeoutError: 超时
             APIError: 任务失败
         """
-        start_time = time.time()
-        while True:
-            task = self.get(task_id)
-
-            if on_progress:
-                on_progress(task)
-
-            if task.status == TaskStatus.COMPLETED:
-                return task
-            elif task.status == TaskStatus.FAILED:
-                raise APIError(
-                    message=f"任务失败: {task.error}",
-                    code="TASK_FAILED",
-                    details={"task_id": task_id, "error": task.error},
-                )
-            elif task.status == TaskStatus.CANCELLED:
-                raise APIError(
-                    message="任务已取消",
-                    code="TASK_CANCELLED",
-                    details={"task_id": task_id},
-                )
-
-            if time.time() - start_time > timeout:
-                raise TimeoutError(f"等待任务完成超时: {task_id}")
-
-            time.sleep(poll_interval)
+        task = self._client.task_notifier.wait(
+            task_id,
+            timeout=timeout,
+            on_progress=on_progress,
+            max_interval=poll_interval,
+        )
+        _raise_for_task(task)
+        return task
 
 
 class ScheduledExportsAPI(BaseAPI):
@@ -783,6 +1072,9 @@ class NapCatQCE:
         port: int = DEFAULT_PORT,
         timeout: float = 30.0,
         verify_ssl: bool = True,
+        transport: Optional[TransportConfig] = None,
+        cache: Union[bool, CacheConfig, None] = None,
+        metrics: Optional[MetricsRegistry] = None,
     ):
         """
         初始化客户端
@@ -791,19 +1083,35 @@ class NapCatQCE:
             token: 访问令牌
             host: 服务器地址
             port: 服务器端口
-            timeout: 请求超时时间（秒）
+            timeout: 请求超时时间（秒），未指定 transport 时作为读取超时
             verify_ssl: 是否验证 SSL 证书
+            transport: 传输配置（连接池、超时、重试）
+            cache: 启用好友/群组/成员/用户信息的客户端缓存，True 使用默认配置
+            metrics: 记录请求耗时的指标注册表，默认使用全局注册表
         """
         self.host = host
         self.port = port
         self.token = token
         self.timeout = timeout
         self.verify_ssl = verify_ssl
+        self.transport = transport or TransportConfig(read_timeout=timeout)
+        self.cache = _create_cache(cache)
+        self.metrics = RequestMetrics(metrics)
+        self._task_notifier = None
+        self._notifier_lock = threading.Lock()
 
         self.base_url = f"http://{host}:{port}"
 
-        # 创建 session
+        # 创建 session，连接池复用 keep-alive 连接，重试由 _request 负责
         self._session = requests.Session()
+        # 每个主机一个连接池，最多保留 pool_size 个主机，每个主机最多 max_connections_per_host 个连接
+        adapter = HTTPAdapter(
+            pool_connections=self.transport.pool_size,
+            pool_maxsize=self.transport.max_connections_per_host,
+            max_retries=0,
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         if token:
             self._session.headers["Authorization"] = f"Bearer {token}"
 
@@ -829,6 +1137,8 @@ class NapCatQCE:
         """
         发送 HTTP 请求
 
+        幂等请求在连接失败、超时或返回 429/502/503 时按 transport 配置重试。
+
         Args:
             method: HTTP 方法
             endpoint: API 端点
@@ -846,62 +1156,49 @@ class NapCatQCE:
             NetworkError: 网络错误
         """
         url = urljoin(self.base_url, endpoint)
+        transport = self.transport
+        attempt = 0
+        start = time.perf_counter()
+        status = "error"
 
         try:
-            response = self._session.request(
-                method=method,
-                url=url,
-                params=params,
-                json=json_data,
-                timeout=self.timeout,
-                verify=self.verify_ssl,
-                **kwargs,
-            )
-        except requests.exceptions.ConnectionError as e:
-            raise NetworkError(f"无法连接到服务器: {self.base_url}") from e
-        except requests.exceptions.Timeout as e:
-            raise NetworkError(f"请求超时: {url}") from e
-        except requests.exceptions.RequestException as e:
-            raise NetworkError(f"请求失败: {e}") from e
-
-        # 处理响应
-        if response.status_code == 401:
-            raise AuthenticationError("认证失败，请检查访问令牌")
-        elif response.status_code == 403:
-            raise AuthenticationError("访问被拒绝，令牌无效或已过期")
+            while True:
+                try:
+                    response = self._session.request(
+                        method=method,
+                        url=url,
+                        params=params,
+                        json=json_data,
+                        timeout=transport.timeout,
+                        verify=self.verify_ssl,
+                        **kwargs,
+                    )
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    if transport.can_retry(method, attempt):
+                        time.sleep(transport.get_backoff(attempt))
+                        attempt += 1
+                        continue
+                    if isinstance(e, requests.exceptions.ConnectionError):
+                        raise NetworkError(f"无法连接到服务器: {self.base_url}") from e
+                    raise NetworkError(f"请求超时: {url}") from e
+                except requests.exceptions.RequestException as e:
+                    raise NetworkError(f"请求失败: {e}") from e
+
+                if transport.should_retry_status(method, response.status_code, attempt):
+                    time.sleep(transport.get_backoff(attempt, response.headers.get("Retry-After")))
+                    attempt += 1
+                    continue
+                break
+            status = response.status_code
+        finally:
+            self.metrics.observe(method, endpoint, status, time.perf_counter() - start, attempt)
 
         try:
             data = response.json()
         except json.JSONDecodeError:
-            if response.status_code >= 400:
-                raise APIError(
-                    message=f"服务器返回错误: {response.status_code}",
-                    status_code=response.status_code,
-                )
-            return {}
-
-        # 检查 API 响应
-        if not data.get("success", True):
-            error = data.get("error", {})
-            error_type = error.get("type", "UNKNOWN_ERROR")
-            error_message = error.get("message", "未知错误")
-            error_code = error.get("context", {}).get("code", error_type)
-
-            if error_type == "AUTH_ERROR":
-                raise AuthenticationError(error_message, code=error_code)
-            elif error_type == "VALIDATION_ERROR":
-                raise ValidationError(error_message, code=error_code)
-            elif error_code == "TASK_NOT_FOUND":
-                raise TaskNotFoundError(error.get("context", {}).get("taskId", "unknown"))
-            else:
-                raise APIError(
-                    message=error_message,
-                    code=error_code,
-                    status_code=response.status_code,
-                    details=error,
-                )
+            data = None
 
-        return data.get("data", data)
+        return _parse_response(response.status_code, data)
 
     def authenticate(self, token: str) -> bool:
         """
@@ -917,7 +1214,7 @@ class NapCatQCE:
             response = self._session.post(
                 f"{self.base_url}/auth",
                 json={"token": token},
-                timeout=self.timeout,
+                timeout=self.transport.timeout,
             )
             data = response.json()
             if data.get("success") and data.get("data", {}).get("authenticated"):
@@ -941,8 +1238,24 @@ class NapCatQCE:
         except Exception:
             return False
 
+    @property
+    def task_notifier(self):
+        """共享的导出任务完成通知器（首次访问时创建）"""
+        if self._task_notifier is None:
+            from .websocket import TaskCompletionNotifier
+            with self._notifier_lock:
+                if self._task_notifier is None:
+                    self._task_notifier = TaskCompletionNotifier(self)
+        return self._task_notifier
+
+    @task_notifier.setter
+    def task_notifier(self, notifier):
+        self._task_notifier = notifier
+
     def close(self):
         """关闭客户端连接"""
+        if self._task_notifier is not None:
+            self._task_notifier.close()
         self._session.close()
 
     def __enter__(self) -> "NapCatQCE":
@@ -1036,11 +1349,7 @@ class NapCatQCE:
         # 检查是否已经是 uid 格式（通常以 "u_" 开头）
         if not friend_id.startswith("u_"):
             # 传入的是 QQ 号，需要查找对应的 uid
-            friends = self.friends.get_all()
-            for friend in friends:
-                if friend.uin == friend_id:
-                    peer_uid = friend.uid
-                    break
+            peer_uid = self.friends.get_uid(friend_id) or friend_id
 
         return self.messages.quick_export(
             chat_type=ChatType.PRIVATE,
@@ -1061,10 +1370,18 @@ class NapCatQCE:
         output_dir: Optional[str] = None,
         on_progress: Optional[Callable[[str, ExportTask], None]] = None,
         on_error: Optional[Callable[[str, Exception], None]] = None,
+        max_concurrency: int = 1,
+        timeout: float = 600,
+        poll_interval: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         批量导出多个聊天记录
 
+        最多同时提交 max_concurrency 个导出任务，所有进行中的任务由共享的
+        TaskCompletionNotifier 跟踪（WebSocket 事件或一次任务列表请求统一查询），
+        任务完成后立即移动文件并提交下一个目标。
+        好友 QQ 号通过 friends.get_uid 转换为 UID，启用客户端缓存时好友列表只获取一次。
+
         Args:
             targets: 导出目标列表，每项包含:
                 - type: "group" 或 "friend"
@@ -1073,87 +1390,145 @@ class NapCatQCE:
             format: 导出格式
             days: 导出最近N天
             output_dir: 输出目录（导出完成后移动文件到此目录）
-            on_progress: 进度回调 (target_id, task)
+            on_progress: 完成回调 (target_id, task)
             on_error: 错误回调 (target_id, exception)
+            max_concurrency: 同时进行的导出任务数，默认 1（逐个导出）
+            timeout: 单个任务的超时时间（秒）
+            poll_interval: 回退轮询间隔的上限（秒），默认使用通知器的配置
 
         Returns:
             结果统计: {"success": int, "failed": int, "total_messages": int, "results": [...]}
+            results 的顺序与 targets 一致
 
         Example:
             results = client.batch_export([
                 {"type": "group", "id": "123456789"},
                 {"type": "friend", "id": "111222333"},
-            ], days=7, output_dir="D:/QQ聊天记录")
+            ], days=7, output_dir="D:/QQ聊天记录", max_concurrency=8)
             print(f"成功: {results['success']}, 失败: {results['failed']}")
         """
         import os
-        import shutil
 
         # 确保输出目录存在
         if output_dir:
             os.makedirs(output_dir, exist_ok=True)
 
-        results = {
-            "success": 0,
-            "failed": 0,
-            "total_messages": 0,
-            "results": [],
-        }
-
-        for target in targets:
-            target_type = target.get("type", "group")
-            target_id = target.get("id", "")
-            target_name = target.get("name")
-
-            try:
-                if target_type == "group":
-                    task = self.export_group(
-                        group_id=target_id,
-                        format=format,
-                        days=days,
-                        session_name=target_name,
-                    )
-                else:
-                    task = self.export_friend(
-                        friend_id=target_id,
+        filter = MessageFilter.last_days(days) if days is not None else None
+        max_concurrency = max(1, max_concurrency)
+        notifier = self.task_notifier
+
+        entries: List[Optional[Dict[str, Any]]] = [None] * len(targets)
+        pending = list(enumerate(targets))
+        pending.reverse()
+        # task_id -> (序号, 目标, 截止时间)
+        active: Dict[str, tuple] = {}
+        # 通知器在任务结束时放入任务
+        finished: "queue.Queue[ExportTask]" = queue.Queue()
+
+        def fail(index: int, target: Dict[str, Any], error: Exception):
+            if on_error:
+                on_error(target.get("id", ""), error)
+            entries[index] = {
+                "id": target.get("id", ""),
+                "type": target.get("type", "group"),
+                "status": "failed",
+                "error": str(error),
+            }
+
+        while pending or active:
+            # 补足并发槽位
+            while pending and len(active) < max_concurrency:
+                index, target = pending.pop()
+                target_id = target.get("id", "")
+
+                try:
+                    if target.get("type", "group") == "group":
+                        chat_type, peer_uid = ChatType.GROUP, str(target_id)
+                    else:
+                        peer_uid = str(target_id)
+                        if not peer_uid.startswith("u_"):
+                            # 与 friends.get_uid 共用缓存的 QQ 号索引，找不到时按原值导出
+                            peer_uid = self.friends.get_uid(peer_uid) or peer_uid
+                        chat_type = ChatType.PRIVATE
+
+                    task = self.messages.export(
+                        chat_type=chat_type,
+                        peer_uid=peer_uid,
                         format=format,
-                        days=days,
-                        session_name=target_name,
+                        filter=filter,
+                        session_name=target.get("name"),
                     )
+                    active[task.id] = (index, target, time.time() + timeout)
+                    notifier.watch(task.id, on_done=finished.put, max_interval=poll_interval)
+                except Exception as e:
+                    fail(index, target, e)
 
-                # 移动文件到输出目录
-                output_path = None
-                if output_dir and task.file_name:
-                    user_profile = os.environ.get("USERPROFILE", os.path.expanduser("~"))
-                    src_path = os.path.join(user_profile, ".qq-chat-exporter", "exports", task.file_name)
-                    if os.path.exists(src_path):
-                        output_path = os.path.join(output_dir, task.file_name)
-                        shutil.move(src_path, output_path)
+            if not active:
+                continue
+
+            deadline = min(d for _, _, d in active.values())
+            try:
+                task = finished.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                # 处理超时的任务
+                now = time.time()
+                for task_id, (index, target, task_deadline) in list(active.items()):
+                    if task_deadline <= now:
+                        notifier.unwatch(task_id, on_done=finished.put)
+                        del active[task_id]
+                        fail(index, target, TimeoutError(f"等待任务完成超时: {task_id}"))
+                continue
+
+            if task.id not in active:
+                continue
+            index, target, _ = active.pop(task.id)
+            notifier.unwatch(task.id, on_done=finished.put)
+            target_id = target.get("id", "")
 
+            try:
+                _raise_for_task(task)
+                output_path = self._move_export_file(task, output_dir)
                 if on_progress:
                     on_progress(target_id, task)
-
-                results["success"] += 1
-                results["total_messages"] += task.message_count
-                results["results"].append({
+                entries[index] = {
                     "id": target_id,
-                    "type": target_type,
+                    "type": target.get("type", "group"),
                     "status": "success",
                     "message_count": task.message_count,
                     "file_name": task.file_name,
                     "output_path": output_path,
-                })
-
+                }
             except Exception as e:
-                if on_error:
-                    on_error(target_id, e)
+                fail(index, target, e)
 
+        results = {
+            "success": 0,
+            "failed": 0,
+            "total_messages": 0,
+            "results": entries,
+        }
+        for entry in entries:
+            if entry["status"] == "success":
+                results["success"] += 1
+                results["total_messages"] += entry["message_count"]
+            else:
                 results["failed"] += 1
-                results["results"].append({
-                    "id": target_id,
-                    "type": target_type,
-                    "status": "failed",
-                    "error": str(e),
-                })
 
         return results
+
+    def _move_export_file(self, task: ExportTask, output_dir: Optional[str]) -> Optional[str]:
+        """把导出文件移动到输出目录，返回新路径；未移动时返回 None"""
+        import os
+        import shutil
+
+        if not output_dir or not task.file_name:
+            return None
+
+        user_profile = os.environ.get("USERPROFILE", os.path.expanduser("~"))
+        src_path = os.path.join(user_profile, ".qq-chat-exporter", "exports", task.file_name)
+        if not os.path.exists(src_path):
+            return None
+
+        output_path = os.path.join(output_dir, task.file_name)
+        shutil.move(src_path, output_path)
+        return output_path
@@ -0,0 +1,254 @@
+"""
+NapCat-QCE 指标
+==============
+
+无依赖的计数器和直方图，按 Prometheus 文本格式 (text exposition format 0.0.4) 导出。
+同步和异步客户端默认把请求耗时记录到全局注册表，应用可以在同一个注册表中登记自己的指标，
+再通过 HTTP 接口（例如 /metrics）输出 render() 的结果。
+
+Example:
+    >>> from napcat_qce.metrics import get_registry
+    >>> client = NapCatQCE(token="...")
+    >>> client.groups.get_all()
+    >>> print(get_registry().render())
+"""
+
+import bisect
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+# 默认的耗时分桶（秒），覆盖本地接口的毫秒级响应到 AI 接口的分钟级响应
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+# NapCat-QCE 接口路径中的固定段，其余段（群号、UID、任务 ID、文件名等）归并为 :id，避免标签基数无限增长
+_STATIC_SEGMENTS = frozenset({
+    "api", "groups", "members", "friends", "users", "messages", "fetch", "export",
+    "tasks", "original-files", "scheduled-exports", "history", "trigger",
+    "sticker-packs", "export-all", "export-records", "exports", "files", "info",
+    "system", "status", "security-status", "auth", "health",
+})
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """
+    把接口路径转换为低基数的指标标签
+
+    Example:
+        >>> normalize_endpoint("/api/groups/123456/members?page=1")
+        '/api/groups/:id/members'
+    """
+    path = endpoint.split("?", 1)[0]
+    segments = [
+        segment if not segment or segment in _STATIC_SEGMENTS else ":id"
+        for segment in path.split("/")
+    ]
+    return "/".join(segments)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类，按标签值分别统计"""
+
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+    def _samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    只增不减的计数器
+
+    Example:
+        >>> rows = registry.counter("ingest_rows_total", "入库消息数", ("result",))
+        >>> rows.inc(30, result="inserted")
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """增加计数，amount 不能为负数"""
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        """读取某组标签的当前值"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """
+    直方图，记录观测值的分桶计数、总和和次数
+
+    Example:
+        >>> latency = registry.histogram("request_duration_seconds", "请求耗时", ("endpoint",))
+        >>> latency.observe(0.12, endpoint="/api/groups")
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数（非累计）..., 超出最大分桶的计数], 总和, 次数
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """记录一次观测值"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def get(self, **labels) -> Tuple[float, int]:
+        """读取某组标签的 (总和, 次数)"""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return (entry[1], entry[2]) if entry else (0.0, 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    同名指标只创建一次，多个客户端实例共用同一组指标。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已以不同的类型或标签注册")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        """获取或创建计数器"""
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """获取或创建直方图"""
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式输出所有指标"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """全局指标注册表，客户端未指定 metrics 参数时使用"""
+    return _registry
+
+
+class RequestMetrics:
+    """客户端请求指标：按方法、接口和状态码统计耗时，以及重试次数"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        registry = registry or get_registry()
+        self.duration = registry.histogram(
+            "napcat_qce_request_duration_seconds",
+            "NapCat-QCE API 请求耗时（含重试），status 为 HTTP 状态码或 error（未收到响应）",
+            ("method", "endpoint", "status"),
+        )
+        self.retries = registry.counter(
+            "napcat_qce_request_retries_total",
+            "NapCat-QCE API 请求重试次数",
+            ("method", "endpoint"),
+        )
+
+    def observe(self, method: str, endpoint: str, status, seconds: float, retries: int = 0) -> None:
+        """记录一次请求"""
+        endpoint = normalize_endpoint(endpoint)
+        self.duration.observe(seconds, method=method, endpoint=endpoint, status=status)
+        if retries:
+            self.retries.inc(retries, method=method, endpoint=endpoint)
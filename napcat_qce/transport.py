@@ -0,0 +1,85 @@
+"""
+NapCat-QCE 传输层配置
+====================
+
+连接池、超时和重试策略，同步与异步客户端共用。
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass
+class TransportConfig:
+    """
+    HTTP 传输配置
+
+    重试只针对幂等请求（GET/HEAD/OPTIONS）：连接失败、超时，
+    以及服务器返回 429/502/503 时按指数退避加随机抖动重试。
+    创建导出任务等 POST 请求不会被重试，避免重复提交。
+
+    Example:
+        >>> transport = TransportConfig(pool_size=20, max_connections_per_host=50, max_retries=5)
+        >>> client = NapCatQCE(token="...", transport=transport)
+    """
+
+    # 连接池
+    pool_size: int = 10  # 保留连接池的主机数
+    max_connections_per_host: int = 20  # 每个主机的最大连接数
+
+    # 超时（秒）
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+
+    # 重试
+    max_retries: int = 3
+    backoff_factor: float = 0.5  # 第 n 次重试前最多等待 backoff_factor * 2^n 秒
+    backoff_max: float = 10.0
+    retry_status_codes: Tuple[int, ...] = (429, 502, 503)
+    retry_methods: Tuple[str, ...] = ("GET", "HEAD", "OPTIONS")
+
+    @property
+    def total_connections(self) -> int:
+        """所有主机合计的最大连接数（异步客户端的总连接上限），不小于单个主机的上限"""
+        return max(self.pool_size, 1) * self.max_connections_per_host
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """requests 使用的 (连接超时, 读取超时)"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def can_retry(self, method: str, attempt: int) -> bool:
+        """
+        判断请求是否还能重试
+
+        Args:
+            method: HTTP 方法
+            attempt: 已经重试的次数
+        """
+        return method.upper() in self.retry_methods and attempt < self.max_retries
+
+    def should_retry_status(self, method: str, status_code: int, attempt: int) -> bool:
+        """判断某个响应状态码是否需要重试"""
+        return status_code in self.retry_status_codes and self.can_retry(method, attempt)
+
+    def get_backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        计算第 attempt 次重试前的等待时间（full jitter）
+
+        Args:
+            attempt: 已经重试的次数
+            retry_after: 响应头 Retry-After 的值（秒），存在时至少等待该时间
+
+        Returns:
+            等待秒数
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+
+        return delay
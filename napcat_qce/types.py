@@ -7,7 +7,7 @@ NapCat-QCE 类型定义
 
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence
 from datetime import datetime
 
 
@@ -215,13 +215,36 @@ class Message:
     raw_data: Optional[Dict[str, Any]] = None
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> "Message":
+    def from_dict(
+        cls,
+        data: Dict[str, Any],
+        keep_raw: bool = True,
+        raw_fields: Optional[Sequence[str]] = None,
+    ) -> "Message":
+        """
+        从 API 返回的字典创建消息
+
+        Args:
+            data: 消息字典
+            keep_raw: 是否在 raw_data 中保留原始字典
+            raw_fields: 只在 raw_data 中保留这些字段（指定时忽略 keep_raw）
+        """
+        if raw_fields is not None:
+            raw_data = {k: data[k] for k in raw_fields if k in data}
+        elif keep_raw:
+            raw_data = data
+        else:
+            raw_data = None
+
+        # 只有保留完整原始数据时元素才另外引用原始字典
+        keep_elem_raw = raw_fields is None and keep_raw
+
         elements = []
         for elem in data.get("elements", []):
             elements.append(MessageElement(
                 type=elem.get("elementType", "unknown"),
                 content=elem,
-                raw_data=elem,
+                raw_data=elem if keep_elem_raw else None,
             ))
 
         return cls(
@@ -233,7 +256,7 @@ class Message:
             sender_name=data.get("sendNickName"),
             sender_member_name=data.get("sendMemberName"),
             elements=elements,
-            raw_data=data,
+            raw_data=raw_data,
         )
 
 
@@ -5,12 +5,16 @@ NapCat-QCE WebSocket 客户端
 提供实时事件监听和流式搜索功能。
 """
 
+import dataclasses
 import json
 import threading
 import time
 from typing import Optional, Dict, Any, Callable, List
 from enum import Enum
 
+from .types import ExportTask, TaskStatus
+from .exceptions import NapCatQCEError
+
 try:
     import websocket
     HAS_WEBSOCKET = True
@@ -327,6 +331,7 @@ class ExportProgressMonitor:
         self._ws_client = WebSocketClient(host=host, port=port, auto_reconnect=True)
         self._tasks: Dict[str, Dict[str, Any]] = {}
         self._task_events: Dict[str, threading.Event] = {}
+        self._progress_handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
         self._lock = threading.Lock()
 
         # 注册处理器
@@ -337,13 +342,22 @@ class ExportProgressMonitor:
     def _handle_progress(self, data: Dict[str, Any]):
         task_id = data.get("taskId")
         if task_id:
+            status = {
+                "status": "running",
+                "progress": data.get("progress", 0),
+                "message": data.get("message", ""),
+                "message_count": data.get("messageCount", 0),
+            }
             with self._lock:
-                self._tasks[task_id] = {
-                    "status": "running",
-                    "progress": data.get("progress", 0),
-                    "message": data.get("message", ""),
-                    "message_count": data.get("messageCount", 0),
-                }
+                self._tasks[task_id] = status
+                handlers = list(self._progress_handlers.get(task_id, []))
+
+            # 进度回调直接在事件线程中调用
+            for handler in handlers:
+                try:
+                    handler(status)
+                except Exception as e:
+                    print(f"[WebSocket] 进度回调错误 ({task_id}): {e}")
 
     def _handle_complete(self, data: Dict[str, Any]):
         task_id = data.get("taskId")
@@ -405,28 +419,25 @@ class ExportProgressMonitor:
         Raises:
             TimeoutError: 超时
         """
-        event = threading.Event()
         with self._lock:
-            self._task_events[task_id] = event
-
-        # 进度轮询
-        if on_progress:
-            def poll_progress():
-                while not event.is_set():
-                    status = self.get_task_status(task_id)
-                    if status:
-                        on_progress(status)
-                    time.sleep(1)
+            status = self._tasks.get(task_id)
+            if status and status["status"] in ("completed", "failed"):
+                return status
 
-            poll_thread = threading.Thread(target=poll_progress, daemon=True)
-            poll_thread.start()
+            event = self._task_events.setdefault(task_id, threading.Event())
+            if on_progress:
+                self._progress_handlers.setdefault(task_id, []).append(on_progress)
 
-        # 等待完成
-        if not event.wait(timeout):
-            raise TimeoutError(f"等待任务 {task_id} 超时")
+        try:
+            # 等待完成
+            if not event.wait(timeout):
+                raise TimeoutError(f"等待任务 {task_id} 超时")
+        finally:
+            with self._lock:
+                self._task_events.pop(task_id, None)
+                self._progress_handlers.pop(task_id, None)
 
         with self._lock:
-            del self._task_events[task_id]
             return self._tasks.get(task_id, {"status": "unknown"})
 
     def __enter__(self) -> "ExportProgressMonitor":
@@ -435,3 +446,312 @@ class ExportProgressMonitor:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.stop()
+
+
+class _TaskWatch:
+    """单个任务的等待状态，同一任务的多个等待者共用"""
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.task: Optional[ExportTask] = None
+        self.event = threading.Event()
+        self.refs = 0
+        self.max_interval: Optional[float] = None
+        self.progress_handlers: List[Callable[[ExportTask], None]] = []
+        self.done_handlers: List[Callable[[ExportTask], None]] = []
+
+
+# 回退轮询的初始间隔和最大间隔（秒），异步客户端等待任务时使用相同的退避
+DEFAULT_MIN_POLL_INTERVAL = 0.25
+DEFAULT_MAX_POLL_INTERVAL = 4.0
+
+
+class TaskCompletionNotifier:
+    """
+    导出任务完成通知器
+
+    多个等待者共用一个 WebSocket 连接和一个后台轮询线程：
+
+    - WebSocket 已连接时，由 export_progress / export_complete / export_error
+      事件推进任务状态，轮询只作为低频兜底（ws_poll_interval）
+    - WebSocket 不可用或断开时，所有进行中的任务通过一次任务列表请求统一查询，
+      间隔从 min_interval 开始指数增长到 max_interval，有新任务加入时重置
+
+    进度和完成回调在事件线程或轮询线程中调用，不为每个等待者创建线程。
+    一般通过 client.task_notifier 使用，TasksAPI.wait_for_completion 和
+    batch_export 都基于它。
+
+    Example:
+        >>> task = client.messages.export(...)
+        >>> task = client.task_notifier.wait(task.id, timeout=300)
+    """
+
+    def __init__(
+        self,
+        client,
+        use_websocket: Optional[bool] = None,
+        min_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+        max_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        ws_poll_interval: float = 30.0,
+    ):
+        """
+        初始化通知器
+
+        Args:
+            client: NapCatQCE 客户端
+            use_websocket: 是否使用 WebSocket 事件，默认在安装了 websocket-client 时使用
+            min_interval: 回退轮询的初始间隔（秒）
+            max_interval: 回退轮询的最大间隔（秒）
+            ws_poll_interval: WebSocket 已连接时的兜底轮询间隔（秒）
+        """
+        self._client = client
+        self.use_websocket = HAS_WEBSOCKET if use_websocket is None else use_websocket
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.ws_poll_interval = ws_poll_interval
+
+        self._ws: Optional[WebSocketClient] = None
+        self._poller: Optional[threading.Thread] = None
+        self._watches: Dict[str, _TaskWatch] = {}
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        # 每个轮询线程有自己的停止和唤醒事件，close() 后重新启动时旧线程不会继续轮询
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    @property
+    def websocket_connected(self) -> bool:
+        """WebSocket 是否已连接"""
+        return self._ws is not None and self._ws.is_connected
+
+    def watch(
+        self,
+        task_id: str,
+        on_progress: Optional[Callable[[ExportTask], None]] = None,
+        on_done: Optional[Callable[[ExportTask], None]] = None,
+        max_interval: Optional[float] = None,
+    ) -> _TaskWatch:
+        """
+        开始跟踪任务
+
+        每次 watch 都应对应一次 unwatch（任务结束后 unwatch 不会有副作用）。
+
+        Args:
+            task_id: 任务 ID
+            on_progress: 状态更新回调，任务结束时也会调用一次
+            on_done: 任务结束（完成、失败或取消）回调
+            max_interval: 回退轮询间隔的上限（秒）
+
+        Returns:
+            任务的等待状态，event 在任务结束时被设置，task 为最新的任务状态
+        """
+        self._start()
+
+        with self._lock:
+            watch = self._watches.get(task_id)
+            if watch is None:
+                watch = self._watches[task_id] = _TaskWatch(task_id)
+            watch.refs += 1
+            if on_progress:
+                watch.progress_handlers.append(on_progress)
+            if on_done:
+                watch.done_handlers.append(on_done)
+            if max_interval:
+                watch.max_interval = min(watch.max_interval or max_interval, max_interval)
+
+        # 立即查询一次，避免错过注册之前发生的事件
+        self._wakeup.set()
+        return watch
+
+    def unwatch(
+        self,
+        task_id: str,
+        on_progress: Optional[Callable[[ExportTask], None]] = None,
+        on_done: Optional[Callable[[ExportTask], None]] = None,
+    ):
+        """停止跟踪任务，并移除 watch 时注册的回调"""
+        with self._lock:
+            watch = self._watches.get(task_id)
+            if watch is None:
+                return
+
+            if on_progress in watch.progress_handlers:
+                watch.progress_handlers.remove(on_progress)
+            if on_done in watch.done_handlers:
+                watch.done_handlers.remove(on_done)
+
+            watch.refs -= 1
+            if watch.refs <= 0:
+                del self._watches[task_id]
+
+    def wait(
+        self,
+        task_id: str,
+        timeout: float = 300,
+        on_progress: Optional[Callable[[ExportTask], None]] = None,
+        max_interval: Optional[float] = None,
+    ) -> ExportTask:
+        """
+        等待任务结束
+
+        Args:
+            task_id: 任务 ID
+            timeout: 超时时间（秒）
+            on_progress: 状态更新回调
+            max_interval: 回退轮询间隔的上限（秒）
+
+        Returns:
+            结束时的任务（状态为 completed、failed 或 cancelled）
+
+        Raises:
+            TimeoutError: 超时
+        """
+        watch = self.watch(task_id, on_progress=on_progress, max_interval=max_interval)
+        try:
+            if not watch.event.wait(timeout):
+                raise TimeoutError(f"等待任务完成超时: {task_id}")
+            return watch.task
+        finally:
+            self.unwatch(task_id, on_progress=on_progress)
+
+    def close(self):
+        """关闭 WebSocket 连接并停止轮询线程"""
+        self._stop.set()
+        self._wakeup.set()
+        self._poller = None
+        if self._ws:
+            self._ws.disconnect()
+            self._ws = None
+
+    def _start(self):
+        """首次使用时启动轮询线程和 WebSocket 连接"""
+        if self._poller is not None:
+            return
+
+        with self._start_lock:
+            if self._poller is not None:
+                return
+
+            if self.use_websocket:
+                try:
+                    ws = WebSocketClient(
+                        host=self._client.host,
+                        port=self._client.port,
+                        token=self._client.token,
+                        auto_reconnect=True,
+                    )
+                    ws.on_export_progress(self._handle_progress)
+                    ws.on_export_complete(self._handle_complete)
+                    ws.on_export_error(self._handle_error)
+                    ws.connect()
+                    self._ws = ws
+                except Exception as e:
+                    print(f"[WebSocket] 无法订阅任务事件，使用轮询: {e}")
+
+            self._stop = threading.Event()
+            self._wakeup = threading.Event()
+            self._poller = threading.Thread(
+                target=self._poll_loop, args=(self._stop, self._wakeup), daemon=True
+            )
+            self._poller.start()
+
+    def _poll_loop(self, stop: threading.Event, wakeup: threading.Event):
+        """共享轮询线程，stop 被设置后退出"""
+        interval = self.min_interval
+
+        while not stop.is_set():
+            with self._lock:
+                task_ids = list(self._watches)
+                caps = [w.max_interval for w in self._watches.values() if w.max_interval]
+
+            if not task_ids:
+                wakeup.wait()
+                wakeup.clear()
+                interval = self.min_interval
+                continue
+
+            try:
+                tasks = self._client.tasks.poll(task_ids)
+            except NapCatQCEError as e:
+                print(f"[TaskNotifier] 查询任务状态失败: {e}")
+                tasks = {}
+
+            if stop.is_set():
+                return
+
+            for task in tasks.values():
+                self._update(task)
+
+            if self.websocket_connected:
+                delay = self.ws_poll_interval
+            else:
+                delay = interval
+                interval = min(interval * 2, min([self.max_interval] + caps))
+
+            if wakeup.wait(delay):
+                wakeup.clear()
+                interval = self.min_interval
+
+    def _update(self, task: ExportTask):
+        """记录任务的最新状态并调用回调"""
+        with self._lock:
+            watch = self._watches.get(task.id)
+            if watch is None:
+                return
+
+            finished = task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+            if not finished and watch.task is not None and (
+                watch.task.status == task.status and watch.task.progress == task.progress
+            ):
+                return
+
+            watch.task = task
+            if finished:
+                del self._watches[task.id]
+            progress_handlers = list(watch.progress_handlers)
+            done_handlers = list(watch.done_handlers) if finished else []
+
+        for handler in progress_handlers + done_handlers:
+            try:
+                handler(task)
+            except Exception as e:
+                print(f"[TaskNotifier] 回调错误 ({task.id}): {e}")
+
+        if finished:
+            watch.event.set()
+
+    def _apply_event(self, data: Dict[str, Any], status: TaskStatus, **changes):
+        """把 WebSocket 事件合并到任务的已知状态上"""
+        task_id = data.get("taskId")
+        if not task_id:
+            return
+
+        with self._lock:
+            watch = self._watches.get(task_id)
+            if watch is None:
+                return
+            task = watch.task or ExportTask.from_dict({"id": task_id})
+
+        self._update(dataclasses.replace(task, status=status, **changes))
+
+    def _handle_progress(self, data: Dict[str, Any]):
+        self._apply_event(
+            data,
+            TaskStatus.RUNNING,
+            progress=data.get("progress", 0),
+            message_count=data.get("messageCount", 0),
+        )
+
+    def _handle_complete(self, data: Dict[str, Any]):
+        self._apply_event(
+            data,
+            TaskStatus.COMPLETED,
+            progress=100,
+            message_count=data.get("messageCount", 0),
+            file_name=data.get("fileName"),
+            file_path=data.get("filePath"),
+            download_url=data.get("downloadUrl"),
+        )
+
+    def _handle_error(self, data: Dict[str, Any]):
+        self._apply_event(data, TaskStatus.FAILED, error=data.get("error", "未知错误"))
@@ -0,0 +1,118 @@
+"""
+AI 响应缓存 - 按 (模型, temperature, 提示词哈希) 缓存 AI 返回的内容
+
+缓存保存在数据目录下单独的 SQLite 文件中（默认 data/ai_cache.db），
+与业务数据库分开，分段总结的工作线程无需应用上下文即可读写。
+同一时间窗口被手动总结、自动任务和每日总结重复处理时，直接返回缓存结果，不消耗 token。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class AIResponseCache:
+    """AI 响应缓存，支持过期时间和条目数上限（按最近使用淘汰）"""
+
+    def __init__(self, path, ttl=7 * 86400, max_entries=5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS ai_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_ai_responses_last_used ON ai_responses (last_used_at)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def make_key(model, temperature, messages):
+        """缓存键：模型、temperature 和完整提示词的 SHA-256"""
+        raw = json.dumps([model, temperature, messages], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """读取缓存，不存在或已过期时返回 None"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                'SELECT response, created_at FROM ai_responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl and row[1] < now - self.ttl:
+                conn.execute('DELETE FROM ai_responses WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE ai_responses SET last_used_at = ? WHERE key = ?', (now, key))
+            return row[0]
+
+    def set(self, key, response, model=None):
+        """写入缓存，并淘汰过期和超出上限的条目"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO ai_responses (key, model, response, created_at, last_used_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, model, response, now, now)
+            )
+            if self.ttl:
+                conn.execute('DELETE FROM ai_responses WHERE created_at < ?', (now - self.ttl,))
+            if self.max_entries:
+                conn.execute(
+                    'DELETE FROM ai_responses WHERE key IN ('
+                    'SELECT key FROM ai_responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+
+    def delete(self, key):
+        """删除一条缓存"""
+        with self._lock, self._connect() as conn:
+            conn.execute('DELETE FROM ai_responses WHERE key = ?', (key,))
+
+    def clear(self):
+        """清空缓存，返回删除的条目数"""
+        with self._lock, self._connect() as conn:
+            return conn.execute('DELETE FROM ai_responses').rowcount
+
+    def stats(self):
+        """缓存条目数和文件大小"""
+        with self._lock, self._connect() as conn:
+            count = conn.execute('SELECT COUNT(*) FROM ai_responses').fetchone()[0]
+        return {
+            'entries': count,
+            'size_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+
+def get_cache(config):
+    """按配置获取共用的缓存实例，AI_CACHE_ENABLED 关闭时返回 None"""
+    if not config.get('AI_CACHE_ENABLED', True):
+        return None
+
+    path = config.get('AI_CACHE_PATH') or os.path.join(
+        config.get('DATA_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'),
+        'ai_cache.db'
+    )
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cache = AIResponseCache(
+                path,
+                ttl=config.get('AI_CACHE_TTL', 7 * 86400),
+                max_entries=config.get('AI_CACHE_MAX_ENTRIES', 5000)
+            )
+            _caches[path] = cache
+        return cache
@@ -0,0 +1,347 @@
+"""
+AI 接口传输层 - 连接池、限流、重试和熔断
+
+同一个 AI 端点的所有 AIService 实例共用一个 AIHttpClient：
+- 持久的 requests.Session 复用 TLS 连接，避免每次调用重新握手
+- 令牌桶按 每分钟请求数 / 每分钟 token 数 限流，在本地排队而不是被服务商 429
+- 同时进行中的请求数有上限，多个聊天和分段并发调用时不会超出服务商的并发限制
+- 429、5xx 和网络错误按指数退避重试，优先遵循 Retry-After
+- 连续失败达到阈值后熔断，熔断期间直接失败，不再每个聊天等待一次超时
+"""
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class AIAPIError(Exception):
+    """AI 接口调用失败"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(AIAPIError):
+    """熔断中，请求未发出"""
+
+
+def estimate_tokens(text):
+    """粗略估算文本的 token 数：中文等非 ASCII 字符约 1 个 token，ASCII 约 4 个字符 1 个 token"""
+    non_ascii = sum(1 for c in text if ord(c) > 127)
+    return non_ascii + (len(text) - non_ascii) // 4 + 1
+
+
+@dataclass
+class AIClientConfig:
+    """AI 接口传输配置，0 表示不限流"""
+
+    connect_timeout: float = 10.0
+    read_timeout: float = 60.0
+    pool_size: int = 10
+    max_concurrency: int = 8  # 同时进行中的请求数上限，0 表示不限
+
+    max_retries: int = 3
+    backoff_factor: float = 1.0  # 第 n 次重试前最多等待 backoff_factor * 2^n 秒
+    backoff_max: float = 30.0
+    retry_status_codes: tuple = (429, 500, 502, 503, 504)
+
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+
+    breaker_threshold: int = 5  # 连续失败多少次后熔断
+    breaker_reset: float = 60.0  # 熔断持续秒数，之后放行一次试探请求
+
+    @classmethod
+    def from_config(cls, config):
+        """从 Flask 配置读取"""
+        return cls(
+            connect_timeout=config.get('AI_CONNECT_TIMEOUT', cls.connect_timeout),
+            read_timeout=config.get('AI_READ_TIMEOUT', cls.read_timeout),
+            max_concurrency=config.get('AI_MAX_CONCURRENCY', cls.max_concurrency),
+            max_retries=config.get('AI_MAX_RETRIES', cls.max_retries),
+            requests_per_minute=config.get('AI_RPM', cls.requests_per_minute),
+            tokens_per_minute=config.get('AI_TPM', cls.tokens_per_minute),
+            breaker_threshold=config.get('AI_BREAKER_THRESHOLD', cls.breaker_threshold),
+            breaker_reset=config.get('AI_BREAKER_RESET', cls.breaker_reset),
+        )
+
+    def get_backoff(self, attempt, retry_after=None):
+        """计算第 attempt 次重试前的等待时间，有 Retry-After 时至少等待该时间"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+        wait = parse_retry_after(retry_after)
+        if wait is not None:
+            delay = max(delay, min(wait, self.backoff_max))
+        return delay
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """令牌桶，容量为每分钟的配额，按秒匀速补充"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """取出 amount 个令牌，不足时阻塞等待；超过容量的请求按容量计算，避免永远等不到"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def consume(self, amount):
+        """不等待地扣除令牌（可以扣成负数），用于按实际用量修正预估"""
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+
+
+class CircuitBreaker:
+    """熔断器：连续失败 threshold 次后打开，reset_timeout 秒后放行一次试探请求"""
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """请求前检查，熔断中抛出 CircuitOpenError"""
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(f"AI API 连续失败，已熔断，{max(remaining, 0):.0f} 秒后重试")
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.threshold > 0 and self.failures >= self.threshold):
+                if self.opened_at is None or self._trial:
+                    print(f"AI API 连续失败 {self.failures} 次，熔断 {self.reset_timeout:.0f} 秒")
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+
+class AIHttpClient:
+    """一个 AI 端点的 HTTP 客户端"""
+
+    def __init__(self, config=None):
+        self.config = config or AIClientConfig()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=max(self.config.pool_size, self.config.max_concurrency))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.request_bucket = TokenBucket(self.config.requests_per_minute) \
+            if self.config.requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(self.config.tokens_per_minute) \
+            if self.config.tokens_per_minute > 0 else None
+        self.breaker = CircuitBreaker(self.config.breaker_threshold, self.config.breaker_reset)
+        self.slots = threading.BoundedSemaphore(self.config.max_concurrency) \
+            if self.config.max_concurrency > 0 else None
+
+    def post_json(self, url, headers, payload, estimated_tokens=0):
+        """发送 POST 请求并返回 JSON 响应
+
+        Args:
+            url: 接口地址
+            headers: 请求头
+            payload: 请求体
+            estimated_tokens: 预估的 token 数，用于每分钟 token 限流
+
+        Raises:
+            CircuitOpenError: 熔断中
+            AIAPIError: 重试后仍然失败
+        """
+        response = self._post(url, headers, payload, estimated_tokens)
+        parsed = False
+        try:
+            result = response.json()
+            parsed = True
+        except ValueError as e:
+            raise AIAPIError(f"AI API 返回的不是 JSON: {response.text[:200]}") from e
+        finally:
+            self._settle(parsed)
+        self._record_usage(result.get('usage'), estimated_tokens)
+        return result
+
+    def post_stream(self, url, headers, payload, estimated_tokens=0):
+        """以流式模式（stream: true）发送请求，逐个产出增量内容
+
+        只在收到响应之前重试；开始产出内容后出错直接抛出，避免重复输出。
+
+        Yields:
+            每个 SSE 数据块中 choices[0].delta.content 的文本
+        """
+        payload = dict(payload, stream=True)
+        response = self._post(url, headers, payload, estimated_tokens, stream=True)
+
+        ok = False
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                if chunk.get('usage'):
+                    self._record_usage(chunk['usage'], estimated_tokens)
+                for choice in chunk.get('choices') or []:
+                    content = (choice.get('delta') or {}).get('content')
+                    if content:
+                        yield content
+            ok = True
+        except GeneratorExit:
+            # 调用方提前关闭，服务商已经正常返回了内容
+            ok = True
+            raise
+        except (requests.RequestException, ValueError) as e:
+            raise AIAPIError(f"AI API 流式响应中断: {e}") from e
+        finally:
+            response.close()
+            self._settle(ok)
+
+    def _post(self, url, headers, payload, estimated_tokens, stream=False):
+        """限流后发送请求，按需重试，返回状态码为 200 的响应
+
+        返回响应时由调用方在读取响应体后记录熔断结果，其余情况（包括意外异常）在这里记录，
+        保证熔断器的试探请求一定会有结果，不会一直处于熔断状态。
+        """
+        self.breaker.before_call()
+        settled = False
+        try:
+            response = self._send(url, headers, payload, estimated_tokens, stream)
+            if response.status_code != 200:
+                # 4xx（密钥错误、参数错误等）是请求本身的问题，说明服务商可达，不计入熔断
+                self._settle(response.status_code not in self.config.retry_status_codes)
+                settled = True
+                raise AIAPIError(
+                    f"AI API 调用失败: {response.status_code} - {response.text}",
+                    status_code=response.status_code
+                )
+            settled = True
+            return response
+        finally:
+            if not settled:
+                self.breaker.record_failure()
+
+    def _send(self, url, headers, payload, estimated_tokens, stream):
+        """限流后发送请求，429、5xx 和网络错误按指数退避重试，返回最后一次的响应
+
+        每次发送（包括重试）都占用一次每分钟请求数配额；被拒绝或失败的请求不消耗 token，
+        每分钟 token 数只在第一次发送前扣除一次。
+        """
+        if self.token_bucket and estimated_tokens:
+            self.token_bucket.acquire(estimated_tokens)
+
+        config = self.config
+        attempt = 0
+        while True:
+            if self.request_bucket:
+                self.request_bucket.acquire()
+            try:
+                # 只在发出请求期间占用并发名额，退避等待时释放；流式请求只覆盖到收到响应头
+                if self.slots:
+                    self.slots.acquire()
+                try:
+                    response = self.session.post(
+                        url, headers=headers, json=payload, stream=stream,
+                        timeout=(config.connect_timeout, config.read_timeout)
+                    )
+                finally:
+                    if self.slots:
+                        self.slots.release()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt < config.max_retries:
+                    time.sleep(config.get_backoff(attempt))
+                    attempt += 1
+                    continue
+                raise AIAPIError(f"AI API 请求失败: {e}") from e
+            except requests.RequestException as e:
+                raise AIAPIError(f"AI API 请求失败: {e}") from e
+
+            if response.status_code in config.retry_status_codes and attempt < config.max_retries:
+                delay = config.get_backoff(attempt, response.headers.get('Retry-After'))
+                print(f"AI API 返回 {response.status_code}，{delay:.1f} 秒后重试")
+                response.close()
+                time.sleep(delay)
+                attempt += 1
+                continue
+            return response
+
+    def _settle(self, ok):
+        """记录一次请求的熔断结果"""
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def _record_usage(self, usage, estimated_tokens):
+        """按服务商返回的实际用量修正每分钟 token 限流"""
+        if self.token_bucket and usage and usage.get('total_tokens'):
+            self.token_bucket.consume(usage['total_tokens'] - estimated_tokens)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(endpoint, config=None):
+    """获取端点共用的客户端，不同端点（服务商）的限流和熔断互不影响"""
+    with _clients_lock:
+        client = _clients.get(endpoint)
+        if client is None or (config is not None and client.config != config):
+            client = AIHttpClient(config)
+            _clients[endpoint] = client
+        return client
@@ -2,21 +2,212 @@
 AI 服务 - 调用 AI API 进行总结和任务分析
 """
 import json
-import requests
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from flask import current_app, has_app_context
+
+from ai_cache import get_cache
+from ai_client import AIClientConfig, CircuitOpenError, estimate_tokens, get_client
+from metrics import AI_CACHE_REQUESTS, observe_ai_request
+
+# 分段总结的默认参数，可通过配置 AI_SUMMARY_CHUNK_TOKENS / AI_MAX_WORKERS 覆盖
+DEFAULT_CHUNK_TOKENS = 6000
+DEFAULT_MAX_WORKERS = 4
+
+# 分段总结缓存的最大条目数
+CHUNK_CACHE_SIZE = 512
+
+SUMMARY_SYSTEM_PROMPT = '你是一个专业的聊天记录分析助手，擅长提取关键信息并进行总结。'
+
+
+class ChunkSummaryCache:
+    """分段总结的内存 LRU 缓存
+
+    键为 (模型, 聊天 id, 首条消息 id, 末条消息 id, 消息数)，
+    同一时间窗口重复总结或窗口部分重叠时，已总结过的分段不再调用 AI。
+    """
+
+    def __init__(self, max_size=CHUNK_CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+chunk_cache = ChunkSummaryCache()
+
+
+def merge_tasks(tasks):
+    """合并多段提取的任务，按标题去重
+
+    标题忽略大小写和空白后相同视为同一任务，保留优先级最高（数值最小）的一条，
+    缺失的截止时间和描述用重复项补齐。
+    """
+    merged = {}
+    for task in tasks:
+        if not isinstance(task, dict) or not task.get('title'):
+            continue
+        key = ''.join(str(task['title']).split()).lower()
+        if key not in merged:
+            merged[key] = dict(task)
+            continue
+        if _priority(task) < _priority(merged[key]):
+            merged[key], task = dict(task), merged[key]
+        kept = merged[key]
+        for field in ('deadline', 'description', 'source_message', 'analysis'):
+            if not kept.get(field) and task.get(field):
+                kept[field] = task[field]
+    return list(merged.values())
+
+
+def _priority(task):
+    try:
+        return int(task.get('priority', 3))
+    except (TypeError, ValueError):
+        return 3
+
+
+def _outcome(error):
+    """AI 调用失败的指标标签：熔断中未发出请求，或请求失败"""
+    return 'circuit_open' if isinstance(error, CircuitOpenError) else 'error'
+
 
 class AIService:
     """AI 服务类"""
 
-    def __init__(self, settings):
+    def __init__(self, settings, chunk_tokens=None, max_workers=None, use_cache=True):
+        """
+        Args:
+            settings: Settings 对象
+            chunk_tokens: 分段总结每段的 token 预算，默认读取配置
+            max_workers: 分段并发请求数，默认读取配置
+            use_cache: 为 False 时不读取缓存（结果仍会写入缓存），用于强制重新生成
+        """
         self.settings = settings
         self.endpoint = settings.ai_endpoint
         self.api_key = settings.ai_api_key
         self.model = settings.ai_model
 
-    def _call_api(self, messages, temperature=0.7):
-        """调用 AI API"""
+        config = current_app.config if has_app_context() else {}
+        self.chunk_tokens = chunk_tokens or config.get('AI_SUMMARY_CHUNK_TOKENS', DEFAULT_CHUNK_TOKENS)
+        self.max_workers = max_workers or config.get('AI_MAX_WORKERS', DEFAULT_MAX_WORKERS)
+        # 同一端点的实例共用连接池、限流和熔断状态
+        self.client = get_client(self.endpoint, AIClientConfig.from_config(config))
+        self.cache = get_cache(config)
+        self.use_cache = use_cache
+        # 本实例调用 AI 消耗的 token 数（命中缓存不计），分段并发调用时由多个线程累加
+        self.tokens_used = 0
+        self._tokens_lock = threading.Lock()
+
+    def _call_api(self, messages, temperature=0.7, use_cache=None, parse=None):
+        """调用 AI API，相同的模型、temperature 和提示词优先返回缓存结果
+
+        Args:
+            parse: 解析回复的函数，返回解析结果；解析失败时抛出 ValueError 且回复不写入缓存，
+                避免同一个无效回复在之后的重试中被反复读出
+        """
+        if use_cache is None:
+            use_cache = self.use_cache
+        key = None
+        if self.cache:
+            key = self.cache.make_key(self.model, temperature, messages)
+            if use_cache:
+                cached = self._cache_get(key)
+                if cached is not None:
+                    if not parse:
+                        return cached
+                    try:
+                        return parse(cached)
+                    except ValueError:
+                        # 无法解析的旧缓存，删除后重新请求
+                        self.cache.delete(key)
+
+        headers, data, estimated = self._build_request(messages, temperature)
+        start = time.perf_counter()
+        try:
+            result = self.client.post_json(self.endpoint, headers, data, estimated_tokens=estimated)
+        except Exception as e:
+            observe_ai_request(self.model, 'json', _outcome(e), time.perf_counter() - start)
+            raise
+        content = result['choices'][0]['message']['content']
+
+        usage = result.get('usage') or {}
+        prompt_tokens = usage.get('prompt_tokens') or estimated
+        completion_tokens = usage.get('completion_tokens') or estimate_tokens(content)
+        observe_ai_request(self.model, 'json', 'success', time.perf_counter() - start,
+                           prompt_tokens, completion_tokens)
+        self._add_tokens(usage.get('total_tokens') or prompt_tokens + completion_tokens)
+
+        result = parse(content) if parse else content
+        if key:
+            self.cache.set(key, content, model=self.model)
+        return result
+
+    def _stream_api(self, messages, temperature=0.7):
+        """以流式模式调用 AI API，逐段产出生成的文本
+
+        命中缓存时一次性产出缓存内容；完整生成后写入缓存，中途出错则不缓存。
+        """
+        key = None
+        if self.cache:
+            key = self.cache.make_key(self.model, temperature, messages)
+            if self.use_cache:
+                cached = self._cache_get(key)
+                if cached is not None:
+                    yield cached
+                    return
+
+        headers, data, estimated = self._build_request(messages, temperature)
+        parts = []
+        start = time.perf_counter()
+        try:
+            for delta in self.client.post_stream(self.endpoint, headers, data, estimated_tokens=estimated):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            observe_ai_request(self.model, 'stream', _outcome(e), time.perf_counter() - start)
+            raise
+
+        # 流式响应通常不带用量，按提示词和生成内容估算
+        completion_tokens = estimate_tokens(''.join(parts))
+        observe_ai_request(self.model, 'stream', 'success', time.perf_counter() - start,
+                           estimated, completion_tokens)
+        self._add_tokens(estimated + completion_tokens)
+        if key:
+            self.cache.set(key, ''.join(parts), model=self.model)
+
+    def _cache_get(self, key):
+        cached = self.cache.get(key)
+        AI_CACHE_REQUESTS.inc(result='miss' if cached is None else 'hit')
+        return cached
+
+    def _add_tokens(self, tokens):
+        with self._tokens_lock:
+            self.tokens_used += tokens
+
+    def _build_request(self, messages, temperature):
+        """构造请求头、请求体和预估 token 数"""
         headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.api_key}'
@@ -28,18 +219,8 @@ class AIService:
             'temperature': temperature
         }
 
-        response = requests.post(
-            self.endpoint,
-            headers=headers,
-            json=data,
-            timeout=60
-        )
-
-        if response.status_code != 200:
-            raise Exception(f"AI API 调用失败: {response.status_code} - {response.text}")
-
-        result = response.json()
-        return result['choices'][0]['message']['content']
+        estimated = sum(estimate_tokens(m['content']) for m in messages)
+        return headers, data, estimated
 
     def test_connection(self):
         """测试 AI 连接"""
@@ -47,7 +228,7 @@ class AIService:
             messages = [
                 {'role': 'user', 'content': '请回复"连接成功"'}
             ]
-            response = self._call_api(messages)
+            response = self._call_api(messages, use_cache=False)
             return True, f"连接成功: {response[:50]}"
         except Exception as e:
             return False, str(e)
@@ -55,15 +236,59 @@ class AIService:
     def generate_summary(self, chat_messages):
         """生成聊天总结
 
+        消息在 token 预算内时直接总结；超出预算时按预算切分为多段，
+        并发总结各段（map），再把分段总结合并为最终总结（reduce），
+        整个时间窗口的消息都会被覆盖，耗时约为单段总结的两到三倍。
+
         Args:
             chat_messages: ChatMessage 对象列表
 
         Returns:
             总结文本
         """
-        # 格式化消息
-        formatted_messages = self._format_messages(chat_messages)
+        chunks = self._chunk_messages(chat_messages)
+        if len(chunks) <= 1:
+            lines = chunks[0][1] if chunks else []
+            return self._summarize_text('\n'.join(lines))
+
+        partials = self._map_chunks(chunks)
+        return self._merge_summaries(self._reduce_groups(partials))
+
+    def stream_summary(self, chat_messages):
+        """流式生成聊天总结，逐段产出文本
+
+        分段总结时，各段总结仍并发完成，只有最后的合并步骤以流式输出。
+
+        Args:
+            chat_messages: ChatMessage 对象列表
 
+        Yields:
+            总结文本片段，依次拼接即为完整总结
+        """
+        chunks = self._chunk_messages(chat_messages)
+        if len(chunks) <= 1:
+            lines = chunks[0][1] if chunks else []
+            yield from self._stream_api(self._summary_prompt('\n'.join(lines)))
+            return
+
+        partials = self._reduce_groups(self._map_chunks(chunks))
+        if len(partials) == 1:
+            yield partials[0]
+            return
+        yield from self._stream_api(self._merge_prompt(partials))
+
+    def _map_chunks(self, chunks):
+        """并发总结各分段，结果按时间顺序排列"""
+        print(f"消息超出单次总结预算，分 {len(chunks)} 段总结")
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunks)))) as executor:
+            return list(executor.map(lambda chunk: self._summarize_chunk(*chunk), chunks))
+
+    def _summarize_text(self, formatted_messages):
+        """总结一段已格式化的聊天记录"""
+        return self._call_api(self._summary_prompt(formatted_messages))
+
+    def _summary_prompt(self, formatted_messages):
+        """构造总结聊天记录的提示词"""
         prompt = f"""请对以下聊天记录进行总结，包括：
 1. 主要讨论的话题
 2. 重要的信息和决定
@@ -74,12 +299,110 @@ class AIService:
 
 请用简洁的中文进行总结。"""
 
-        messages = [
-            {'role': 'system', 'content': '你是一个专业的聊天记录分析助手，擅长提取关键信息并进行总结。'},
+        return [
+            {'role': 'system', 'content': SUMMARY_SYSTEM_PROMPT},
+            {'role': 'user', 'content': prompt}
+        ]
+
+    def _summarize_chunk(self, key, lines):
+        """总结一个分段，结果按消息 id 范围缓存"""
+        if key is not None and self.use_cache:
+            cached = chunk_cache.get(key)
+            if cached is not None:
+                return cached
+
+        summary = self._summarize_text('\n'.join(lines))
+        if key is not None:
+            chunk_cache.set(key, summary)
+        return summary
+
+    def _reduce_groups(self, partials):
+        """把按时间顺序排列的分段总结逐层分组合并，直到合在一起不超出预算
+
+        Returns:
+            可以在一次请求中合并的分段总结列表
+        """
+        groups = [[]]
+        used = 0
+        for partial in partials:
+            tokens = estimate_tokens(partial)
+            if groups[-1] and used + tokens > self.chunk_tokens:
+                groups.append([])
+                used = 0
+            groups[-1].append(partial)
+            used += tokens
+
+        if len(groups) > 1 and len(groups) < len(partials):
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(groups)))) as executor:
+                merged = list(executor.map(self._merge_summaries, groups))
+            return self._reduce_groups(merged)
+
+        return partials
+
+    def _merge_summaries(self, partials):
+        """调用 AI 合并若干段总结"""
+        if len(partials) == 1:
+            return partials[0]
+        return self._call_api(self._merge_prompt(partials))
+
+    def _merge_prompt(self, partials):
+        """构造合并分段总结的提示词"""
+        sections = '\n\n'.join(
+            f"【第 {i} 段】\n{partial}" for i, partial in enumerate(partials, 1)
+        )
+        prompt = f"""以下是同一段聊天记录按时间顺序分段后的各段总结，请合并为一份完整的总结，包括：
+1. 主要讨论的话题
+2. 重要的信息和决定
+3. 需要关注的事项
+
+合并时去掉重复内容，保留各段中的关键信息。
+
+分段总结：
+{sections}
+
+请用简洁的中文进行总结。"""
+
+        return [
+            {'role': 'system', 'content': SUMMARY_SYSTEM_PROMPT},
             {'role': 'user', 'content': prompt}
         ]
 
-        return self._call_api(messages)
+    def _chunk_messages(self, chat_messages, with_messages=False):
+        """按 token 预算把消息切分为多段
+
+        Returns:
+            [(缓存键, 格式化后的行列表)]，消息缺少 id 时缓存键为 None；
+            with_messages 为 True 时每项末尾再附上该段的消息列表
+        """
+        chunks = []
+        current = []
+        lines = []
+        used = 0
+
+        def close_chunk():
+            chunk = (self._chunk_key(current), lines)
+            chunks.append(chunk + (current,) if with_messages else chunk)
+
+        for msg in chat_messages:
+            line = self._format_line(msg)
+            tokens = estimate_tokens(line)
+            if current and used + tokens > self.chunk_tokens:
+                close_chunk()
+                current, lines, used = [], [], 0
+            current.append(msg)
+            lines.append(line)
+            used += tokens
+
+        if current:
+            close_chunk()
+        return chunks
+
+    def _chunk_key(self, chunk):
+        """分段的缓存键：模型 + 聊天 + 消息 id 范围"""
+        first, last = chunk[0], chunk[-1]
+        if getattr(first, 'id', None) is None or getattr(last, 'id', None) is None:
+            return None
+        return (self.model, first.chat_id, first.id, last.id, len(chunk))
 
     def extract_tasks(self, chat_messages):
         """从聊天记录中提取任务
@@ -90,7 +413,63 @@ class AIService:
         Returns:
             任务列表，每个任务包含 title, description, priority, deadline, source_message, analysis
         """
-        formatted_messages = self._format_messages(chat_messages)
+        tasks, _ = self.extract_tasks_chunked(chat_messages)
+        return tasks
+
+    def extract_tasks_chunked(self, chat_messages):
+        """分段并发提取任务
+
+        消息按 token 预算切分为多段，以 max_workers 为上限并发提取，
+        各段结果按标题合并去重。某一段失败时其余段的结果照常返回，
+        只有成功的段中的消息才算已处理，失败段的消息留待下次重试。
+
+        Args:
+            chat_messages: ChatMessage 对象列表
+
+        Returns:
+            (任务列表, 已处理的消息列表)
+
+        Raises:
+            所有分段都失败时抛出第一个分段的异常
+        """
+        chunks = self._chunk_messages(chat_messages, with_messages=True)
+        if not chunks:
+            return [], []
+
+        def run(chunk):
+            _, lines, messages = chunk
+            try:
+                return self._extract_chunk('\n'.join(lines)), messages, None
+            except Exception as e:
+                return None, messages, e
+
+        if len(chunks) > 1:
+            print(f"分 {len(chunks)} 段提取任务")
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunks)))) as executor:
+            results = list(executor.map(run, chunks))
+
+        tasks = []
+        processed = []
+        errors = []
+        for chunk_tasks, messages, error in results:
+            if error is not None:
+                print(f"任务提取失败（{len(messages)} 条消息）: {error}")
+                errors.append(error)
+                continue
+            tasks.extend(chunk_tasks)
+            processed.extend(messages)
+
+        if errors and not processed:
+            raise errors[0]
+
+        return merge_tasks(tasks), processed
+
+    def _extract_chunk(self, formatted_messages):
+        """从一段已格式化的聊天记录中提取任务
+
+        Raises:
+            ValueError: AI 返回的内容无法解析为任务列表
+        """
         today = datetime.now().strftime('%Y-%m-%d')
 
         prompt = f"""请分析以下聊天记录，提取所有可能需要"我"（聊天记录的阅读者）关注或行动的事项。
@@ -156,9 +535,15 @@ JSON格式返回：
             {'role': 'user', 'content': prompt}
         ]
 
-        response = self._call_api(messages, temperature=0.3)
+        return self._call_api(messages, temperature=0.3, parse=self._parse_tasks)
+
+    @staticmethod
+    def _parse_tasks(response):
+        """把 AI 回复解析为任务列表
 
-        # 解析 JSON
+        Raises:
+            ValueError: 回复不是合法的 JSON
+        """
         try:
             # 尝试提取 JSON 部分
             response = response.strip()
@@ -170,34 +555,14 @@ JSON格式返回：
                 response = response[:-3]
 
             tasks = json.loads(response.strip())
-            return tasks if isinstance(tasks, list) else []
         except json.JSONDecodeError as e:
-            print(f"JSON 解析失败: {e}")
             print(f"原始响应: {response}")
-            return []
+            raise ValueError(f"JSON 解析失败: {e}") from e
 
-    def _format_messages(self, chat_messages, max_length=8000):
-        """格式化消息列表为文本
-
-        Args:
-            chat_messages: ChatMessage 对象列表
-            max_length: 最大字符数
-
-        Returns:
-            格式化的文本
-        """
-        lines = []
-        total_length = 0
-
-        for msg in chat_messages:
-            time_str = msg.msg_time.strftime('%Y-%m-%d %H:%M') if msg.msg_time else ''
-            line = f"[{time_str}] {msg.sender_name}: {msg.content or ''}"
-
-            if total_length + len(line) > max_length:
-                lines.append("... (消息过多，已截断)")
-                break
-
-            lines.append(line)
-            total_length += len(line) + 1
+        return tasks if isinstance(tasks, list) else []
 
-        return '\n'.join(lines)
+    @staticmethod
+    def _format_line(msg):
+        """格式化单条消息"""
+        time_str = msg.msg_time.strftime('%Y-%m-%d %H:%M') if msg.msg_time else ''
+        return f"[{time_str}] {msg.sender_name}: {msg.content or ''}"
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__)
 
-from . import settings, chats, messages, summaries, tasks, auto_jobs, stats, schedule
+from . import settings, chats, messages, summaries, tasks, auto_jobs, stats, schedule, jobs
@@ -1,7 +1,11 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
 from flask import request, jsonify, current_app
 from . import api_bp
-from models import db, AutoJob
-from scheduler import execute_auto_job
+from models import db, AutoJob, AutoJobRun
+from scheduler import execute_auto_job, schedule_auto_job, unschedule_auto_job
+from jobs import job_handler, submit_job
 
 @api_bp.route('/auto-jobs', methods=['GET'])
 def get_auto_jobs():
@@ -124,55 +128,117 @@ def toggle_auto_job(job_id):
 
 @api_bp.route('/auto-jobs/<int:job_id>/run', methods=['POST'])
 def run_auto_job_now(job_id):
-    """立即执行自动任务"""
+    """立即执行自动任务，提交后台任务后立即返回任务 id"""
     job = AutoJob.query.get_or_404(job_id)
 
-    try:
-        result = execute_auto_job(current_app._get_current_object(), job.id)
-        return jsonify({'success': True, 'message': result})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    background_job = submit_job('run_auto_job', {'auto_job_id': job.id})
+    return jsonify({'success': True, 'job_id': background_job.id, 'status': background_job.status})
+
+
+@job_handler('run_auto_job')
+def run_auto_job_in_background(ctx, auto_job_id):
+    """后台任务：执行一次自动任务"""
+    ctx.update(0, '执行中')
+    result = execute_auto_job(current_app._get_current_object(), auto_job_id, trigger='manual')
+    return {'message': result}
+
+
+@api_bp.route('/auto-jobs/<int:job_id>/runs', methods=['GET'])
+def get_auto_job_runs(job_id):
+    """获取自动任务的执行记录（最近的在前）"""
+    job = AutoJob.query.get_or_404(job_id)
+    limit = min(request.args.get('limit', 20, type=int), 100)
+
+    runs = job.runs.order_by(AutoJobRun.started_at.desc(), AutoJobRun.id.desc()).limit(limit).all()
+    return jsonify({'runs': [_run_to_dict(r) for r in runs]})
+
+
+@api_bp.route('/auto-jobs/trends', methods=['GET'])
+def get_auto_job_trends():
+    """自动任务执行趋势：按天汇总耗时、新增消息、token 和各阶段耗时，并列出耗时最长的聊天"""
+    job_id = request.args.get('job_id', type=int)
+    days = min(request.args.get('days', 14, type=int), 90)
+    since = datetime.now() - timedelta(days=days)
+
+    query = AutoJobRun.query.filter(AutoJobRun.started_at >= since)
+    if job_id:
+        query = query.filter_by(auto_job_id=job_id)
+    runs = query.order_by(AutoJobRun.started_at.asc()).all()
+
+    by_day = {}
+    chat_seconds = defaultdict(list)
+    for r in runs:
+        day = by_day.setdefault(r.started_at.date().isoformat(), {
+            'runs': 0, 'failed': 0, 'skipped': 0, 'durations': [],
+            'messages_inserted': 0, 'tokens_used': 0, 'stage_timings': defaultdict(float)
+        })
+        day['runs'] += 1
+        if r.status in ('failed', 'skipped'):
+            day[r.status] += 1
+        if r.status == 'skipped' or r.duration is None:
+            continue
+
+        day['durations'].append(r.duration)
+        day['messages_inserted'] += r.messages_inserted or 0
+        day['tokens_used'] += r.tokens_used or 0
+        for stage, seconds in json.loads(r.stage_timings or '{}').items():
+            day['stage_timings'][stage] += seconds
+        for name, seconds in json.loads(r.chat_timings or '{}').items():
+            chat_seconds[name].append(seconds)
+
+    trend = []
+    for date, day in by_day.items():
+        durations = day.pop('durations')
+        stages = day.pop('stage_timings')
+        trend.append(dict(
+            day,
+            date=date,
+            avg_duration=round(sum(durations) / len(durations), 3) if durations else None,
+            max_duration=round(max(durations), 3) if durations else None,
+            # 各阶段平均每次执行的耗时
+            stage_timings={stage: round(total / len(durations), 3) for stage, total in stages.items()},
+        ))
+
+    slowest_chats = sorted((
+        {
+            'name': name,
+            'runs': len(values),
+            'avg_seconds': round(sum(values) / len(values), 3),
+            'max_seconds': round(max(values), 3)
+        } for name, values in chat_seconds.items()
+    ), key=lambda c: c['avg_seconds'], reverse=True)[:10]
+
+    return jsonify({'days': trend, 'slowest_chats': slowest_chats})
+
+
+def _run_to_dict(r):
+    return {
+        'id': r.id,
+        'auto_job_id': r.auto_job_id,
+        'trigger': r.trigger,
+        'status': r.status,
+        'message': r.message,
+        'started_at': r.started_at.isoformat() if r.started_at else None,
+        'finished_at': r.finished_at.isoformat() if r.finished_at else None,
+        'duration': r.duration,
+        'chats_processed': r.chats_processed,
+        'chats_failed': r.chats_failed,
+        'messages_inserted': r.messages_inserted,
+        'tokens_used': r.tokens_used,
+        'stage_timings': json.loads(r.stage_timings) if r.stage_timings else {},
+        'chat_timings': json.loads(r.chat_timings) if r.chat_timings else {}
+    }
 
 
 def _add_job_to_scheduler(job):
     """添加任务到调度器"""
     scheduler = getattr(current_app, 'scheduler', None)
-    if not scheduler:
-        return
-
-    job_id = f'auto_job_{job.id}'
-
-    # 先移除可能存在的旧任务
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
-
-    if job.schedule_type == 'interval':
-        scheduler.add_job(
-            id=job_id,
-            func=execute_auto_job,
-            args=[current_app._get_current_object(), job.id],
-            trigger='interval',
-            minutes=job.interval_minutes,
-            replace_existing=True
-        )
-    else:  # cron
-        scheduler.add_job(
-            id=job_id,
-            func=execute_auto_job,
-            args=[current_app._get_current_object(), job.id],
-            trigger='cron',
-            hour=job.cron_hour,
-            minute=job.cron_minute,
-            replace_existing=True
-        )
+    if scheduler:
+        schedule_auto_job(scheduler, current_app._get_current_object(), job)
 
 
 def _remove_job_from_scheduler(job):
     """从调度器移除任务"""
     scheduler = getattr(current_app, 'scheduler', None)
-    if not scheduler:
-        return
-
-    job_id = f'auto_job_{job.id}'
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
+    if scheduler:
+        unschedule_auto_job(scheduler, job)
@@ -31,7 +31,8 @@ def get_monitored_chats():
             'peer_id': c.peer_id,
             'name': c.name,
             'enabled': c.enabled,
-            'last_fetch_time': c.last_fetch_time.isoformat() if c.last_fetch_time else None
+            'last_fetch_time': c.last_fetch_time.isoformat() if c.last_fetch_time else None,
+            'last_msg_time': c.last_msg_time.isoformat() if c.last_msg_time else None
         } for c in chats]
     })
 
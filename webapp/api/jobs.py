@@ -0,0 +1,37 @@
+from flask import request, jsonify, current_app
+from . import api_bp
+from models import BackgroundJob
+from jobs import job_to_dict
+
+
+@api_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    """获取最近的后台任务"""
+    status = request.args.get('status')
+    job_type = request.args.get('job_type')
+    limit = request.args.get('limit', 20, type=int)
+
+    query = BackgroundJob.query
+    if status:
+        query = query.filter_by(status=status)
+    if job_type:
+        query = query.filter_by(job_type=job_type)
+
+    jobs = query.order_by(BackgroundJob.id.desc()).limit(limit).all()
+    return jsonify({'jobs': [job_to_dict(j) for j in jobs]})
+
+
+@api_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """获取后台任务状态和进度"""
+    job = BackgroundJob.query.get_or_404(job_id)
+    return jsonify(job_to_dict(job))
+
+
+@api_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """取消后台任务"""
+    job = current_app.job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': '任务不存在'})
+    return jsonify({'success': True, 'job': job_to_dict(job)})
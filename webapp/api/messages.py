@@ -1,9 +1,12 @@
 from datetime import datetime, timedelta
 from flask import request, jsonify
-from sqlalchemy import func
 from . import api_bp
 from models import db, Settings, MonitoredChat, ChatMessage
-from chat_service import ChatService
+from pipeline import Pipeline
+from pagination import keyset_paginate, InvalidCursor
+from search import MIN_TERM_LENGTH, has_search_index, matching_ids, search_messages
+from rollups import chat_stats
+from jobs import job_handler, submit_job
 
 @api_bp.route('/messages/<int:chat_id>', methods=['GET'])
 def get_messages(chat_id):
@@ -15,14 +18,17 @@ def get_messages(chat_id):
 
     query = ChatMessage.query.filter_by(chat_id=chat_id)
 
-    # 关键词搜索
+    # 关键词搜索（关键词足够长时走全文索引，否则 LIKE 扫描）
     if keyword:
-        query = query.filter(
-            db.or_(
-                ChatMessage.content.contains(keyword),
-                ChatMessage.sender_name.contains(keyword)
+        if len(keyword) >= MIN_TERM_LENGTH and has_search_index():
+            query = query.filter(ChatMessage.id.in_(matching_ids(keyword)))
+        else:
+            query = query.filter(
+                db.or_(
+                    ChatMessage.content.contains(keyword),
+                    ChatMessage.sender_name.contains(keyword)
+                )
             )
-        )
 
     # 日期筛选
     if date_filter:
@@ -36,99 +42,107 @@ def get_messages(chat_id):
         except ValueError:
             pass
 
+    # 游标分页：传入 cursor 参数（第一页为空）时使用
+    if 'cursor' in request.args:
+        try:
+            items, next_cursor = keyset_paginate(
+                query, (ChatMessage.msg_time, ChatMessage.id),
+                per_page, request.args.get('cursor')
+            )
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'error': str(e)})
+
+        result = {
+            'messages': [_message_to_dict(m) for m in items],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        if request.args.get('with_total', 'false').lower() == 'true':
+            result['total'] = query.count()
+        return jsonify(result)
+
     messages = query.order_by(ChatMessage.msg_time.desc())\
         .paginate(page=page, per_page=per_page, error_out=False)
 
     return jsonify({
-        'messages': [{
-            'id': m.id,
-            'sender_name': m.sender_name,
-            'content': m.content,
-            'msg_time': m.msg_time.isoformat()
-        } for m in messages.items],
+        'messages': [_message_to_dict(m) for m in messages.items],
         'total': messages.total,
         'pages': messages.pages,
         'current_page': page
     })
 
 
-@api_bp.route('/messages/<int:chat_id>/stats', methods=['GET'])
-def get_message_stats(chat_id):
-    """获取聊天消息统计"""
-    # 总消息数
-    total = ChatMessage.query.filter_by(chat_id=chat_id).count()
-
-    # 今日消息数
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_count = ChatMessage.query.filter(
-        ChatMessage.chat_id == chat_id,
-        ChatMessage.msg_time >= today
-    ).count()
-
-    # 发送者数量
-    senders = db.session.query(func.count(func.distinct(ChatMessage.sender_name)))\
-        .filter(ChatMessage.chat_id == chat_id).scalar() or 0
-
-    # 记录天数
-    first_msg = ChatMessage.query.filter_by(chat_id=chat_id)\
-        .order_by(ChatMessage.msg_time.asc()).first()
-    if first_msg:
-        days = (datetime.now() - first_msg.msg_time).days + 1
-    else:
-        days = 0
+def _message_to_dict(m):
+    return {
+        'id': m.id,
+        'sender_name': m.sender_name,
+        'content': m.content,
+        'msg_time': m.msg_time.isoformat()
+    }
+
+
+@api_bp.route('/messages/search', methods=['GET'])
+def search_messages_api():
+    """全文搜索消息，按相关度排序"""
+    keyword = request.args.get('q', '').strip()
+    chat_id = request.args.get('chat_id', type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    if not keyword:
+        return jsonify({'success': False, 'error': '请输入搜索关键词'})
+
+    results, total = search_messages(keyword, chat_id=chat_id, page=page, per_page=per_page)
+
+    chat_ids = {r['chat_id'] for r in results}
+    chat_names = {
+        c.id: c.name for c in MonitoredChat.query.filter(MonitoredChat.id.in_(chat_ids))
+    } if chat_ids else {}
 
     return jsonify({
+        'messages': [{
+            'id': r['id'],
+            'chat_id': r['chat_id'],
+            'chat_name': chat_names.get(r['chat_id']),
+            'sender_name': r['sender_name'],
+            'content': r['content'],
+            'msg_time': r['msg_time'].isoformat(),
+            'rank': r['rank'],
+            'snippet': r['snippet'],
+            'highlight': r['highlight']
+        } for r in results],
         'total': total,
-        'today': today_count,
-        'senders': senders,
-        'days': days
+        'pages': (total + per_page - 1) // per_page,
+        'current_page': page
     })
 
 
+@api_bp.route('/messages/<int:chat_id>/stats', methods=['GET'])
+def get_message_stats(chat_id):
+    """获取聊天消息统计（读取按天汇总表）"""
+    return jsonify(chat_stats(chat_id))
+
+
 @api_bp.route('/fetch-messages', methods=['POST'])
 def fetch_messages_now():
-    """立即获取消息（获取所有启用监控的聊天）"""
-    try:
-        settings = Settings.get_settings()
-        chat_service = ChatService(settings)
-
-        monitored_chats = MonitoredChat.query.filter_by(enabled=True).all()
-        total_new = 0
-
-        for chat in monitored_chats:
-            try:
-                messages = chat_service.fetch_messages(
-                    chat_type=chat.chat_type,
-                    peer_id=chat.peer_id,
-                    peer_uid=chat.peer_uid,
-                    days=settings.fetch_days
-                )
+    """立即获取消息（获取所有启用监控的聊天），提交后台任务后立即返回任务 id"""
+    job = submit_job('fetch_messages')
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status})
+
+
+@job_handler('fetch_messages')
+def run_fetch_messages(ctx):
+    """后台任务：获取所有启用监控的聊天的消息"""
+    settings = Settings.get_settings()
+    monitored_chats = MonitoredChat.query.filter_by(enabled=True).all()
+
+    def on_progress(done, total, result):
+        ctx.update(done * 100 // total, f"{result['chat'].name}: 新增 {result['inserted']} 条消息")
+        ctx.check_cancelled()
+
+    pipeline = Pipeline(settings)
+    results = pipeline.ingest(monitored_chats, days=settings.fetch_days, on_progress=on_progress)
+    pipeline.run.log()
+    total_new = sum(r['inserted'] for r in results)
 
-                for msg_data in messages:
-                    existing = ChatMessage.query.filter_by(
-                        chat_id=chat.id,
-                        msg_id=msg_data['msg_id']
-                    ).first()
-
-                    if not existing:
-                        message = ChatMessage(
-                            chat_id=chat.id,
-                            msg_id=msg_data['msg_id'],
-                            sender_name=msg_data['sender_name'],
-                            sender_id=msg_data.get('sender_id'),
-                            content=msg_data['content'],
-                            msg_time=msg_data['msg_time']
-                        )
-                        db.session.add(message)
-                        total_new += 1
-
-                chat.last_fetch_time = datetime.now()
-                db.session.commit()
-
-            except Exception as e:
-                print(f"获取 {chat.name} 消息失败: {e}")
-                db.session.rollback()
-
-        return jsonify({'success': True, 'message': f'获取完成，新增 {total_new} 条消息'})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return {'message': f'获取完成，新增 {total_new} 条消息', 'inserted': total_new}
@@ -2,6 +2,7 @@ from flask import request, jsonify, current_app
 from . import api_bp
 from models import db, Settings
 from ai_service import AIService
+from ai_cache import get_cache
 from chat_service import ChatService
 from scheduler import fetch_all_messages, generate_daily_summary
 
@@ -51,6 +52,23 @@ def test_ai_connection():
     return jsonify({'success': success, 'message': message})
 
 
+@api_bp.route('/settings/ai-cache', methods=['GET'])
+def get_ai_cache_stats():
+    """获取 AI 响应缓存状态"""
+    cache = get_cache(current_app.config)
+    if not cache:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **cache.stats()})
+
+
+@api_bp.route('/settings/ai-cache/clear', methods=['POST'])
+def clear_ai_cache():
+    """清空 AI 响应缓存"""
+    cache = get_cache(current_app.config)
+    cleared = cache.clear() if cache else 0
+    return jsonify({'success': True, 'cleared_count': cleared})
+
+
 @api_bp.route('/settings/test-napcat', methods=['POST'])
 def test_napcat_connection():
     """测试 NapCat 连接"""
@@ -1,7 +1,8 @@
 from datetime import datetime
 from flask import jsonify
 from . import api_bp
-from models import db, MonitoredChat, ChatMessage, Task, AISummary
+from models import db, MonitoredChat, Task, AISummary
+from rollups import total_messages
 
 @api_bp.route('/stats', methods=['GET'])
 def get_dashboard_stats():
@@ -11,7 +12,7 @@ def get_dashboard_stats():
     chats_count = MonitoredChat.query.count()
     
     # 消息总数
-    messages_count = ChatMessage.query.count()
+    messages_count = total_messages()
     
     # 待办任务数
     pending_tasks_count = Task.query.filter_by(status='pending').count()
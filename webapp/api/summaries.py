@@ -1,8 +1,11 @@
+import json
 from datetime import datetime, timedelta
-from flask import request, jsonify
+from flask import request, jsonify, Response, stream_with_context
 from . import api_bp
-from models import db, Settings, ChatMessage, AISummary
-from ai_service import AIService
+from models import db, ChatMessage, AISummary
+from pipeline import Pipeline, load_messages
+from pagination import keyset_paginate, InvalidCursor
+from jobs import job_handler, submit_job
 
 @api_bp.route('/summaries', methods=['GET'])
 def get_summaries():
@@ -25,36 +28,141 @@ def get_summaries():
         end_time = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
         query = query.filter(AISummary.created_at <= end_time)
 
+    # 游标分页：传入 cursor 参数（第一页为空）时使用
+    if 'cursor' in request.args:
+        try:
+            items, next_cursor = keyset_paginate(
+                query, (AISummary.created_at, AISummary.id),
+                per_page, request.args.get('cursor')
+            )
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'error': str(e)})
+
+        result = {
+            'summaries': [_summary_to_dict(s) for s in items],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        if request.args.get('with_total', 'false').lower() == 'true':
+            result['total'] = query.count()
+        return jsonify(result)
+
     summaries = query.order_by(AISummary.created_at.desc())\
         .paginate(page=page, per_page=per_page, error_out=False)
 
     return jsonify({
-        'summaries': [{
-            'id': s.id,
-            'chat_id': s.chat_id,
-            'summary_type': s.summary_type,
-            'date_range_start': s.date_range_start.isoformat(),
-            'date_range_end': s.date_range_end.isoformat(),
-            'summary_text': s.summary_text,
-            'created_at': s.created_at.isoformat()
-        } for s in summaries.items],
+        'summaries': [_summary_to_dict(s) for s in summaries.items],
         'total': summaries.total,
         'pages': summaries.pages
     })
 
 
+def _summary_to_dict(s):
+    return {
+        'id': s.id,
+        'chat_id': s.chat_id,
+        'summary_type': s.summary_type,
+        'date_range_start': s.date_range_start.isoformat(),
+        'date_range_end': s.date_range_end.isoformat(),
+        'summary_text': s.summary_text,
+        'created_at': s.created_at.isoformat()
+    }
+
+
 @api_bp.route('/generate-summary', methods=['POST'])
 def generate_summary():
-    """生成 AI 总结"""
-    data = request.json
+    """生成 AI 总结，提交后台任务后立即返回任务 id"""
+    data = request.json or {}
+    params = {key: data.get(key) for key in SUMMARY_PARAMS if key in data}
+
+    job = submit_job('generate_summary', params)
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status})
+
+
+# /generate-summary 接受的参数
+SUMMARY_PARAMS = ('chat_id', 'days', 'start_date', 'end_date', 'refresh')
+
+
+@job_handler('generate_summary')
+def run_generate_summary(ctx, **data):
+    """后台任务：生成并保存 AI 总结"""
     chat_id = data.get('chat_id')
+    refresh = data.get('refresh', False)  # 忽略缓存重新生成
+
+    pipeline = Pipeline(use_cache=not refresh)
+
+    start_time, end_time, messages = _load_summary_messages(data)
+    if not messages:
+        raise ValueError('没有找到消息')
+
+    # 生成总结
+    ctx.update(10, f'总结 {len(messages)} 条消息')
+    summary = pipeline.summarize(chat_id, messages, start_time, end_time)
+    ctx.check_cancelled()
+    db.session.commit()
+    pipeline.run.log()
+
+    return {'summary': summary.summary_text, 'summary_id': summary.id}
+
+
+@api_bp.route('/generate-summary/stream', methods=['GET', 'POST'])
+def generate_summary_stream():
+    """流式生成 AI 总结（Server-Sent Events）
+
+    参数与 /generate-summary 相同，GET 时通过查询参数传递（便于 EventSource）。
+    生成过程中逐段推送 delta 事件，完成后保存总结并推送 done 事件。
+    """
+    data = request.get_json(silent=True) or request.args.to_dict()
+    chat_id = int(data['chat_id']) if data.get('chat_id') else None
+    data['chat_id'] = chat_id
+    refresh = str(data.get('refresh', '')).lower() in ('1', 'true')
+
+    pipeline = Pipeline(use_cache=not refresh)
+
+    start_time, end_time, messages = _load_summary_messages(data)
+
+    def events():
+        if not messages:
+            yield _sse('error', {'error': '没有找到消息'})
+            return
+
+        yield _sse('start', {'messages_count': len(messages)})
+        parts = []
+        try:
+            with pipeline.run.stage('summarize'):
+                for delta in pipeline.ai_service.stream_summary(messages):
+                    parts.append(delta)
+                    yield _sse('delta', {'text': delta})
+
+            summary = pipeline.save_summary(chat_id, ''.join(parts), start_time, end_time)
+            db.session.commit()
+            yield _sse('done', {'summary_id': summary.id, 'summary': summary.summary_text})
+        except Exception as e:
+            db.session.rollback()
+            yield _sse('error', {'error': str(e)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # 禁止反向代理缓冲
+    })
+
+
+def _sse(event, data):
+    """格式化一条 SSE 事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _load_summary_messages(data):
+    """按请求参数确定时间范围并查询消息
+
+    Returns:
+        (开始时间, 结束时间, 消息列表)
+    """
+    chat_id = data.get('chat_id') or None
     days = data.get('days')
     start_date = data.get('start_date')  # 格式: YYYY-MM-DD
     end_date = data.get('end_date')      # 格式: YYYY-MM-DD
 
-    settings = Settings.get_settings()
-    ai_service = AIService(settings)
-
     # 确定时间范围
     if start_date and end_date:
         # 使用指定的日期范围
@@ -69,40 +177,14 @@ def generate_summary():
         end_time = datetime.now()
         start_time = end_time - timedelta(days=1)
 
-    query = ChatMessage.query.filter(
-        ChatMessage.msg_time >= start_time,
-        ChatMessage.msg_time <= end_time
-    )
-    if chat_id:
-        query = query.filter_by(chat_id=chat_id)
-
-    messages = query.order_by(ChatMessage.msg_time.asc()).all()
+    messages = load_messages(chat_id, start_time, end_time)
 
     # 如果按时间没找到，尝试获取该聊天的所有消息
     if not messages and chat_id:
         messages = ChatMessage.query.filter_by(chat_id=chat_id)\
             .order_by(ChatMessage.msg_time.asc()).limit(500).all()
 
-    if not messages:
-        return jsonify({'success': False, 'error': '没有找到消息'})
-
-    # 生成总结
-    try:
-        summary_text = ai_service.generate_summary(messages)
-
-        summary = AISummary(
-            chat_id=chat_id,
-            summary_type='custom',
-            date_range_start=start_time,
-            date_range_end=end_time,
-            summary_text=summary_text
-        )
-        db.session.add(summary)
-        db.session.commit()
-
-        return jsonify({'success': True, 'summary': summary_text})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return start_time, end_time, messages
 
 
 @api_bp.route('/summaries/<int:summary_id>', methods=['DELETE'])
@@ -1,8 +1,11 @@
 from datetime import datetime, timedelta
 from flask import request, jsonify
 from . import api_bp
-from models import db, Settings, ChatMessage, Task
-from ai_service import AIService
+from models import db, ChatMessage, Task
+from pipeline import Pipeline, load_messages
+from pagination import keyset_paginate, InvalidCursor
+from rollups import reset_processed
+from jobs import job_handler, submit_job
 
 @api_bp.route('/tasks', methods=['GET'])
 def get_tasks():
@@ -13,24 +16,48 @@ def get_tasks():
     if status:
         query = query.filter_by(status=status)
 
+    # 游标分页：传入 cursor 参数（第一页为空）时按创建时间倒序分页
+    if 'cursor' in request.args:
+        per_page = request.args.get('per_page', 50, type=int)
+        try:
+            items, next_cursor = keyset_paginate(
+                query, (Task.created_at, Task.id),
+                per_page, request.args.get('cursor')
+            )
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'error': str(e)})
+
+        result = {
+            'tasks': [_task_to_dict(t) for t in items],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        if request.args.get('with_total', 'false').lower() == 'true':
+            result['total'] = query.count()
+        return jsonify(result)
+
     tasks = query.order_by(Task.deadline.asc().nullslast(), Task.priority.asc()).all()
 
     return jsonify({
-        'tasks': [{
-            'id': t.id,
-            'chat_id': t.chat_id,
-            'title': t.title,
-            'description': t.description,
-            'priority': t.priority,
-            'deadline': t.deadline.isoformat() if t.deadline else None,
-            'status': t.status,
-            'source_message': t.source_message,
-            'ai_analysis': t.ai_analysis,
-            'created_at': t.created_at.isoformat()
-        } for t in tasks]
+        'tasks': [_task_to_dict(t) for t in tasks]
     })
 
 
+def _task_to_dict(t):
+    return {
+        'id': t.id,
+        'chat_id': t.chat_id,
+        'title': t.title,
+        'description': t.description,
+        'priority': t.priority,
+        'deadline': t.deadline.isoformat() if t.deadline else None,
+        'status': t.status,
+        'source_message': t.source_message,
+        'ai_analysis': t.ai_analysis,
+        'created_at': t.created_at.isoformat()
+    }
+
+
 @api_bp.route('/tasks/<int:task_id>', methods=['PUT'])
 def update_task(task_id):
     """更新任务"""
@@ -74,6 +101,7 @@ def clear_analyzed_status():
             ChatMessage.ai_processed: False,
             ChatMessage.ai_processed_at: None
         }, synchronize_session=False)
+        reset_processed(chat_id)
 
         db.session.commit()
 
@@ -89,37 +117,28 @@ def clear_analyzed_status():
 
 @api_bp.route('/analyze-tasks', methods=['POST'])
 def analyze_tasks():
-    """分析消息提取任务（只处理未处理过的消息）"""
+    """分析消息提取任务（只处理未处理过的消息），提交后台任务后立即返回任务 id"""
     data = request.json or {}
+    params = {key: data.get(key) for key in ('chat_id', 'days', 'force', 'refresh') if key in data}
+
+    job = submit_job('analyze_tasks', params)
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status})
+
+
+@job_handler('analyze_tasks')
+def run_analyze_tasks(ctx, **data):
+    """后台任务：分析消息提取任务"""
     chat_id = data.get('chat_id')
     days = data.get('days', 7)
     force = data.get('force', False)  # 是否强制重新处理所有消息
+    refresh = data.get('refresh', False)  # 忽略缓存重新调用 AI
 
-    settings = Settings.get_settings()
-    ai_service = AIService(settings)
+    pipeline = Pipeline(use_cache=not refresh)
 
-    # 获取消息
+    # 获取消息，如果不是强制模式，只获取未处理的消息
     end_time = datetime.now()
     start_time = end_time - timedelta(days=days)
-
-    query = ChatMessage.query.filter(
-        ChatMessage.msg_time >= start_time,
-        ChatMessage.msg_time <= end_time
-    )
-
-    # 如果不是强制模式，只获取未处理的消息
-    if not force:
-        query = query.filter(
-            db.or_(
-                ChatMessage.ai_processed == False,
-                ChatMessage.ai_processed.is_(None)
-            )
-        )
-
-    if chat_id:
-        query = query.filter_by(chat_id=chat_id)
-
-    messages = query.order_by(ChatMessage.msg_time.asc()).all()
+    messages = load_messages(chat_id, start_time, end_time, unprocessed_only=not force)
 
     # 如果没找到未处理的消息
     if not messages:
@@ -132,62 +151,21 @@ def analyze_tasks():
         processed_count = processed_count.count()
 
         if processed_count > 0:
-            return jsonify({
-                'success': True,
+            return {
                 'tasks_count': 0,
                 'message': f'没有新消息需要处理（已有 {processed_count} 条消息被处理过）'
-            })
-        else:
-            return jsonify({'success': False, 'error': '没有找到消息'})
-
-    # 获取已存在的任务标题，用于去重
-    # existing_titles = set()
-    # existing_tasks = Task.query.filter_by(chat_id=chat_id).all() if chat_id else Task.query.all()
-    # for t in existing_tasks:
-    #     existing_titles.add(t.title.strip().lower())
+            }
+        raise ValueError('没有找到消息')
 
-    try:
-        tasks_data = ai_service.extract_tasks(messages)
-
-        # 保存任务
-        new_tasks = []
-        skipped = 0
-        for t in tasks_data:
-            if not t.get('title'):
-                continue
-            title = t['title'].strip()
-            # 检查是否已存在相似任务
-            # if title.lower() in existing_titles:
-            #     skipped += 1
-            #     continue
-
-            task = Task(
-                chat_id=chat_id,
-                title=title,
-                description=t.get('description'),
-                priority=t.get('priority', 3),
-                deadline=datetime.fromisoformat(t['deadline']) if t.get('deadline') else None,
-                source_message=t.get('source_message'),
-                ai_analysis=t.get('analysis')
-            )
-            db.session.add(task)
-            new_tasks.append(task)
-            # existing_titles.add(title.lower())
-
-        # 标记消息为已处理
-        now = datetime.now()
-        for msg in messages:
-            msg.ai_processed = True
-            msg.ai_processed_at = now
-
-        db.session.commit()
-
-        return jsonify({
-            'success': True,
-            'tasks_count': len(new_tasks),
-            'skipped': skipped,
-            'processed_messages': len(messages)
-        })
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'success': False, 'error': str(e)})
+    ctx.update(10, f'分析 {len(messages)} 条消息')
+    new_tasks, processed = pipeline.extract(chat_id, messages)
+    ctx.check_cancelled()
+    db.session.commit()
+    pipeline.run.log()
+
+    return {
+        'tasks_count': len(new_tasks),
+        'skipped': 0,
+        'processed_messages': len(processed),
+        'failed_messages': len(messages) - len(processed)
+    }
@@ -7,9 +7,12 @@ from flask_apscheduler import APScheduler
 
 from config import Config
 from models import db
+from migrations import upgrade_schema
 from routes import main_bp
 from api import api_bp
 from scheduler import init_scheduler
+from jobs import init_job_queue
+from metrics import init_metrics
 
 def create_app():
     app = Flask(__name__)
@@ -31,8 +34,15 @@ def create_app():
 
     with app.app_context():
         db.create_all()
+        upgrade_schema()
         init_scheduler(scheduler, app)
 
+    # 后台任务队列（获取消息、AI 总结等耗时接口）
+    init_job_queue(app)
+
+    # 接口耗时统计和 /metrics
+    init_metrics(app)
+
     scheduler.start()
 
     return app
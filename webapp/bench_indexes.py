@@ -0,0 +1,173 @@
+"""
+索引基准测试 - 对比 chat_messages 索引创建前后热点查询的耗时
+
+用法:
+    python bench_indexes.py [--rows 1000000] [--chats 20] [--db /tmp/bench.db]
+
+在临时 SQLite 数据库中生成消息，先删除索引测一轮，再通过 upgrade_schema()
+（与已有 app.db 的迁移路径相同）创建索引后再测一轮。
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from config import Config
+from models import db, ChatMessage
+from migrations import upgrade_schema
+from api import api_bp
+import rollups
+
+INDEX_NAMES = [
+    'ix_chat_messages_chat_time',
+    'ix_chat_messages_chat_sender',
+    'ix_chat_messages_msg_time',
+    'ix_chat_messages_unprocessed',
+]
+
+
+def create_bench_app(db_path):
+    """创建只包含 API 蓝图的应用（不启动调度器）"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    db.init_app(app)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    return app
+
+
+def populate(db_path, rows, chats, days=365, unprocessed_days=7):
+    """生成测试数据，最近 unprocessed_days 天的消息未被 AI 处理"""
+    conn = sqlite3.connect(db_path)
+    now = datetime.now()
+    conn.executemany(
+        'INSERT INTO monitored_chats (chat_type, peer_id, name, enabled, created_at) '
+        'VALUES (?, ?, ?, 1, ?)',
+        [(2, str(100000 + i), f'群{i}', now) for i in range(chats)]
+    )
+
+    random.seed(42)
+    span = days * 86400
+    cutoff = now - timedelta(days=unprocessed_days)
+    batch = []
+    for i in range(rows):
+        msg_time = now - timedelta(seconds=random.randrange(span))
+        processed = msg_time < cutoff
+        batch.append((
+            random.randrange(chats) + 1, f'm{i}', f'用户{random.randrange(200)}',
+            f'u{random.randrange(200)}', f'消息内容 {i}', msg_time, now,
+            processed, msg_time if processed else None
+        ))
+        if len(batch) >= 50000:
+            _insert_messages(conn, batch)
+            batch = []
+    if batch:
+        _insert_messages(conn, batch)
+
+    conn.commit()
+    conn.close()
+
+
+def _insert_messages(conn, batch):
+    conn.executemany(
+        'INSERT INTO chat_messages (chat_id, msg_id, sender_name, sender_id, content, '
+        'msg_time, created_at, ai_processed, ai_processed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        batch
+    )
+
+
+def analyze_tasks_query(chat_id, days=7):
+    """与 analyze_tasks 相同的消息查询"""
+    end_time = datetime.now()
+    start_time = end_time - timedelta(days=days)
+    query = ChatMessage.query.filter(
+        ChatMessage.msg_time >= start_time,
+        ChatMessage.msg_time <= end_time,
+        db.or_(
+            ChatMessage.ai_processed == False,
+            ChatMessage.ai_processed.is_(None)
+        )
+    )
+    if chat_id:
+        query = query.filter_by(chat_id=chat_id)
+    return query.order_by(ChatMessage.msg_time.asc()).all()
+
+
+def measure(fn, repeat):
+    """返回多次执行的耗时中位数（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_round(app, repeat):
+    client = app.test_client()
+    date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    cases = [
+        ('get_messages 第1页', lambda: client.get('/api/messages/1')),
+        ('get_messages 第20页', lambda: client.get('/api/messages/1?page=20')),
+        ('get_messages 按日期', lambda: client.get(f'/api/messages/1?date={date}')),
+        ('get_message_stats', lambda: client.get('/api/messages/1/stats')),
+        ('analyze_tasks 查询(单个聊天)', lambda: analyze_tasks_query(1)),
+        ('analyze_tasks 查询(全部聊天)', lambda: analyze_tasks_query(None)),
+    ]
+
+    results = {}
+    with app.app_context():
+        for name, fn in cases:
+            results[name] = measure(fn, repeat)
+            db.session.remove()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='chat_messages 索引基准测试')
+    parser.add_argument('--rows', type=int, default=1000000, help='消息条数')
+    parser.add_argument('--chats', type=int, default=20, help='聊天数')
+    parser.add_argument('--repeat', type=int, default=5, help='每个查询执行次数')
+    parser.add_argument('--db', default=None, help='数据库文件路径（默认临时文件）')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_bench_app(db_path)
+
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            for name in INDEX_NAMES:
+                conn.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+
+    print(f"生成 {args.rows} 条消息 ({args.chats} 个聊天): {db_path}")
+    start = time.perf_counter()
+    populate(db_path, args.rows, args.chats)
+    with app.app_context():
+        rollups.rebuild()
+        db.session.commit()
+    print(f"  耗时 {time.perf_counter() - start:.1f}s")
+
+    before = run_round(app, args.repeat)
+
+    start = time.perf_counter()
+    with app.app_context():
+        upgrade_schema()
+    print(f"创建索引耗时 {time.perf_counter() - start:.1f}s")
+
+    after = run_round(app, args.repeat)
+
+    print(f"\n{'查询':<32}{'索引前(ms)':>12}{'索引后(ms)':>12}{'加速':>10}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float('inf')
+        print(f"{name:<32}{before[name]:>12.1f}{after[name]:>12.1f}{speedup:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
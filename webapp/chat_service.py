@@ -11,6 +11,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from napcat_qce import connect, MessageFilter
 from napcat_qce.auto_token import auto_discover_token
 
+# 提取消息内容时用到的原始字段，其余字段在获取时丢弃
+RAW_CONTENT_FIELDS = ('content', 'text', 'elements')
+
 
 class ChatService:
     """聊天服务类"""
@@ -83,53 +86,61 @@ class ChatService:
 
         return friends, groups
 
-    def fetch_messages(self, chat_type, peer_id, peer_uid, days=1):
+    def fetch_messages(self, chat_type, peer_id, peer_uid, days=1, since=None):
         """获取聊天消息
 
+        有同步游标时只请求游标之后的消息，并逐页获取直到没有下一页。
+
         Args:
             chat_type: 1=私聊, 2=群聊
             peer_id: 好友QQ号或群号
             peer_uid: UID（用于API调用）
-            days: 获取最近几天的消息
+            days: 获取最近几天的消息（没有同步游标时使用）
+            since: 同步游标，即已入库的最新消息时间
 
         Returns:
             消息列表
         """
+        return [
+            self.normalize_message(msg)
+            for msg in self.iter_raw_messages(chat_type, peer_id, peer_uid, days=days, since=since)
+        ]
+
+    def iter_raw_messages(self, chat_type, peer_id, peer_uid, days=1, since=None):
+        """逐条获取 NapCat 返回的原始消息对象（参数同 fetch_messages）"""
         client = self.get_client()
 
-        # 使用时间筛选器
-        msg_filter = MessageFilter.last_days(days)
+        # 使用时间筛选器（游标所在的那一秒也请求，重复消息在入库时跳过）
+        if since:
+            msg_filter = MessageFilter(start_time=since, end_time=datetime.now())
+        else:
+            msg_filter = MessageFilter.last_days(days)
 
         # 确定使用哪个 ID
         target_id = peer_uid if peer_uid else peer_id
 
-        messages = []
         try:
-            result = client.messages.fetch(
+            # 只保留提取内容需要的原始字段，逐条处理并预取下一页
+            yield from client.messages.iter_messages(
                 chat_type=chat_type,
                 peer_uid=target_id,
-                page=1,
-                limit=500,
-                filter=msg_filter
+                filter=msg_filter,
+                raw_fields=RAW_CONTENT_FIELDS
             )
-
-            for msg in result.get('messages', []):
-                # 提取消息内容
-                content = self._extract_message_content(msg)
-
-                messages.append({
-                    'msg_id': msg.msg_id,
-                    'sender_name': msg.sender_member_name or msg.sender_name,
-                    'sender_id': getattr(msg, 'sender_uid', None),
-                    'content': content,
-                    'msg_time': self._parse_msg_time(msg)
-                })
-
         except Exception as e:
             print(f"获取消息失败: {e}")
             raise
 
-        return messages
+    def normalize_message(self, msg):
+        """把原始消息对象转换为入库用的消息字典"""
+        return {
+            'msg_id': msg.msg_id,
+            'msg_seq': msg.msg_seq,
+            'sender_name': msg.sender_member_name or msg.sender_name,
+            'sender_id': getattr(msg, 'sender_uid', None),
+            'content': self._extract_message_content(msg),
+            'msg_time': self._parse_msg_time(msg)
+        }
 
     def _extract_message_content(self, msg):
         """提取消息内容"""
@@ -16,6 +16,49 @@ class Config:
     # APScheduler 配置
     SCHEDULER_API_ENABLED = os.environ.get('SCHEDULER_API_ENABLED', 'true').lower() == 'true'
     SCHEDULER_TIMEZONE = os.environ.get('SCHEDULER_TIMEZONE', 'Asia/Shanghai')
+    # 同一定时任务不重叠执行，错过的多次触发合并为一次；定时(cron)任务错过后多少秒内仍补执行
+    SCHEDULER_MISFIRE_GRACE = int(os.environ.get('SCHEDULER_MISFIRE_GRACE', 3600))
+    SCHEDULER_JOB_DEFAULTS = {
+        'max_instances': 1,
+        'coalesce': True,
+        'misfire_grace_time': SCHEDULER_MISFIRE_GRACE,
+    }
+    # 定时任务跨进程租约的有效秒数（执行期间每 1/3 有效期续期一次，持有进程崩溃后最多这么久被接管），
+    # 以及每个自动任务保留的执行记录数
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+    AUTO_JOB_RUN_HISTORY = int(os.environ.get('AUTO_JOB_RUN_HISTORY', 1000))
+
+    # 消息获取并发数（同时请求 NapCat 的聊天数）
+    FETCH_MAX_WORKERS = int(os.environ.get('FETCH_MAX_WORKERS', 4))
+
+    # 后台任务并发数（获取消息、AI 总结等接口提交的任务）
+    JOB_MAX_WORKERS = int(os.environ.get('JOB_MAX_WORKERS', 2))
+
+    # AI 分段总结：每段的 token 预算和并发请求数
+    AI_SUMMARY_CHUNK_TOKENS = int(os.environ.get('AI_SUMMARY_CHUNK_TOKENS', 6000))
+    AI_MAX_WORKERS = int(os.environ.get('AI_MAX_WORKERS', 4))
+
+    # 定时总结和提取任务时同时处理的聊天数，以及同一 AI 端点同时进行中的请求数上限
+    AI_CHAT_WORKERS = int(os.environ.get('AI_CHAT_WORKERS', 4))
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 8))
+
+    # AI 接口：超时（秒）、重试次数、限流（每分钟请求数 / token 数，0 表示不限）和熔断
+    AI_CONNECT_TIMEOUT = float(os.environ.get('AI_CONNECT_TIMEOUT', 10))
+    AI_READ_TIMEOUT = float(os.environ.get('AI_READ_TIMEOUT', 60))
+    AI_MAX_RETRIES = int(os.environ.get('AI_MAX_RETRIES', 3))
+    AI_RPM = int(os.environ.get('AI_RPM', 0))
+    AI_TPM = int(os.environ.get('AI_TPM', 0))
+    AI_BREAKER_THRESHOLD = int(os.environ.get('AI_BREAKER_THRESHOLD', 5))
+    AI_BREAKER_RESET = float(os.environ.get('AI_BREAKER_RESET', 60))
+
+    # AI 响应缓存：是否启用、过期秒数和最大条目数，缓存文件默认在数据目录下
+    AI_CACHE_ENABLED = os.environ.get('AI_CACHE_ENABLED', 'true').lower() == 'true'
+    AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', 7 * 86400))
+    AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', 5000))
+    AI_CACHE_PATH = os.environ.get('AI_CACHE_PATH')
+
+    # 是否启用 /metrics（Prometheus 文本格式的运行指标）
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
 
     # 默认 AI 配置
     DEFAULT_AI_ENDPOINT = os.environ.get('AI_ENDPOINT', 'https://api.deepseek.com/v1/chat/completions')
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from config import Config
+from migrations import upgrade_schema
+from models import db, MonitoredChat
+
+
+@pytest.fixture
+def app(tmp_path):
+    """使用临时数据库的应用，不启动调度器和后台任务队列"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'app.db'}",
+        DATA_DIR=str(tmp_path),
+        AI_CACHE_PATH=str(tmp_path / 'ai_cache.db'),
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def chat(app):
+    chat = MonitoredChat(chat_type=2, peer_id='10001', peer_uid='10001', name='测试群')
+    db.session.add(chat)
+    db.session.commit()
+    return chat
+
+
+def make_messages(count, start=None, prefix='m'):
+    """构造 ingest_messages 接受的消息字典"""
+    start = start or datetime.now().replace(microsecond=0) - timedelta(hours=1)
+    return [
+        {
+            'msg_id': f'{prefix}{i}',
+            'sender_id': f'u{i % 3}',
+            'sender_name': f'用户{i % 3}',
+            'content': f'消息 {i}',
+            'msg_type': 'text',
+            'msg_time': start + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
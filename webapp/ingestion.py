@@ -0,0 +1,110 @@
+"""
+消息入库 - 批量写入聊天消息
+"""
+import time
+
+from models import db, ChatMessage
+from rollups import record_ingested
+from metrics import observe_ingest
+
+# 每批 executemany 写入的行数
+INSERT_BATCH_SIZE = 500
+
+
+def ingest_messages(chat, messages, batch_size=INSERT_BATCH_SIZE):
+    """批量写入一个聊天的消息，已存在的消息自动跳过
+
+    先用一次查询取出该聊天在本批消息时间窗口内已有的 msg_id，
+    再把新消息按批次 executemany 写入，避免逐条查询是否存在。
+    写入后更新按天汇总的统计并推进聊天的同步游标。调用方负责 commit / rollback。
+
+    Args:
+        chat: MonitoredChat 对象
+        messages: ChatService.fetch_messages 返回的消息字典列表
+        batch_size: 每批写入的行数
+
+    Returns:
+        (inserted, skipped) 新增条数和跳过条数
+    """
+    if not messages:
+        return 0, 0
+
+    start = time.perf_counter()
+    times = [m['msg_time'] for m in messages]
+    existing_ids = {
+        row[0] for row in db.session.query(ChatMessage.msg_id).filter(
+            ChatMessage.chat_id == chat.id,
+            ChatMessage.msg_time >= min(times),
+            ChatMessage.msg_time <= max(times)
+        )
+    }
+
+    rows = []
+    for msg_data in messages:
+        msg_id = msg_data['msg_id']
+        if msg_id in existing_ids:
+            continue
+        # 同一批次内的重复消息也只写一次
+        existing_ids.add(msg_id)
+        rows.append({
+            'chat_id': chat.id,
+            'msg_id': msg_id,
+            'sender_name': msg_data['sender_name'],
+            'sender_id': msg_data.get('sender_id'),
+            'content': msg_data['content'],
+            'msg_time': msg_data['msg_time']
+        })
+
+    inserted_rows = []
+    for i in range(0, len(rows), batch_size):
+        inserted_rows.extend(_insert_rows(rows[i:i + batch_size]))
+
+    # 只有实际写入的行计入汇总，并发写入时被冲突跳过的不重复计数
+    record_ingested(chat.id, inserted_rows)
+    _advance_sync_cursor(chat, messages)
+
+    inserted, skipped = len(inserted_rows), len(messages) - len(inserted_rows)
+    observe_ingest(inserted, skipped, time.perf_counter() - start)
+    return inserted, skipped
+
+
+def _advance_sync_cursor(chat, messages):
+    """把聊天的同步游标推进到本批最新的消息"""
+    latest = max(messages, key=lambda m: m['msg_time'])
+    if chat.last_msg_time is None or latest['msg_time'] >= chat.last_msg_time:
+        chat.last_msg_time = latest['msg_time']
+        chat.last_msg_seq = latest.get('msg_seq')
+
+
+def _insert_rows(rows):
+    """写入一批行，返回实际写入的行
+
+    数据库支持 INSERT ... RETURNING（SQLite 3.35+、PostgreSQL）时按返回的 msg_id 确定，
+    被 ON CONFLICT DO NOTHING 跳过的行不会返回；不支持时视为全部写入。
+    """
+    stmt = _insert_ignore()
+    if not db.engine.dialect.insert_returning:
+        db.session.execute(stmt, rows)
+        return rows
+
+    result = db.session.execute(stmt.returning(ChatMessage.__table__.c.msg_id), rows)
+    inserted_ids = {row[0] for row in result}
+    return [row for row in rows if row['msg_id'] in inserted_ids]
+
+
+def _insert_ignore():
+    """构造忽略 unique_message 冲突的 INSERT 语句
+
+    时间窗口预查询已经排除了绝大多数重复，这里作为并发写入时的兜底。
+    """
+    table = ChatMessage.__table__
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing(index_elements=['chat_id', 'msg_id'])
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing(constraint='unique_message')
+
+    return table.insert()
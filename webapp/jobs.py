@@ -0,0 +1,239 @@
+"""
+后台任务队列 - 在进程内的线程池中执行耗时接口
+
+获取消息、生成总结、提取任务等接口把工作提交到队列后立即返回任务 id，
+客户端通过 /api/jobs/<id> 查询状态和进度，或请求取消。
+任务记录保存在 background_jobs 表中；运行中的进度和取消标记只保存在内存里，
+避免进度更新与任务自身的数据库写入争用 SQLite 写锁。
+
+每个进程的队列持有一个自动续期的租约，任务记录上保存所属队列的租约名；
+只有所属队列的租约已失效（进程已退出）的未完成任务才会被标记为中断，
+多个 worker 进程共用数据库时不会误判其他进程正在执行的任务。
+"""
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+
+from models import db, BackgroundJob, JobLease
+from leases import acquire_lease, release_lease, LeaseKeeper
+
+WORKER_LEASE_PREFIX = 'job_queue:'
+
+# 任务类型 -> 处理函数，处理函数签名为 handler(ctx, **params)，返回可 JSON 序列化的结果
+HANDLERS = {}
+
+FINISHED_STATUSES = ('success', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+def job_handler(job_type):
+    """注册任务类型的处理函数"""
+    def decorator(func):
+        HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+class JobContext:
+    """传给处理函数的运行上下文，用于报告进度和检查取消"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.progress = 0
+        self.message = None
+        self._cancel = threading.Event()
+
+    def update(self, progress=None, message=None):
+        """更新进度（0-100）和进度说明"""
+        if progress is not None:
+            self.progress = max(0, min(100, int(progress)))
+        if message is not None:
+            self.message = message
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        """已请求取消时抛出 JobCancelled，处理函数在各阶段之间调用"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+
+class JobQueue:
+    """后台任务队列"""
+
+    def __init__(self, app, max_workers=2):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._live = {}
+        self._lock = threading.Lock()
+
+        # 本进程队列的租约，续期时顺便清理其他已退出进程遗留的任务
+        self.worker = f'{WORKER_LEASE_PREFIX}{uuid.uuid4().hex}'
+        with app.app_context():
+            self._owner = acquire_lease(self.worker)
+            self._keeper = LeaseKeeper(self.worker, self._owner, on_renew=fail_orphaned_jobs).start()
+
+    def submit(self, job_type, params=None):
+        """创建任务记录并提交执行，返回 BackgroundJob"""
+        if job_type not in HANDLERS:
+            raise ValueError(f"未知任务类型: {job_type}")
+
+        job = BackgroundJob(
+            job_type=job_type,
+            status='pending',
+            params=json.dumps(params or {}, ensure_ascii=False),
+            worker=self.worker
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        ctx = JobContext(job.id)
+        with self._lock:
+            self._live[job.id] = ctx
+        self.executor.submit(self._run, job.id, ctx)
+        return job
+
+    def cancel(self, job_id):
+        """请求取消任务：等待中的任务直接取消，运行中的任务在下一个检查点停止"""
+        job = db.session.get(BackgroundJob, job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+
+        job.cancel_requested = True
+        if job.status == 'pending':
+            job.status = 'cancelled'
+            job.finished_at = datetime.now()
+        db.session.commit()
+
+        with self._lock:
+            ctx = self._live.get(job_id)
+        if ctx:
+            ctx.cancel()
+        return job
+
+    def live_progress(self, job_id):
+        """运行中任务的实时进度，任务不在本进程中运行时返回 None"""
+        with self._lock:
+            ctx = self._live.get(job_id)
+        if ctx is None:
+            return None
+        return ctx.progress, ctx.message
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
+        self._keeper.stop()
+        with self.app.app_context():
+            release_lease(self.worker, self._owner)
+
+    def _run(self, job_id, ctx):
+        with self.app.app_context():
+            try:
+                job = db.session.get(BackgroundJob, job_id)
+                if job is None or job.status != 'pending':
+                    return
+
+                job.status = 'running'
+                job.started_at = datetime.now()
+                db.session.commit()
+                handler = HANDLERS[job.job_type]
+                params = json.loads(job.params or '{}')
+
+                result = None
+                error = None
+                try:
+                    ctx.check_cancelled()
+                    result = handler(ctx, **params)
+                    status = 'success'
+                    ctx.update(progress=100)
+                except JobCancelled:
+                    db.session.rollback()
+                    status = 'cancelled'
+                except Exception as e:
+                    db.session.rollback()
+                    status = 'failed'
+                    error = str(e)
+                    print(f"后台任务失败: #{job_id} {job.job_type} - {e}")
+
+                job = db.session.get(BackgroundJob, job_id)
+                job.status = status
+                job.progress = ctx.progress
+                job.progress_message = ctx.message
+                job.result = json.dumps(result, ensure_ascii=False, default=str) if result is not None else None
+                job.error = error
+                job.finished_at = datetime.now()
+                db.session.commit()
+            finally:
+                with self._lock:
+                    self._live.pop(job_id, None)
+                db.session.remove()
+
+
+def init_job_queue(app):
+    """创建应用的任务队列，并把已退出进程遗留的未完成任务标记为失败"""
+    app.job_queue = JobQueue(app, max_workers=app.config.get('JOB_MAX_WORKERS', 2))
+
+    with app.app_context():
+        fail_orphaned_jobs()
+
+    return app.job_queue
+
+
+def fail_orphaned_jobs():
+    """把所属队列的租约已失效（进程已退出）的未完成任务标记为失败，返回标记的数量"""
+    active = db.select(JobLease.name).where(
+        JobLease.name.like(f'{WORKER_LEASE_PREFIX}%'),
+        JobLease.expires_at >= datetime.now()
+    )
+    interrupted = BackgroundJob.query.filter(
+        BackgroundJob.status.in_(['pending', 'running']),
+        db.or_(BackgroundJob.worker.is_(None), BackgroundJob.worker.notin_(active))
+    ).update({
+        BackgroundJob.status: 'failed',
+        BackgroundJob.error: '服务重启，任务中断',
+        BackgroundJob.finished_at: datetime.now()
+    }, synchronize_session=False)
+    db.session.commit()
+    if interrupted:
+        print(f"标记 {interrupted} 个中断的后台任务为失败")
+    return interrupted
+
+
+def submit_job(job_type, params=None):
+    """提交任务到当前应用的队列"""
+    return current_app.job_queue.submit(job_type, params)
+
+
+def job_to_dict(job):
+    """序列化任务，运行中的任务使用内存中的实时进度"""
+    progress, message = job.progress, job.progress_message
+    queue = getattr(current_app, 'job_queue', None)
+    live = queue.live_progress(job.id) if queue and job.status == 'running' else None
+    if live:
+        progress, message = live
+
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'status': job.status,
+        'params': json.loads(job.params) if job.params else {},
+        'progress': progress,
+        'progress_message': message,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'cancel_requested': job.cancel_requested,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
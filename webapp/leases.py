@@ -0,0 +1,152 @@
+"""
+定时任务租约 - 基于数据库的互斥锁
+
+APScheduler 的 max_instances 只能防止同一进程内重叠执行；
+多个进程（多个 worker、调试模式的重载进程等）各自运行调度器时，
+通过 job_leases 表保证同一任务同一时间只有一个进程在执行。
+租约带过期时间，持有进程崩溃后由其他进程接管；
+执行期间由后台线程定期续期，执行时间超过租约有效期也不会被其他进程接管。
+"""
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, JobLease
+
+
+def acquire_lease(name, ttl=None):
+    """尝试获取租约，调用方的会话中不能有未提交的修改
+
+    Args:
+        name: 任务名
+        ttl: 租约有效秒数，默认读取配置 JOB_LEASE_SECONDS；执行期间会续期，持有进程崩溃后最多等待这么久被接管
+
+    Returns:
+        成功时返回持有者标识（释放时使用），租约被其他进程持有时返回 None
+    """
+    if ttl is None:
+        ttl = current_app.config.get('JOB_LEASE_SECONDS', 300)
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=ttl)
+
+    # 接管已过期的租约；条件更新是原子的，只有一个进程能成功
+    taken = JobLease.query.filter(
+        JobLease.name == name,
+        JobLease.expires_at < now
+    ).update({
+        JobLease.owner: owner,
+        JobLease.acquired_at: now,
+        JobLease.expires_at: expires_at
+    }, synchronize_session=False)
+
+    if not taken:
+        db.session.add(JobLease(name=name, owner=owner, acquired_at=now, expires_at=expires_at))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # 租约存在且未过期
+            db.session.rollback()
+            return None
+        return owner
+
+    db.session.commit()
+    return owner
+
+
+def renew_lease(name, owner, ttl=None):
+    """延长自己持有的租约，返回是否仍持有（已被其他进程接管时返回 False）"""
+    if ttl is None:
+        ttl = current_app.config.get('JOB_LEASE_SECONDS', 300)
+    renewed = JobLease.query.filter_by(name=name, owner=owner).update(
+        {JobLease.expires_at: datetime.now() + timedelta(seconds=ttl)},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return bool(renewed)
+
+
+class LeaseKeeper:
+    """在后台线程中每隔 1/3 有效期续期一次租约，直到 stop()
+
+    续期线程使用独立的会话，不影响调用方会话中的事务。
+
+    Args:
+        name: 租约名
+        owner: acquire_lease 返回的持有者标识
+        ttl: 租约有效秒数，默认读取配置 JOB_LEASE_SECONDS
+        on_renew: 每次续期成功后在续期线程中（应用上下文内）调用
+    """
+
+    def __init__(self, name, owner, ttl=None, on_renew=None):
+        self.app = current_app._get_current_object()
+        self.name = name
+        self.owner = owner
+        self.ttl = ttl if ttl is not None else self.app.config.get('JOB_LEASE_SECONDS', 300)
+        self.on_renew = on_renew
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'lease-{name}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(max(self.ttl / 3, 1)):
+            with self.app.app_context():
+                try:
+                    if not renew_lease(self.name, self.owner, self.ttl):
+                        print(f"租约 {self.name} 已被其他进程接管")
+                        return
+                    if self.on_renew:
+                        self.on_renew()
+                except Exception as e:
+                    # 数据库暂时被锁等情况，下次再试
+                    db.session.rollback()
+                    print(f"租约 {self.name} 续期失败: {e}")
+                finally:
+                    db.session.remove()
+
+
+@contextmanager
+def keep_lease(name, owner, ttl=None):
+    """执行期间自动续期租约"""
+    keeper = LeaseKeeper(name, owner, ttl).start()
+    try:
+        yield
+    finally:
+        keeper.stop()
+
+
+def release_lease(name, owner):
+    """释放自己持有的租约，已被其他进程接管时不做处理"""
+    JobLease.query.filter_by(name=name, owner=owner).delete(synchronize_session=False)
+    db.session.commit()
+
+
+@contextmanager
+def job_lease(name, ttl=None):
+    """获取租约后执行，yield 是否获取成功；未获取到时调用方应跳过本次执行
+
+    执行期间自动续期，结束（包括出错）后释放。
+    """
+    owner = acquire_lease(name, ttl)
+    if owner is None:
+        yield False
+        return
+    try:
+        with keep_lease(name, owner, ttl):
+            yield True
+    finally:
+        db.session.rollback()
+        release_lease(name, owner)
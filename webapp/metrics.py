@@ -0,0 +1,110 @@
+"""
+运行指标 - 接口耗时、AI 调用、消息入库，通过 /metrics 以 Prometheus 文本格式输出
+
+与 napcat_qce SDK 共用同一个指标注册表，NapCat 请求耗时也在 /metrics 中。
+"""
+import sys
+import os
+import time
+
+from flask import Response, g, request
+
+# 添加父目录到路径以导入 napcat_qce
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from napcat_qce.metrics import get_registry
+
+REGISTRY = get_registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'webapp_http_request_duration_seconds',
+    'Web 接口耗时（流式响应只计到开始输出）',
+    ('method', 'route', 'status')
+)
+
+AI_REQUEST_SECONDS = REGISTRY.histogram(
+    'ai_request_duration_seconds',
+    'AI 接口调用耗时（含重试，不含命中缓存的调用），outcome 为 success、error 或 circuit_open',
+    ('model', 'mode', 'outcome')
+)
+AI_TOKENS = REGISTRY.counter(
+    'ai_tokens_total',
+    'AI 调用消耗的 token 数，服务商未返回用量时为估算值',
+    ('model', 'type')
+)
+AI_CACHE_REQUESTS = REGISTRY.counter(
+    'ai_cache_requests_total',
+    'AI 响应缓存查询次数',
+    ('result',)
+)
+
+INGEST_ROWS = REGISTRY.counter(
+    'ingest_rows_total',
+    '消息入库行数，result 为 inserted 或 skipped（已存在）',
+    ('result',)
+)
+INGEST_SECONDS = REGISTRY.histogram(
+    'ingest_duration_seconds',
+    '单个聊天一批消息的入库耗时'
+)
+INGEST_ROWS_PER_SECOND = REGISTRY.histogram(
+    'ingest_rows_per_second',
+    '单个聊天一批消息的入库速度（行/秒）',
+    buckets=(100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+)
+
+
+def observe_ai_request(model, mode, outcome, seconds, prompt_tokens=0, completion_tokens=0):
+    """记录一次 AI 调用"""
+    AI_REQUEST_SECONDS.observe(seconds, model=model, mode=mode, outcome=outcome)
+    if prompt_tokens:
+        AI_TOKENS.inc(prompt_tokens, model=model, type='prompt')
+    if completion_tokens:
+        AI_TOKENS.inc(completion_tokens, model=model, type='completion')
+
+
+def observe_ingest(inserted, skipped, seconds):
+    """记录一次消息入库"""
+    INGEST_ROWS.inc(inserted, result='inserted')
+    INGEST_ROWS.inc(skipped, result='skipped')
+    INGEST_SECONDS.observe(seconds)
+    if seconds > 0 and inserted + skipped:
+        INGEST_ROWS_PER_SECOND.observe((inserted + skipped) / seconds)
+
+
+def init_metrics(app):
+    """记录每个接口的耗时，并注册 /metrics，配置 METRICS_ENABLED 关闭时不做处理"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        _observe_request(response.status_code)
+        return response
+
+    @app.teardown_request
+    def record_failed_request(exc):
+        # 未处理的异常不会经过 after_request
+        if exc is not None:
+            _observe_request(500)
+
+    app.add_url_rule('/metrics', 'metrics', render_metrics)
+
+
+def render_metrics():
+    """Prometheus 文本格式的指标"""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _observe_request(status):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return
+    # 用路由模板作为标签，/api/messages/1 和 /api/messages/2 归为同一条
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                                 route=route, status=status)
@@ -0,0 +1,116 @@
+"""
+数据库迁移 - 为已有的 app.db 补齐新增的表结构
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from models import db
+import rollups
+
+# 模型中新增的列: (表名, 列名, 列定义, 新增后执行的回填语句)
+ADDED_COLUMNS = [
+    ('monitored_chats', 'last_msg_time', 'DATETIME',
+     'UPDATE monitored_chats SET last_msg_time = ('
+     'SELECT MAX(msg_time) FROM chat_messages WHERE chat_messages.chat_id = monitored_chats.id)'),
+    ('monitored_chats', 'last_msg_seq', 'VARCHAR(50)', None),
+    ('auto_job_runs', 'chats_processed', 'INTEGER DEFAULT 0', None),
+    ('auto_job_runs', 'chats_failed', 'INTEGER DEFAULT 0', None),
+    ('auto_job_runs', 'messages_inserted', 'INTEGER DEFAULT 0', None),
+    ('auto_job_runs', 'tokens_used', 'INTEGER DEFAULT 0', None),
+    ('auto_job_runs', 'stage_timings', 'TEXT', None),
+    ('auto_job_runs', 'chat_timings', 'TEXT', None),
+    ('background_jobs', 'worker', 'VARCHAR(100)', None),
+]
+
+
+# 消息全文索引（仅 SQLite）：外部内容 FTS5 表和保持同步的触发器
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE chat_messages_fts USING fts5(
+        content, sender_name,
+        content='chat_messages', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER chat_messages_fts_insert AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts(rowid, content, sender_name)
+        VALUES (new.id, new.content, new.sender_name);
+    END""",
+    """CREATE TRIGGER chat_messages_fts_delete AFTER DELETE ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts(chat_messages_fts, rowid, content, sender_name)
+        VALUES ('delete', old.id, old.content, old.sender_name);
+    END""",
+    """CREATE TRIGGER chat_messages_fts_update AFTER UPDATE OF content, sender_name ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts(chat_messages_fts, rowid, content, sender_name)
+        VALUES ('delete', old.id, old.content, old.sender_name);
+        INSERT INTO chat_messages_fts(rowid, content, sender_name)
+        VALUES (new.id, new.content, new.sender_name);
+    END""",
+]
+
+
+def upgrade_schema():
+    """升级数据库结构
+
+    db.create_all() 只会创建缺失的表，不会修改已存在的表，
+    因此新增的列需要在这里通过 ALTER TABLE 补上，新增的索引也在这里创建。
+    """
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    columns = {}
+
+    with db.engine.begin() as conn:
+        for table, column, ddl, backfill in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            if table not in columns:
+                columns[table] = {c['name'] for c in inspector.get_columns(table)}
+            if column in columns[table]:
+                continue
+
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+            if backfill:
+                conn.execute(text(backfill))
+            columns[table].add(column)
+            print(f"数据库迁移: {table} 新增列 {column}")
+
+        # 模型中新增的索引
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {i['name'] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                index.create(bind=conn)
+                print(f"数据库迁移: {table.name} 新增索引 {index.name}")
+
+    if db.engine.dialect.name == 'sqlite' and 'chat_messages_fts' not in tables:
+        _create_search_index()
+
+    _backfill_rollups()
+
+
+def _backfill_rollups():
+    """按天汇总表为空而已有消息时，从 chat_messages 生成汇总"""
+    has_stats = db.session.execute(text('SELECT 1 FROM chat_daily_stats LIMIT 1')).first()
+    has_messages = db.session.execute(text('SELECT 1 FROM chat_messages LIMIT 1')).first()
+    if has_stats or not has_messages:
+        return
+
+    rollups.rebuild()
+    db.session.commit()
+    print("数据库迁移: 生成按天汇总的消息统计 chat_daily_stats")
+
+
+def _create_search_index():
+    """创建消息全文索引并导入已有消息
+
+    需要 SQLite 3.34+ 的 trigram 分词器，不支持时跳过，搜索回退到 LIKE。
+    """
+    try:
+        with db.engine.begin() as conn:
+            for ddl in SEARCH_INDEX_DDL:
+                conn.execute(text(ddl))
+            conn.execute(text("INSERT INTO chat_messages_fts(chat_messages_fts) VALUES ('rebuild')"))
+    except OperationalError as e:
+        print(f"数据库迁移: 无法创建全文索引，关键词搜索将使用 LIKE ({e})")
+        return
+
+    print("数据库迁移: 新增全文索引 chat_messages_fts")
@@ -48,11 +48,19 @@ class MonitoredChat(db.Model):
     name = db.Column(db.String(200), nullable=False)  # 显示名称
     enabled = db.Column(db.Boolean, default=True)  # 是否启用监控
     last_fetch_time = db.Column(db.DateTime, nullable=True)  # 上次获取时间
+    # 增量同步游标：已入库的最新消息
+    last_msg_time = db.Column(db.DateTime, nullable=True)  # 最新消息时间
+    last_msg_seq = db.Column(db.String(50), nullable=True)  # 最新消息序号
     created_at = db.Column(db.DateTime, default=datetime.now)
 
     # 关联的消息
     messages = db.relationship('ChatMessage', backref='chat', lazy='dynamic',
                                cascade='all, delete-orphan')
+    # 按天汇总的统计
+    daily_stats = db.relationship('ChatDailyStats', lazy='dynamic',
+                                  cascade='all, delete-orphan')
+    daily_senders = db.relationship('ChatDailySender', lazy='dynamic',
+                                    cascade='all, delete-orphan')
 
     __table_args__ = (
         db.UniqueConstraint('chat_type', 'peer_id', name='unique_chat'),
@@ -78,6 +86,50 @@ class ChatMessage(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('chat_id', 'msg_id', name='unique_message'),
+        # 按聊天浏览、按时间范围统计和总结
+        db.Index('ix_chat_messages_chat_time', 'chat_id', 'msg_time'),
+        # 统计发送者数量时只需扫描索引
+        db.Index('ix_chat_messages_chat_sender', 'chat_id', 'sender_name'),
+        # 不指定聊天的时间范围查询
+        db.Index('ix_chat_messages_msg_time', 'msg_time'),
+        # 只包含未被 AI 处理的消息，任务分析只扫描这部分
+        db.Index('ix_chat_messages_unprocessed', 'msg_time', 'chat_id',
+                 sqlite_where=db.text('ai_processed = 0 OR ai_processed IS NULL'),
+                 postgresql_where=db.text('ai_processed = false OR ai_processed IS NULL')),
+    )
+
+
+class ChatDailyStats(db.Model):
+    """聊天按天汇总的消息统计，由 rollups.py 在入库和 AI 处理时增量维护"""
+    __tablename__ = 'chat_daily_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    chat_id = db.Column(db.Integer, db.ForeignKey('monitored_chats.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)  # 消息日期
+    message_count = db.Column(db.Integer, default=0, nullable=False)  # 消息数
+    sender_count = db.Column(db.Integer, default=0, nullable=False)  # 当天不同发送者数
+    first_msg_time = db.Column(db.DateTime, nullable=True)  # 当天最早消息时间
+    last_msg_time = db.Column(db.DateTime, nullable=True)  # 当天最晚消息时间
+    processed_count = db.Column(db.Integer, default=0, nullable=False)  # 已被 AI 处理的消息数
+
+    __table_args__ = (
+        db.UniqueConstraint('chat_id', 'day', name='unique_chat_day'),
+    )
+
+
+class ChatDailySender(db.Model):
+    """聊天每天出现过的发送者，用于增量维护发送者数和跨天去重"""
+    __tablename__ = 'chat_daily_senders'
+
+    id = db.Column(db.Integer, primary_key=True)
+    chat_id = db.Column(db.Integer, db.ForeignKey('monitored_chats.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    sender_name = db.Column(db.String(200), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('chat_id', 'day', 'sender_name', name='unique_chat_day_sender'),
+        # 统计整个聊天的发送者数时只需扫描索引
+        db.Index('ix_chat_daily_senders_chat_sender', 'chat_id', 'sender_name'),
     )
 
 
@@ -138,3 +190,67 @@ class AutoJob(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # 执行历史
+    runs = db.relationship('AutoJobRun', backref='auto_job', lazy='dynamic',
+                           cascade='all, delete-orphan')
+
+
+class AutoJobRun(db.Model):
+    """自动任务的一次执行记录"""
+    __tablename__ = 'auto_job_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    auto_job_id = db.Column(db.Integer, db.ForeignKey('auto_jobs.id'), nullable=False)
+    trigger = db.Column(db.String(20), default='scheduled')  # scheduled(定时触发), manual(手动执行)
+    status = db.Column(db.String(20), default='running')  # running, success, failed, skipped(上一次执行尚未结束)
+    message = db.Column(db.Text, nullable=True)  # 执行结果或失败原因
+    started_at = db.Column(db.DateTime, default=datetime.now)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration = db.Column(db.Float, nullable=True)  # 耗时（秒）
+
+    # 执行指标（来自 pipeline.Pipeline.report()）
+    chats_processed = db.Column(db.Integer, default=0)  # 处理成功的聊天数
+    chats_failed = db.Column(db.Integer, default=0)  # 处理失败的聊天数
+    messages_inserted = db.Column(db.Integer, default=0)  # 新增消息数
+    tokens_used = db.Column(db.Integer, default=0)  # 消耗的 AI token 数（命中缓存不计）
+    stage_timings = db.Column(db.Text, nullable=True)  # 各阶段耗时 JSON: {"fetch": 1.2, ...}
+    chat_timings = db.Column(db.Text, nullable=True)  # 各聊天耗时 JSON: {"聊天名称": 3.4, ...}
+
+    __table_args__ = (
+        db.Index('ix_auto_job_runs_job_started', 'auto_job_id', 'started_at'),
+    )
+
+
+class JobLease(db.Model):
+    """定时任务的执行租约，保证同一任务在多个进程中不会同时执行（见 leases.py）"""
+    __tablename__ = 'job_leases'
+
+    name = db.Column(db.String(100), primary_key=True)  # 任务名，如 auto_job_1
+    owner = db.Column(db.String(100), nullable=False)  # 持有者标识
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)  # 过期后可被其他进程接管（持有进程崩溃时）
+
+
+class BackgroundJob(db.Model):
+    """后台任务（耗时的获取消息、AI 总结等接口提交到 jobs.JobQueue 执行）"""
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)  # fetch_messages, generate_summary, analyze_tasks, run_auto_job
+    status = db.Column(db.String(20), default='pending')  # pending, running, success, failed, cancelled
+    params = db.Column(db.Text, nullable=True)  # 参数 JSON
+    progress = db.Column(db.Integer, default=0)  # 进度 0-100
+    progress_message = db.Column(db.String(500), nullable=True)  # 当前进度说明
+    result = db.Column(db.Text, nullable=True)  # 结果 JSON
+    error = db.Column(db.Text, nullable=True)  # 失败原因
+    cancel_requested = db.Column(db.Boolean, default=False)  # 是否已请求取消
+    worker = db.Column(db.String(100), nullable=True)  # 执行任务的队列（进程）的租约名
+
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_background_jobs_status', 'status'),
+    )
@@ -0,0 +1,73 @@
+"""
+游标分页 - 基于排序键的 keyset 分页
+
+按 (时间, id) 倒序翻页，下一页从上一页最后一行之后开始，
+不需要 OFFSET 和 COUNT(*)，翻到多深都只读取一页的数据。
+游标是对排序键取值的 base64 编码，对客户端不透明。
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_, literal, DateTime
+
+# 每页数量上限，避免单次请求读出整张表
+MAX_PER_PAGE = 200
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析"""
+
+
+def encode_cursor(values):
+    """把排序键的取值编码为游标"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """解析游标，按列类型还原排序键的取值"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError('cursor length mismatch')
+        return [
+            datetime.fromisoformat(v) if isinstance(c.type, DateTime) else v
+            for c, v in zip(columns, payload)
+        ]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('无效的分页游标') from e
+
+
+def keyset_paginate(query, columns, per_page, cursor=None):
+    """按 columns 倒序取一页
+
+    Args:
+        query: 已加好筛选条件、尚未排序的查询
+        columns: 排序键，最后一列必须唯一（通常是 id）
+        per_page: 每页数量，超出 1..MAX_PER_PAGE 时取边界值
+        cursor: 上一页返回的游标，为空时从第一页开始
+
+    Returns:
+        (本页数据, 下一页游标)，没有更多数据时游标为 None
+
+    Raises:
+        InvalidCursor: 游标无法解析
+    """
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.filter(
+            tuple_(*columns) < tuple_(*[literal(v, c.type) for c, v in zip(columns, values)])
+        )
+
+    # 多取一行判断是否还有下一页
+    items = query.order_by(*[c.desc() for c in columns]).limit(per_page + 1).all()
+    if len(items) <= per_page:
+        return items, None
+
+    items = items[:per_page]
+    last = items[-1]
+    return items, encode_cursor([getattr(last, c.key) for c in columns])
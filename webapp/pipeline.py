@@ -0,0 +1,372 @@
+"""
+消息处理流水线 - 获取、规范化、入库、总结、提取任务
+
+接口、后台任务、自动任务和 legacy 调度都通过 Pipeline 处理消息，
+每个阶段接受一批输入，耗时分别记录在 PipelineRun 中：
+- fetch: 在线程池中并发请求 NapCat，每个聊天一个线程
+- normalize: 把原始消息转换为入库用的字典，在获取线程中逐条进行
+- persist: 在调用线程中批量写入，SQLite 始终只有一个写入者
+- summarize: 生成并保存 AI 总结，多个聊天时各聊天并发调用 AI
+- extract: 提取并保存任务，只把成功提取的消息标记为已处理
+"""
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import current_app
+
+from models import db, Settings, ChatMessage, AISummary, Task
+from ai_service import AIService
+from chat_service import ChatService
+from ingestion import ingest_messages
+from rollups import mark_processed
+
+STAGES = ('fetch', 'normalize', 'persist', 'summarize', 'extract')
+
+# 传给 AI 工作线程的消息快照
+MessageSnapshot = namedtuple('MessageSnapshot', 'id chat_id msg_time sender_name content')
+
+
+class PipelineRun:
+    """一次流水线执行的统计：各阶段耗时（秒，并发执行的阶段为各聊天耗时之和）和计数"""
+
+    def __init__(self):
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        self.counts = Counter()
+        self.chat_seconds = Counter()  # 每个聊天（按名称）各阶段耗时之和
+
+    @contextmanager
+    def stage(self, name):
+        """统计一段代码的耗时并计入阶段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, chat=None):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        if chat is not None:
+            self.chat_seconds[chat] += seconds
+
+    def report(self):
+        """各阶段耗时、计数和每个聊天的耗时，可 JSON 序列化"""
+        return {
+            'timings': {name: round(seconds, 3) for name, seconds in self.timings.items() if seconds},
+            'counts': dict(self.counts),
+            'chats': {name: round(seconds, 3) for name, seconds in self.chat_seconds.most_common()},
+        }
+
+    def log(self):
+        timings = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in self.timings.items() if seconds)
+        if timings:
+            print(f"  流水线耗时: {timings}")
+
+
+class Pipeline:
+    """消息处理流水线
+
+    Args:
+        settings: Settings 对象，默认读取数据库中的设置
+        use_cache: 是否读取 AI 响应缓存
+    """
+
+    def __init__(self, settings=None, use_cache=True):
+        self.settings = settings or Settings.get_settings()
+        self.use_cache = use_cache
+        self.run = PipelineRun()
+        self._ai_service = None
+
+    @property
+    def ai_service(self):
+        if self._ai_service is None:
+            self._ai_service = AIService(self.settings, use_cache=self.use_cache)
+        return self._ai_service
+
+    @property
+    def tokens_used(self):
+        """本次执行调用 AI 消耗的 token 数"""
+        return self._ai_service.tokens_used if self._ai_service else 0
+
+    def report(self):
+        """本次执行的统计（PipelineRun.report()，计数中加上 token 数）"""
+        report = self.run.report()
+        report['counts']['tokens'] = self.tokens_used
+        return report
+
+    # ==================== 获取 / 规范化 / 入库 ====================
+
+    def ingest(self, chats, days, chat_service=None, max_workers=None, on_progress=None):
+        """并发获取多个聊天的消息并入库
+
+        NapCat 请求和消息规范化在线程池中并行执行，入库则在调用线程中按完成顺序逐个进行。
+        整体耗时取决于最慢的聊天而不是所有聊天之和。
+
+        Args:
+            chats: MonitoredChat 对象列表
+            days: 没有同步游标时获取最近几天的消息
+            chat_service: ChatService 实例，默认按设置创建
+            max_workers: 最大并发数，默认读取配置 FETCH_MAX_WORKERS
+            on_progress: 每完成一个聊天调用一次 on_progress(已完成数, 总数, 结果)，
+                抛出异常时停止处理剩余的聊天
+
+        Returns:
+            每个聊天的结果列表，每项包含 chat, inserted, skipped, elapsed, error
+        """
+        chats = [c for c in chats if c]
+        if not chats:
+            return []
+
+        if max_workers is None:
+            max_workers = current_app.config.get('FETCH_MAX_WORKERS', 4)
+        chat_service = chat_service or ChatService(self.settings)
+
+        # 预先创建客户端，避免多个线程同时初始化
+        chat_service.get_client()
+
+        results = []
+        futures = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chats))))
+        try:
+            # 线程中不访问 ORM 对象，只传入普通参数
+            futures = {
+                executor.submit(
+                    _fetch_one, chat_service,
+                    chat.chat_type, chat.peer_id, chat.peer_uid, days, chat.last_msg_time
+                ): chat
+                for chat in chats
+            }
+
+            for future in as_completed(futures):
+                chat = futures[future]
+                result = {'chat': chat, 'inserted': 0, 'skipped': 0, 'elapsed': 0.0, 'error': None}
+
+                try:
+                    messages, fetch_seconds, normalize_seconds = future.result()
+                    result['elapsed'] = fetch_seconds + normalize_seconds
+                    self.run.add_time('fetch', fetch_seconds, chat.name)
+                    self.run.add_time('normalize', normalize_seconds, chat.name)
+                    self.run.counts['messages_fetched'] += len(messages)
+
+                    persist_start = time.perf_counter()
+                    result['inserted'], result['skipped'] = ingest_messages(chat, messages)
+                    chat.last_fetch_time = datetime.now()
+                    db.session.commit()
+                    self.run.add_time('persist', time.perf_counter() - persist_start, chat.name)
+
+                    self.run.counts['messages_inserted'] += result['inserted']
+                    print(f"  {chat.name}: 新增 {result['inserted']} 条消息 ({result['elapsed']:.1f}s)")
+
+                except Exception as e:
+                    result['error'] = str(e)
+                    self.run.counts['chats_failed'] += 1
+                    print(f"  {chat.name}: 获取失败 - {e}")
+                    db.session.rollback()
+
+                self.run.counts['chats'] += 1
+                results.append(result)
+                if on_progress:
+                    on_progress(len(results), len(chats), result)
+        finally:
+            # on_progress 抛出异常（例如任务被取消）时，尚未开始的获取不再执行，也不等待进行中的获取
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        return results
+
+    # ==================== 总结 / 提取任务 ====================
+
+    def summarize(self, chat_id, messages, start_time, end_time, summary_type='custom'):
+        """生成并保存一段消息的总结，调用方负责 commit"""
+        with self.run.stage('summarize'):
+            summary_text = self.ai_service.generate_summary(messages)
+        return self.save_summary(chat_id, summary_text, start_time, end_time, summary_type)
+
+    def save_summary(self, chat_id, summary_text, start_time, end_time, summary_type='custom'):
+        """保存总结，调用方负责 commit"""
+        summary = AISummary(
+            chat_id=chat_id,
+            summary_type=summary_type,
+            date_range_start=start_time,
+            date_range_end=end_time,
+            summary_text=summary_text
+        )
+        db.session.add(summary)
+        self.run.counts['summaries'] += 1
+        return summary
+
+    def extract(self, chat_id, messages):
+        """从消息中提取并保存任务，调用方负责 commit
+
+        Returns:
+            (新任务列表, 已处理的消息列表)
+        """
+        with self.run.stage('extract'):
+            tasks_data, processed = self.ai_service.extract_tasks_chunked(messages)
+
+        new_tasks = self.save_tasks(chat_id, tasks_data)
+        # 只标记成功提取的分段中的消息，失败的留待下次处理
+        mark_processed([m.id for m in processed])
+        self.run.counts['messages_processed'] += len(processed)
+        return new_tasks, processed
+
+    def save_tasks(self, chat_id, tasks_data):
+        """保存 AI 返回的任务，调用方负责 commit"""
+        new_tasks = []
+        for t in tasks_data:
+            if not t.get('title'):
+                continue
+
+            task = Task(
+                chat_id=chat_id,
+                title=t['title'].strip(),
+                description=t.get('description'),
+                priority=t.get('priority', 3),
+                deadline=datetime.fromisoformat(t['deadline']) if t.get('deadline') else None,
+                source_message=t.get('source_message'),
+                ai_analysis=t.get('analysis')
+            )
+            db.session.add(task)
+            new_tasks.append(task)
+
+        self.run.counts['tasks'] += len(new_tasks)
+        return new_tasks
+
+    def process_chats(self, chats, start_time, end_time, summarize=True, extract=False,
+                      summary_type='auto'):
+        """总结和/或提取多个聊天的任务，每个聊天单独提交，失败不影响其他聊天
+
+        各聊天的 AI 调用在线程池中并发进行，并发数为配置 AI_CHAT_WORKERS，
+        且不超过该 AI 端点的并发请求上限；工作线程只接触消息快照，
+        总结和任务在调用线程中按完成顺序写入，SQLite 始终只有一个写入者。
+
+        Args:
+            chats: MonitoredChat 对象列表
+            start_time: 开始时间
+            end_time: 结束时间
+            summarize: 是否生成总结
+            extract: 是否提取任务（只处理未被 AI 处理过的消息）
+            summary_type: 总结类型
+        """
+        pending = []
+        for chat in chats:
+            if not chat:
+                continue
+
+            messages = load_messages(chat.id, start_time, end_time, unprocessed_only=not summarize)
+            if not messages:
+                if summarize:
+                    print(f"  {chat.name}: 没有消息，跳过")
+                continue
+
+            # 每个聊天提交后会话中的对象都会过期，这里先复制出普通值，之后不再访问 ORM 对象
+            unprocessed = [_snapshot(m) for m in messages if not m.ai_processed] if extract else []
+            snapshots = [_snapshot(m) for m in messages] if summarize else []
+            pending.append((chat.id, chat.name, snapshots, unprocessed))
+
+        if not pending:
+            return
+
+        ai_service = self.ai_service
+        max_concurrency = ai_service.client.config.max_concurrency or len(pending)
+        workers = min(current_app.config.get('AI_CHAT_WORKERS', 4), max_concurrency, len(pending))
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(self._analyze_chat, messages, unprocessed): (chat_id, chat_name)
+                for chat_id, chat_name, messages, unprocessed in pending
+            }
+
+            for future in as_completed(futures):
+                chat_id, chat_name = futures[future]
+                try:
+                    summary_text, tasks_data, processed_ids, timings = future.result()
+                    for name, seconds in timings.items():
+                        self.run.add_time(name, seconds, chat_name)
+
+                    if summary_text is not None:
+                        self.save_summary(chat_id, summary_text, start_time, end_time, summary_type)
+
+                    if tasks_data is not None:
+                        new_tasks = self.save_tasks(chat_id, tasks_data)
+                        mark_processed(processed_ids)
+                        self.run.counts['messages_processed'] += len(processed_ids)
+                        print(f"  {chat_name}: 提取 {len(new_tasks)} 个新任务")
+
+                    db.session.commit()
+                    self.run.counts['chats'] += 1
+                    if summary_text is not None:
+                        print(f"  {chat_name}: 总结完成")
+
+                except Exception as e:
+                    print(f"  {chat_name}: 处理失败 - {e}")
+                    self.run.counts['chats_failed'] += 1
+                    db.session.rollback()
+
+    def _analyze_chat(self, messages, unprocessed):
+        """在工作线程中调用 AI 总结和提取任务，不访问数据库
+
+        Returns:
+            (总结文本或 None, 任务列表或 None, 已处理的消息 id 集合, 各阶段耗时)
+        """
+        summary_text = tasks_data = None
+        processed_ids = set()
+        timings = {}
+
+        if messages:
+            start = time.perf_counter()
+            summary_text = self.ai_service.generate_summary(messages)
+            timings['summarize'] = time.perf_counter() - start
+
+        if unprocessed:
+            start = time.perf_counter()
+            tasks_data, processed = self.ai_service.extract_tasks_chunked(unprocessed)
+            processed_ids = {m.id for m in processed}
+            timings['extract'] = time.perf_counter() - start
+
+        return summary_text, tasks_data, processed_ids, timings
+
+
+def load_messages(chat_id, start_time, end_time, unprocessed_only=False):
+    """按时间顺序查询一个聊天在时间范围内的消息"""
+    query = ChatMessage.query.filter(
+        ChatMessage.msg_time >= start_time,
+        ChatMessage.msg_time <= end_time
+    )
+    if chat_id:
+        query = query.filter(ChatMessage.chat_id == chat_id)
+    if unprocessed_only:
+        query = query.filter(
+            db.or_(
+                ChatMessage.ai_processed == False,
+                ChatMessage.ai_processed.is_(None)
+            )
+        )
+    return query.order_by(ChatMessage.msg_time.asc()).all()
+
+
+def _snapshot(msg):
+    """复制 AI 需要的消息字段，工作线程不能访问 ORM 对象（主线程提交后会过期并触发查询）"""
+    return MessageSnapshot(msg.id, msg.chat_id, msg.msg_time, msg.sender_name, msg.content)
+
+
+def _fetch_one(chat_service, chat_type, peer_id, peer_uid, days, since):
+    """在工作线程中获取并规范化单个聊天的消息，返回 (消息列表, 获取耗时, 规范化耗时)"""
+    start = time.perf_counter()
+    normalize_seconds = 0.0
+    messages = []
+    for msg in chat_service.iter_raw_messages(
+        chat_type=chat_type,
+        peer_id=peer_id,
+        peer_uid=peer_uid,
+        days=days,
+        since=since
+    ):
+        normalize_start = time.perf_counter()
+        messages.append(chat_service.normalize_message(msg))
+        normalize_seconds += time.perf_counter() - normalize_start
+
+    return messages, time.perf_counter() - start - normalize_seconds, normalize_seconds
@@ -0,0 +1,166 @@
+"""
+消息统计汇总 - 按聊天、按天预聚合的消息统计
+
+chat_daily_stats 每个聊天每天一行，记录消息数、发送者数、首末消息时间和已处理数；
+chat_daily_senders 记录每天出现过的发送者，用于增量计算发送者数。
+两张表在消息入库（ingestion.py）和标记 AI 处理状态时随同一个事务更新，
+统计接口只读这两张表，不再扫描 chat_messages。
+"""
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from sqlalchemy import func, case, cast, bindparam, Date
+
+from models import db, ChatMessage, ChatDailyStats, ChatDailySender
+
+# 标记已处理时每条 UPDATE 的 id 数，低于 SQLite 的绑定参数上限
+MARK_BATCH_SIZE = 500
+
+
+def record_ingested(chat_id, rows):
+    """把新入库的消息计入汇总，调用方负责 commit
+
+    Args:
+        chat_id: 聊天 id
+        rows: 本次实际写入的消息（ingest_messages 构造的行字典）
+    """
+    if not rows:
+        return
+
+    by_day = defaultdict(list)
+    for row in rows:
+        by_day[row['msg_time'].date()].append(row)
+    days = list(by_day)
+
+    stats = {
+        s.day: s for s in ChatDailyStats.query.filter(
+            ChatDailyStats.chat_id == chat_id,
+            ChatDailyStats.day.in_(days)
+        )
+    }
+    known_senders = defaultdict(set)
+    for day, name in db.session.query(ChatDailySender.day, ChatDailySender.sender_name).filter(
+        ChatDailySender.chat_id == chat_id,
+        ChatDailySender.day.in_(days)
+    ):
+        known_senders[day].add(name)
+
+    new_senders = []
+    for day, day_rows in by_day.items():
+        item = stats.get(day)
+        if item is None:
+            item = ChatDailyStats(chat_id=chat_id, day=day, message_count=0,
+                                  sender_count=0, processed_count=0)
+            db.session.add(item)
+
+        times = [r['msg_time'] for r in day_rows]
+        item.message_count += len(day_rows)
+        item.first_msg_time = min([t for t in (item.first_msg_time, min(times)) if t])
+        item.last_msg_time = max([t for t in (item.last_msg_time, max(times)) if t])
+
+        names = {r['sender_name'] for r in day_rows} - known_senders[day]
+        item.sender_count += len(names)
+        new_senders.extend(
+            {'chat_id': chat_id, 'day': day, 'sender_name': name} for name in names
+        )
+
+    if new_senders:
+        db.session.execute(ChatDailySender.__table__.insert(), new_senders)
+
+
+def mark_processed(message_ids, now=None):
+    """按 id 把消息标记为已被 AI 处理，并同步汇总中的已处理数，调用方负责 commit
+
+    用批量 UPDATE 而不是逐条修改 ORM 对象，调用方提交后对象过期也不会逐行重新加载；
+    会话中已加载的 ChatMessage 对象不会同步更新。
+    """
+    now = now or datetime.now()
+    ids = list(set(message_ids))
+    counts = Counter()
+    for start in range(0, len(ids), MARK_BATCH_SIZE):
+        batch = ids[start:start + MARK_BATCH_SIZE]
+        unprocessed = ChatMessage.id.in_(batch) & db.or_(
+            ChatMessage.ai_processed == False,
+            ChatMessage.ai_processed.is_(None)
+        )
+        for chat_id, msg_time in db.session.query(ChatMessage.chat_id, ChatMessage.msg_time).filter(unprocessed):
+            counts[(chat_id, msg_time.date())] += 1
+
+        db.session.execute(
+            ChatMessage.__table__.update()
+            .where(ChatMessage.__table__.c.id.in_(batch))
+            .values(ai_processed=True, ai_processed_at=now)
+        )
+
+    if not counts:
+        return
+
+    table = ChatDailyStats.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.chat_id == bindparam('b_chat_id'), table.c.day == bindparam('b_day'))
+        .values(processed_count=table.c.processed_count + bindparam('b_count')),
+        [{'b_chat_id': chat_id, 'b_day': day, 'b_count': n} for (chat_id, day), n in counts.items()]
+    )
+
+
+def reset_processed(chat_id=None):
+    """清除已处理数，与清除消息的已分析状态同时调用"""
+    query = ChatDailyStats.query
+    if chat_id:
+        query = query.filter_by(chat_id=chat_id)
+    query.update({ChatDailyStats.processed_count: 0}, synchronize_session=False)
+
+
+def rebuild():
+    """从 chat_messages 重新生成全部汇总，用于迁移时回填已有数据，调用方负责 commit"""
+    if db.engine.dialect.name == 'sqlite':
+        day = func.date(ChatMessage.msg_time)
+    else:
+        day = cast(ChatMessage.msg_time, Date)
+
+    ChatDailySender.query.delete(synchronize_session=False)
+    ChatDailyStats.query.delete(synchronize_session=False)
+
+    db.session.execute(ChatDailySender.__table__.insert().from_select(
+        ['chat_id', 'day', 'sender_name'],
+        db.select(ChatMessage.chat_id, day, ChatMessage.sender_name).distinct()
+    ))
+    db.session.execute(ChatDailyStats.__table__.insert().from_select(
+        ['chat_id', 'day', 'message_count', 'sender_count',
+         'first_msg_time', 'last_msg_time', 'processed_count'],
+        db.select(
+            ChatMessage.chat_id, day, func.count(),
+            func.count(func.distinct(ChatMessage.sender_name)),
+            func.min(ChatMessage.msg_time), func.max(ChatMessage.msg_time),
+            func.sum(case((ChatMessage.ai_processed == True, 1), else_=0))
+        ).group_by(ChatMessage.chat_id, day)
+    ))
+
+
+def chat_stats(chat_id):
+    """单个聊天的统计：总消息数、今日消息数、发送者数、记录天数"""
+    today = datetime.now().date()
+    total, today_count, first_time = db.session.query(
+        func.coalesce(func.sum(ChatDailyStats.message_count), 0),
+        func.coalesce(func.sum(case((ChatDailyStats.day == today, ChatDailyStats.message_count),
+                                    else_=0)), 0),
+        func.min(ChatDailyStats.first_msg_time)
+    ).filter(ChatDailyStats.chat_id == chat_id).one()
+
+    senders = db.session.query(func.count(func.distinct(ChatDailySender.sender_name)))\
+        .filter(ChatDailySender.chat_id == chat_id).scalar() or 0
+
+    days = (datetime.now() - first_time).days + 1 if first_time else 0
+
+    return {
+        'total': total,
+        'today': today_count,
+        'senders': senders,
+        'days': days
+    }
+
+
+def total_messages():
+    """所有聊天的消息总数"""
+    return db.session.query(func.coalesce(func.sum(ChatDailyStats.message_count), 0)).scalar()
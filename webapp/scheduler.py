@@ -1,316 +1,245 @@
 """
 定时任务调度器
 """
+import json
 from datetime import datetime, timedelta
-from models import db, Settings, MonitoredChat, ChatMessage, AISummary, Task, AutoJob
-from chat_service import ChatService
+from flask import current_app
+from models import db, Settings, MonitoredChat, AutoJob, AutoJobRun, JobLease
+from pipeline import Pipeline
+from leases import acquire_lease, release_lease, keep_lease, job_lease
+
+
+class AutoJobSkipped(Exception):
+    """其他进程正在执行同一自动任务，本次执行被跳过"""
 
 
 def init_scheduler(scheduler, app):
     """初始化定时任务 - 加载所有启用的自动任务"""
     with app.app_context():
+        _fail_interrupted_runs()
+
         # 加载所有启用的自动任务
         jobs = AutoJob.query.filter_by(enabled=True).all()
         for job in jobs:
-            _add_job_to_scheduler(scheduler, app, job)
+            schedule_auto_job(scheduler, app, job)
             print(f"已加载自动任务: {job.name}")
 
         print(f"定时任务调度器已启动，共加载 {len(jobs)} 个自动任务")
 
 
-def _add_job_to_scheduler(scheduler, app, job):
-    """添加任务到调度器"""
+def _fail_interrupted_runs():
+    """把上次进程退出时未结束的执行记录标记为失败，租约仍有效的（其他进程正在执行）除外"""
+    now = datetime.now()
+    active = {lease.name for lease in JobLease.query.filter(JobLease.expires_at >= now)}
+    interrupted = [
+        run for run in AutoJobRun.query.filter_by(status='running')
+        if f'auto_job_{run.auto_job_id}' not in active
+    ]
+    for run in interrupted:
+        run.status = 'failed'
+        run.message = '服务重启，执行中断'
+        run.finished_at = now
+    db.session.commit()
+    if interrupted:
+        print(f"标记 {len(interrupted)} 个中断的自动任务执行记录为失败")
+
+
+def schedule_auto_job(scheduler, app, job):
+    """添加自动任务到调度器，已存在时替换
+
+    同一任务最多同时执行一次（上一次未结束时跳过本次触发），
+    错过的多次触发合并为一次。间隔任务错过超过半个间隔就等下一次，
+    定时任务在宽限时间（SCHEDULER_MISFIRE_GRACE）内仍会补执行。
+    """
     job_id = f'auto_job_{job.id}'
-
-    # 先移除可能存在的旧任务
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
+    options = dict(
+        id=job_id,
+        func=execute_auto_job,
+        args=[app, job.id],
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
 
     if job.schedule_type == 'interval':
         scheduler.add_job(
-            id=job_id,
-            func=execute_auto_job,
-            args=[app, job.id],
             trigger='interval',
             minutes=job.interval_minutes,
-            replace_existing=True
+            misfire_grace_time=max(1, job.interval_minutes * 30),
+            **options
         )
     else:  # cron
         scheduler.add_job(
-            id=job_id,
-            func=execute_auto_job,
-            args=[app, job.id],
             trigger='cron',
             hour=job.cron_hour,
             minute=job.cron_minute,
-            replace_existing=True
+            misfire_grace_time=app.config.get('SCHEDULER_MISFIRE_GRACE', 3600),
+            **options
         )
 
 
-def execute_auto_job(app, job_id):
-    """执行自动任务"""
-    with app.app_context():
-        job = AutoJob.query.get(job_id)
-        if not job:
-            return "任务不存在"
-
-        print(f"开始执行自动任务: {job.name} (类型: {job.job_type})")
-
-        try:
-            if job.job_type == 'fetch_messages':
-                result = _execute_fetch_messages(job)
-            elif job.job_type == 'ai_summary':
-                result = _execute_ai_summary(job)
-            elif job.job_type == 'extract_tasks':
-                result = _execute_extract_tasks(job)
-            else:
-                result = f"未知任务类型: {job.job_type}"
-
-            # 更新执行状态
-            job.last_run_time = datetime.now()
-            job.last_run_status = 'success'
-            job.last_run_message = result
-            db.session.commit()
-
-            print(f"自动任务完成: {job.name} - {result}")
-            return result
-
-        except Exception as e:
-            job.last_run_time = datetime.now()
-            job.last_run_status = 'failed'
-            job.last_run_message = str(e)
-            db.session.commit()
+def unschedule_auto_job(scheduler, job):
+    """从调度器移除自动任务"""
+    job_id = f'auto_job_{job.id}'
+    if scheduler.get_job(job_id):
+        scheduler.remove_job(job_id)
 
-            print(f"自动任务失败: {job.name} - {e}")
-            raise
 
+def execute_auto_job(app, job_id, trigger='scheduled'):
+    """执行自动任务
 
-def _execute_fetch_messages(job):
-    """执行获取消息任务"""
-    settings = Settings.get_settings()
-    chat_service = ChatService(settings)
+    执行前获取数据库租约，其他进程正在执行同一任务时跳过；执行期间租约自动续期，结束后释放。
+    每次执行都记录到 auto_job_runs。
 
-    # 确定要获取的聊天
-    if job.chat_id:
-        chats = [MonitoredChat.query.get(job.chat_id)]
-    else:
-        chats = MonitoredChat.query.filter_by(enabled=True).all()
+    Args:
+        app: Flask 应用
+        job_id: 自动任务 id
+        trigger: scheduled(定时触发) 或 manual(手动执行)
 
-    total_new = 0
-    for chat in chats:
-        if not chat:
-            continue
+    Raises:
+        AutoJobSkipped: 手动执行时被跳过（定时触发被跳过时只返回说明）
+    """
+    with app.app_context():
+        job = db.session.get(AutoJob, job_id)
+        if not job:
+            return "任务不存在"
 
-        try:
-            messages = chat_service.fetch_messages(
-                chat_type=chat.chat_type,
-                peer_id=chat.peer_id,
-                peer_uid=chat.peer_uid,
-                days=job.days
-            )
-
-            new_count = 0
-            for msg_data in messages:
-                existing = ChatMessage.query.filter_by(
-                    chat_id=chat.id,
-                    msg_id=msg_data['msg_id']
-                ).first()
-
-                if not existing:
-                    message = ChatMessage(
-                        chat_id=chat.id,
-                        msg_id=msg_data['msg_id'],
-                        sender_name=msg_data['sender_name'],
-                        sender_id=msg_data.get('sender_id'),
-                        content=msg_data['content'],
-                        msg_time=msg_data['msg_time']
-                    )
-                    db.session.add(message)
-                    new_count += 1
-
-            chat.last_fetch_time = datetime.now()
+        lease_name = f'auto_job_{job.id}'
+        owner = acquire_lease(lease_name)
+        if owner is None:
+            result = "上一次执行尚未结束，跳过"
+            _finish_run(AutoJobRun(auto_job_id=job.id, trigger=trigger, started_at=datetime.now()),
+                        'skipped', result)
             db.session.commit()
-            total_new += new_count
-            print(f"  {chat.name}: 新增 {new_count} 条消息")
+            print(f"自动任务跳过: {job.name} - {result}")
+            if trigger == 'manual':
+                raise AutoJobSkipped(result)
+            return result
 
-        except Exception as e:
-            print(f"  {chat.name}: 获取失败 - {e}")
+        try:
+            with keep_lease(lease_name, owner):
+                result, error = _run_auto_job(job, trigger)
+        finally:
+            # 记录结果时出错也立即释放租约，不必等到过期
             db.session.rollback()
+            release_lease(lease_name, owner)
+
+        if error is not None:
+            raise error
+        return result
+
+
+def _run_auto_job(job, trigger):
+    """执行自动任务并记录执行结果，返回 (结果说明, 异常或 None)"""
+    job_id = job.id
+    run = AutoJobRun(auto_job_id=job_id, trigger=trigger, status='running', started_at=datetime.now())
+    db.session.add(run)
+    db.session.commit()
+
+    print(f"开始执行自动任务: {job.name} (类型: {job.job_type})")
+
+    pipeline = Pipeline()
+    error = None
+    try:
+        if job.job_type == 'fetch_messages':
+            result = _execute_fetch_messages(job, pipeline)
+        elif job.job_type == 'ai_summary':
+            result = _execute_ai_summary(job, pipeline)
+        elif job.job_type == 'extract_tasks':
+            result = _execute_extract_tasks(job, pipeline)
+        else:
+            result = f"未知任务类型: {job.job_type}"
+        status = 'success'
+        print(f"自动任务完成: {job.name} - {result}")
+
+    except Exception as e:
+        db.session.rollback()
+        error = e
+        result = str(e)
+        status = 'failed'
+        print(f"自动任务失败: {job.name} - {e}")
+
+    # 更新执行状态
+    job = db.session.get(AutoJob, job_id)
+    job.last_run_time = datetime.now()
+    job.last_run_status = status
+    job.last_run_message = result
+    _finish_run(db.session.get(AutoJobRun, run.id), status, result, pipeline.report())
+    db.session.commit()
+    return result, error
+
+
+def _finish_run(run, status, message, report=None):
+    """结束一条执行记录，并只保留每个任务最近的 AUTO_JOB_RUN_HISTORY 条，调用方负责 commit
+
+    Args:
+        report: Pipeline.report() 的结果，记录处理的聊天数、新增消息数、token 数和各阶段耗时
+    """
+    run.status = status
+    run.message = message
+    run.finished_at = datetime.now()
+    run.duration = (run.finished_at - run.started_at).total_seconds()
+    if report:
+        counts = report['counts']
+        run.chats_processed = counts.get('chats', 0) - counts.get('chats_failed', 0)
+        run.chats_failed = counts.get('chats_failed', 0)
+        run.messages_inserted = counts.get('messages_inserted', 0)
+        run.tokens_used = counts.get('tokens', 0)
+        run.stage_timings = json.dumps(report['timings'])
+        run.chat_timings = json.dumps(report['chats'], ensure_ascii=False)
+    db.session.add(run)
+    db.session.flush()
+
+    keep = current_app.config.get('AUTO_JOB_RUN_HISTORY', 1000)
+    stale = db.session.query(AutoJobRun.id).filter_by(auto_job_id=run.auto_job_id)\
+        .order_by(AutoJobRun.started_at.desc(), AutoJobRun.id.desc()).offset(keep).subquery()
+    AutoJobRun.query.filter(AutoJobRun.id.in_(db.select(stale.c.id)))\
+        .delete(synchronize_session=False)
+
+
+def _execute_fetch_messages(job, pipeline):
+    """执行获取消息任务"""
+    results = pipeline.ingest(_job_chats(job), days=job.days)
+    pipeline.run.log()
+    total_new = sum(r['inserted'] for r in results)
 
     return f"获取完成，共新增 {total_new} 条消息"
 
 
-def _execute_ai_summary(job):
+def _execute_ai_summary(job, pipeline):
     """执行 AI 总结任务"""
-    from ai_service import AIService
-
-    settings = Settings.get_settings()
-    if not settings.ai_api_key:
+    if not pipeline.settings.ai_api_key:
         return "未配置 AI API Key"
 
-    ai_service = AIService(settings)
-
     end_time = datetime.now()
     start_time = end_time - timedelta(days=job.days)
 
-    # 确定要总结的聊天
-    if job.chat_id:
-        chats = [MonitoredChat.query.get(job.chat_id)]
-    else:
-        chats = MonitoredChat.query.filter_by(enabled=True).all()
-
-    summary_count = 0
-    task_count = 0
-
-    for chat in chats:
-        if not chat:
-            continue
-
-        messages = ChatMessage.query.filter(
-            ChatMessage.chat_id == chat.id,
-            ChatMessage.msg_time >= start_time,
-            ChatMessage.msg_time <= end_time
-        ).order_by(ChatMessage.msg_time.asc()).all()
-
-        if not messages:
-            print(f"  {chat.name}: 没有消息，跳过")
-            continue
-
-        try:
-            # 生成总结
-            summary_text = ai_service.generate_summary(messages)
-            summary = AISummary(
-                chat_id=chat.id,
-                summary_type='auto',
-                date_range_start=start_time,
-                date_range_end=end_time,
-                summary_text=summary_text
-            )
-            db.session.add(summary)
-            summary_count += 1
-
-            # 如果启用了任务提取
-            if job.extract_tasks:
-                # 筛选未处理的消息用于提取任务
-                unprocessed_messages = [
-                    m for m in messages 
-                    if not m.ai_processed
-                ]
-                
-                if unprocessed_messages:
-                    tasks_data = ai_service.extract_tasks(unprocessed_messages)
-                    
-                    new_tasks_count = 0
-                    for t in tasks_data:
-                        if not t.get('title'):
-                            continue
-                        title = t['title'].strip()
-
-                        task = Task(
-                            chat_id=chat.id,
-                            title=title,
-                            description=t.get('description'),
-                            priority=t.get('priority', 3),
-                            deadline=datetime.fromisoformat(t['deadline']) if t.get('deadline') else None,
-                            source_message=t.get('source_message'),
-                            ai_analysis=t.get('analysis')
-                        )
-                        db.session.add(task)
-                        new_tasks_count += 1
-                        task_count += 1
-                    
-                    # 标记消息为已处理
-                    now = datetime.now()
-                    for msg in unprocessed_messages:
-                        msg.ai_processed = True
-                        msg.ai_processed_at = now
-                    
-                    print(f"  {chat.name}: 提取 {new_tasks_count} 个新任务")
-
-            db.session.commit()
-            print(f"  {chat.name}: 总结完成")
-
-        except Exception as e:
-            print(f"  {chat.name}: 总结失败 - {e}")
-            db.session.rollback()
+    pipeline.process_chats(_job_chats(job), start_time, end_time, extract=job.extract_tasks)
+    pipeline.run.log()
 
-    return f"生成 {summary_count} 个总结，提取 {task_count} 个任务"
+    counts = pipeline.run.counts
+    return f"生成 {counts['summaries']} 个总结，提取 {counts['tasks']} 个任务"
 
 
-def _execute_extract_tasks(job):
+def _execute_extract_tasks(job, pipeline):
     """执行任务提取"""
-    from ai_service import AIService
-
-    settings = Settings.get_settings()
-    if not settings.ai_api_key:
+    if not pipeline.settings.ai_api_key:
         return "未配置 AI API Key"
 
-    ai_service = AIService(settings)
-
     end_time = datetime.now()
     start_time = end_time - timedelta(days=job.days)
 
-    # 确定要处理的聊天
-    if job.chat_id:
-        chats = [MonitoredChat.query.get(job.chat_id)]
-    else:
-        chats = MonitoredChat.query.filter_by(enabled=True).all()
-
-    task_count = 0
-
-    for chat in chats:
-        if not chat:
-            continue
-
-        messages = ChatMessage.query.filter(
-            ChatMessage.chat_id == chat.id,
-            ChatMessage.msg_time >= start_time,
-            ChatMessage.msg_time <= end_time,
-            db.or_(
-                ChatMessage.ai_processed == False,
-                ChatMessage.ai_processed.is_(None)
-            )
-        ).order_by(ChatMessage.msg_time.asc()).all()
+    pipeline.process_chats(_job_chats(job), start_time, end_time, summarize=False, extract=True)
+    pipeline.run.log()
 
-        if not messages:
-            continue
+    return f"共提取 {pipeline.run.counts['tasks']} 个任务"
 
-        try:
-            tasks_data = ai_service.extract_tasks(messages)
-            
-            chat_new_count = 0
-            for t in tasks_data:
-                if not t.get('title'):
-                    continue
-                title = t['title'].strip()
-
-                task = Task(
-                    chat_id=chat.id,
-                    title=title,
-                    description=t.get('description'),
-                    priority=t.get('priority', 3),
-                    deadline=datetime.fromisoformat(t['deadline']) if t.get('deadline') else None,
-                    source_message=t.get('source_message'),
-                    ai_analysis=t.get('analysis')
-                )
-                db.session.add(task)
-                task_count += 1
-                chat_new_count += 1
-            
-            # 标记消息为已处理
-            now = datetime.now()
-            for msg in messages:
-                msg.ai_processed = True
-                msg.ai_processed_at = now
-
-            db.session.commit()
-            print(f"  {chat.name}: 提取 {chat_new_count} 个新任务 (AI返回 {len(tasks_data)} 个)")
-
-        except Exception as e:
-            print(f"  {chat.name}: 提取失败 - {e}")
-            db.session.rollback()
 
-    return f"共提取 {task_count} 个任务"
+def _job_chats(job):
+    """自动任务要处理的聊天：指定的聊天或所有启用的聊天"""
+    if job.chat_id:
+        return [MonitoredChat.query.get(job.chat_id)]
+    return MonitoredChat.query.filter_by(enabled=True).all()
 
 
 # ==================== Legacy Scheduler Helpers ====================
@@ -319,51 +248,20 @@ def fetch_all_messages(app):
     """
     获取所有消息任务 (用于 legacy scheduler 接口)
     """
-    with app.app_context():
-        settings = Settings.get_settings()
-        chat_service = ChatService(settings)
+    with app.app_context(), job_lease('fetch_messages') as acquired:
+        if not acquired:
+            print("fetch_all_messages 正在其他进程中执行，跳过")
+            return
 
+        settings = Settings.get_settings()
         chats = MonitoredChat.query.filter_by(enabled=True).all()
-        total_new = 0
-        
+
         print(f"开始执行 fetch_all_messages, 聊天数: {len(chats)}")
 
-        for chat in chats:
-            try:
-                messages = chat_service.fetch_messages(
-                    chat_type=chat.chat_type,
-                    peer_id=chat.peer_id,
-                    peer_uid=chat.peer_uid,
-                    days=settings.fetch_days
-                )
-
-                new_count = 0
-                for msg_data in messages:
-                    existing = ChatMessage.query.filter_by(
-                        chat_id=chat.id,
-                        msg_id=msg_data['msg_id']
-                    ).first()
-
-                    if not existing:
-                        message = ChatMessage(
-                            chat_id=chat.id,
-                            msg_id=msg_data['msg_id'],
-                            sender_name=msg_data['sender_name'],
-                            sender_id=msg_data.get('sender_id'),
-                            content=msg_data['content'],
-                            msg_time=msg_data['msg_time']
-                        )
-                        db.session.add(message)
-                        new_count += 1
-
-                chat.last_fetch_time = datetime.now()
-                db.session.commit()
-                total_new += new_count
-                print(f"  {chat.name}: 新增 {new_count} 条消息")
-
-            except Exception as e:
-                print(f"  {chat.name}: 获取失败 - {e}")
-                db.session.rollback()
+        pipeline = Pipeline(settings)
+        results = pipeline.ingest(chats, days=settings.fetch_days)
+        pipeline.run.log()
+        total_new = sum(r['inserted'] for r in results)
 
         return f"获取完成，共新增 {total_new} 条消息"
 
@@ -372,51 +270,27 @@ def generate_daily_summary(app):
     """
     生成每日总结 (用于 legacy scheduler 接口)
     """
-    with app.app_context():
-        from ai_service import AIService
+    with app.app_context(), job_lease('daily_summary') as acquired:
+        if not acquired:
+            print("generate_daily_summary 正在其他进程中执行，跳过")
+            return
+
         settings = Settings.get_settings()
-        
+
         if not settings.ai_api_key:
             print("未配置 AI API Key，跳过自动总结")
             return
 
-        ai_service = AIService(settings)
-        
         # 总结过去 24 小时
         end_time = datetime.now()
         start_time = end_time - timedelta(days=1)
-        
+
         chats = MonitoredChat.query.filter_by(enabled=True).all()
-        summary_count = 0
-        
+
         print(f"开始执行 generate_daily_summary, 聊天数: {len(chats)}")
 
-        for chat in chats:
-            messages = ChatMessage.query.filter(
-                ChatMessage.chat_id == chat.id,
-                ChatMessage.msg_time >= start_time,
-                ChatMessage.msg_time <= end_time
-            ).order_by(ChatMessage.msg_time.asc()).all()
-
-            if not messages:
-                continue
-
-            try:
-                summary_text = ai_service.generate_summary(messages)
-                summary = AISummary(
-                    chat_id=chat.id,
-                    summary_type='auto',
-                    date_range_start=start_time,
-                    date_range_end=end_time,
-                    summary_text=summary_text
-                )
-                db.session.add(summary)
-                db.session.commit()
-                summary_count += 1
-                print(f"  {chat.name}: 总结完成")
-
-            except Exception as e:
-                print(f"  {chat.name}: 总结失败 - {e}")
-                db.session.rollback()
-                
-        return f"生成 {summary_count} 个总结"
+        pipeline = Pipeline(settings)
+        pipeline.process_chats(chats, start_time, end_time)
+        pipeline.run.log()
+
+        return f"生成 {pipeline.run.counts['summaries']} 个总结"
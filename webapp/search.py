@@ -0,0 +1,166 @@
+"""
+消息全文搜索 - 基于 SQLite FTS5 trigram 索引
+
+chat_messages_fts 是 chat_messages 的外部内容索引（content + sender_name），
+由触发器在插入、更新和删除时同步，建表和重建在 migrations.py 中完成。
+trigram 分词按三个字符切分，中文无需分词即可做子串匹配，
+因此少于 3 个字符的关键词无法走索引，回退到 LIKE 查询。
+"""
+import html
+
+from sqlalchemy import text
+
+from models import db, ChatMessage
+
+FTS_TABLE = 'chat_messages_fts'
+
+# trigram 分词能匹配的最短关键词长度
+MIN_TERM_LENGTH = 3
+
+# 高亮标记先用控制字符占位，转义 HTML 后再替换为 <mark>
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+
+def has_search_index():
+    """当前数据库是否有全文索引"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    return db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE}
+    ).first() is not None
+
+
+def can_use_index(keyword):
+    """关键词是否可以用全文索引匹配"""
+    terms = keyword.split()
+    return bool(terms) and all(len(t) >= MIN_TERM_LENGTH for t in terms) and has_search_index()
+
+
+def match_expression(keyword, phrase=False):
+    """构造 FTS5 MATCH 表达式
+
+    Args:
+        keyword: 搜索关键词
+        phrase: 为 True 时整个关键词作为一个短语（等价于子串匹配），
+            否则按空白拆分，所有词都要出现
+    """
+    terms = [keyword] if phrase else keyword.split()
+    return ' AND '.join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def matching_ids(keyword):
+    """返回匹配关键词的消息 id 子查询，可用于 ChatMessage.id.in_()"""
+    return text(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_query'
+    ).bindparams(fts_query=match_expression(keyword, phrase=True))
+
+
+def search_messages(keyword, chat_id=None, page=1, per_page=20):
+    """全文搜索消息，按相关度排序
+
+    Args:
+        keyword: 搜索关键词，多个词用空格分隔
+        chat_id: 只搜索指定聊天
+        page: 页码
+        per_page: 每页数量
+
+    Returns:
+        (结果列表, 总数)，每项包含消息字段以及 rank、snippet、highlight
+    """
+    if not can_use_index(keyword):
+        return _search_like(keyword, chat_id, page, per_page)
+
+    params = {
+        'fts_query': match_expression(keyword),
+        'limit': per_page,
+        'offset': (page - 1) * per_page,
+        'start': _MARK_START,
+        'end': _MARK_END,
+    }
+    chat_filter = ''
+    if chat_id:
+        # 一元 + 阻止规划器改用 chat_id 索引逐行匹配，始终从全文索引开始
+        chat_filter = 'AND +m.chat_id = :chat_id'
+        params['chat_id'] = chat_id
+
+    # bm25 中内容列权重高于发送者列
+    rows = db.session.execute(text(f'''
+        SELECT m.id, m.chat_id, m.sender_name, m.content, m.msg_time,
+               bm25({FTS_TABLE}, 10.0, 1.0) AS rank,
+               snippet({FTS_TABLE}, 0, :start, :end, '…', 16) AS snippet,
+               highlight({FTS_TABLE}, 0, :start, :end) AS highlight
+        FROM {FTS_TABLE}
+        JOIN chat_messages m ON m.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :fts_query {chat_filter}
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    ''').columns(msg_time=db.DateTime), params).mappings().all()
+
+    total = db.session.execute(text(f'''
+        SELECT COUNT(*) FROM {FTS_TABLE}
+        JOIN chat_messages m ON m.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :fts_query {chat_filter}
+    '''), params).scalar()
+
+    results = [{
+        'id': row['id'],
+        'chat_id': row['chat_id'],
+        'sender_name': row['sender_name'],
+        'content': row['content'],
+        'msg_time': row['msg_time'],
+        'rank': row['rank'],
+        'snippet': _render_marks(row['snippet']),
+        'highlight': _render_marks(row['highlight']),
+    } for row in rows]
+
+    return results, total
+
+
+def _search_like(keyword, chat_id, page, per_page):
+    """无法使用全文索引时的 LIKE 搜索，按时间倒序"""
+    terms = keyword.split()
+    query = ChatMessage.query
+    for term in terms:
+        query = query.filter(
+            db.or_(
+                ChatMessage.content.contains(term),
+                ChatMessage.sender_name.contains(term)
+            )
+        )
+    if chat_id:
+        query = query.filter_by(chat_id=chat_id)
+
+    pagination = query.order_by(ChatMessage.msg_time.desc())\
+        .paginate(page=page, per_page=per_page, error_out=False)
+
+    results = []
+    for m in pagination.items:
+        highlight = _mark_terms(m.content or '', terms)
+        results.append({
+            'id': m.id,
+            'chat_id': m.chat_id,
+            'sender_name': m.sender_name,
+            'content': m.content,
+            'msg_time': m.msg_time,
+            'rank': None,
+            'snippet': highlight,
+            'highlight': highlight,
+        })
+
+    return results, pagination.total
+
+
+def _mark_terms(content, terms):
+    """在内容中标记关键词并转义 HTML"""
+    for term in terms:
+        content = content.replace(term, _MARK_START + term + _MARK_END)
+    return _render_marks(content)
+
+
+def _render_marks(value):
+    """转义 HTML，并把占位标记替换为 <mark>"""
+    if value is None:
+        return None
+    return html.escape(value).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+import requests
+
+from ai_client import AIAPIError, AIClientConfig, AIHttpClient, CircuitOpenError
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, json_data=None, text='', lines=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._json = json_data
+        self.text = text
+        self._lines = lines or []
+        self.closed = False
+
+    def json(self):
+        if self._json is None:
+            raise ValueError('not json')
+        return self._json
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._lines)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """按顺序返回预设的响应，元素为异常时抛出"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        item = self.responses.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+def make_client(*responses, **config):
+    config = dict(dict(max_retries=0, backoff_factor=0, breaker_threshold=1, breaker_reset=0.05), **config)
+    client = AIHttpClient(AIClientConfig(**config))
+    client.session = FakeSession(*responses)
+    return client
+
+
+def open_breaker(client):
+    with pytest.raises(AIAPIError):
+        client.post_json('http://ai', {}, {})
+    with pytest.raises(CircuitOpenError):
+        client.post_json('http://ai', {}, {})
+    time.sleep(0.06)
+
+
+def ok_response():
+    return FakeResponse(json_data={'choices': [{'message': {'content': 'ok'}}]})
+
+
+def test_retry_then_success():
+    client = make_client(FakeResponse(503), requests.ConnectionError('reset'), ok_response(), max_retries=2)
+    assert client.post_json('http://ai', {}, {})['choices'][0]['message']['content'] == 'ok'
+    assert client.session.calls == 3
+
+
+@pytest.mark.parametrize('trial', [
+    FakeResponse(400, text='bad request'),
+    FakeResponse(200, text='<html>'),
+    requests.TooManyRedirects('loop'),
+])
+def test_half_open_trial_is_always_settled(trial):
+    client = make_client(FakeResponse(500), trial, ok_response())
+    open_breaker(client)
+
+    with pytest.raises(AIAPIError):
+        client.post_json('http://ai', {}, {})
+    time.sleep(0.06)
+    # 试探请求有了结果，熔断器不会一直拒绝请求
+    assert client.post_json('http://ai', {}, {})['choices'][0]['message']['content'] == 'ok'
+
+
+def test_client_error_closes_breaker():
+    client = make_client(FakeResponse(500), FakeResponse(401, text='invalid key'), ok_response())
+    open_breaker(client)
+
+    with pytest.raises(AIAPIError):
+        client.post_json('http://ai', {}, {})
+    # 4xx 说明服务商可达，立即恢复
+    assert client.post_json('http://ai', {}, {})
+
+
+def test_stream_closed_early_settles_trial():
+    lines = ['data: {"choices": [{"delta": {"content": "a"}}]}',
+             'data: {"choices": [{"delta": {"content": "b"}}]}']
+    stream = FakeResponse(lines=lines)
+    client = make_client(FakeResponse(500), stream, ok_response())
+    open_breaker(client)
+
+    chunks = client.post_stream('http://ai', {}, {})
+    assert next(chunks) == 'a'
+    chunks.close()
+    assert stream.closed
+    assert client.post_json('http://ai', {}, {})
+
+
+def test_retries_take_request_tokens():
+    client = make_client(FakeResponse(429), FakeResponse(503), ok_response(),
+                         max_retries=2, requests_per_minute=60, tokens_per_minute=600)
+    client.post_json('http://ai', {}, {}, estimated_tokens=100)
+    # 三次发送各占一次请求配额，token 只扣一次
+    assert client.request_bucket.tokens == pytest.approx(57, abs=0.5)
+    assert client.token_bucket.tokens == pytest.approx(500, abs=1)
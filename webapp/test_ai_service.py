@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from ai_service import AIService
+
+
+class FakeClient:
+    """按顺序返回预设的回复内容"""
+
+    def __init__(self, *contents):
+        self.contents = list(contents)
+        self.calls = 0
+
+    def post_json(self, url, headers, payload, estimated_tokens=0):
+        self.calls += 1
+        return {'choices': [{'message': {'content': self.contents.pop(0)}}]}
+
+
+@pytest.fixture
+def service(tmp_path):
+    app = Flask(__name__)
+    app.config['AI_CACHE_PATH'] = str(tmp_path / 'ai_cache.db')
+    settings = SimpleNamespace(ai_endpoint='http://ai.test/v1/chat/completions',
+                               ai_api_key='k', ai_model='test-model')
+    with app.app_context():
+        yield AIService(settings)
+
+
+def test_invalid_extraction_reply_is_not_cached(service):
+    service.client = FakeClient('not json', '[{"title": "交报告"}]')
+
+    with pytest.raises(ValueError):
+        service._extract_chunk('[2024-01-15 10:00] 张三: 明天交报告')
+    # 服务商恢复后重试会重新请求，而不是读出缓存的无效回复
+    assert service._extract_chunk('[2024-01-15 10:00] 张三: 明天交报告') == [{'title': '交报告'}]
+    assert service.client.calls == 2
+
+    # 合法的回复会被缓存
+    assert service._extract_chunk('[2024-01-15 10:00] 张三: 明天交报告') == [{'title': '交报告'}]
+    assert service.client.calls == 2
+
+
+def test_invalid_cached_reply_is_replaced(service):
+    messages = [{'role': 'user', 'content': 'hi'}]
+    key = service.cache.make_key(service.model, 0.3, messages)
+    service.cache.set(key, 'not json')
+    service.client = FakeClient('[]')
+
+    assert service._call_api(messages, temperature=0.3, parse=service._parse_tasks) == []
+    assert service.client.calls == 1
+    assert service.cache.get(key) == '[]'
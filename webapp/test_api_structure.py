@@ -9,13 +9,20 @@ def test_routes():
     # Check for specific API routes
     api_routes = [
         '/api/settings',
+        '/api/settings/ai-cache',
         '/api/available-chats',
         '/api/messages/<int:chat_id>',
+        '/api/messages/search',
         '/api/summaries',
+        '/api/generate-summary/stream',
         '/api/tasks',
         '/api/schedule/events',
         '/api/auto-jobs',
-        '/api/stats'
+        '/api/auto-jobs/<int:job_id>/runs',
+        '/api/auto-jobs/trends',
+        '/api/stats',
+        '/api/jobs',
+        '/metrics'
     ]
     
     missing = []
@@ -0,0 +1,77 @@
+import threading
+from datetime import datetime, timedelta
+
+import ingestion
+import rollups
+from conftest import make_messages
+from ingestion import ingest_messages
+from models import db, ChatMessage, ChatDailyStats, MonitoredChat
+
+
+def test_ingest_skips_existing_messages(chat):
+    messages = make_messages(100)
+    assert ingest_messages(chat, messages[:60]) == (60, 0)
+    db.session.commit()
+
+    # 重叠的部分和同一批次内的重复消息都只写一次
+    assert ingest_messages(chat, messages + messages[-5:]) == (40, 65)
+    db.session.commit()
+
+    assert chat.messages.count() == 100
+    assert ChatDailyStats.query.filter_by(chat_id=chat.id).with_entities(
+        db.func.sum(ChatDailyStats.message_count)).scalar() == 100
+    assert chat.last_msg_time == messages[-1]['msg_time']
+
+
+def test_overlapping_ingest_counts_only_inserted_rows(app, chat, monkeypatch):
+    messages = make_messages(100)
+    insert_rows = ingestion._insert_rows
+    results = []
+
+    def other_worker():
+        # 另一个进程（例如手动获取任务）在预查询之后、写入之前写入了相同的消息
+        with app.app_context():
+            other_chat = db.session.get(MonitoredChat, chat.id)
+            results.append(ingest_messages(other_chat, messages))
+            db.session.commit()
+
+    def insert_after_other(rows):
+        monkeypatch.setattr(ingestion, '_insert_rows', insert_rows)
+        worker = threading.Thread(target=other_worker)
+        worker.start()
+        worker.join()
+        return insert_rows(rows)
+
+    monkeypatch.setattr(ingestion, '_insert_rows', insert_after_other)
+    results.append(ingest_messages(chat, messages))
+    db.session.commit()
+
+    assert results == [(100, 0), (0, 100)]
+    assert ChatMessage.query.filter_by(chat_id=chat.id).count() == 100
+    assert db.session.query(db.func.sum(ChatDailyStats.message_count)).filter(
+        ChatDailyStats.chat_id == chat.id).scalar() == 100
+
+
+def test_ingest_in_batches_matches_rebuilt_rollup(chat):
+    # 跨两天、多个批次写入
+    start = datetime.now().replace(hour=23, minute=50, second=0, microsecond=0) - timedelta(days=1)
+    messages = make_messages(1500, start=start)
+    assert ingest_messages(chat, messages[:700], batch_size=128) == (700, 0)
+    assert ingest_messages(chat, messages, batch_size=128) == (800, 700)
+    rollups.mark_processed([m.id for m in ChatMessage.query.filter_by(chat_id=chat.id).limit(300)])
+    db.session.commit()
+
+    def snapshot():
+        return sorted(
+            (s.day, s.message_count, s.sender_count, s.processed_count, s.first_msg_time, s.last_msg_time)
+            for s in ChatDailyStats.query.filter_by(chat_id=chat.id)
+        )
+
+    incremental = snapshot()
+    assert len(incremental) == 2
+    assert sum(row[1] for row in incremental) == 1500
+    assert sum(row[3] for row in incremental) == 300
+
+    rollups.rebuild()
+    db.session.commit()
+    assert snapshot() == incremental
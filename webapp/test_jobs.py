@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+import api  # noqa: F401  注册 run_auto_job 等任务类型
+
+from jobs import JobQueue, JobCancelled, fail_orphaned_jobs, job_handler
+from leases import acquire_lease
+from models import db, AutoJob, BackgroundJob, MonitoredChat, Settings
+from pipeline import Pipeline
+
+
+@job_handler('test_wait')
+def _wait_until_cancelled(ctx, seconds=5):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        ctx.check_cancelled()
+        time.sleep(0.01)
+    return {'done': True}
+
+
+def wait_finished(job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        job = db.session.get(BackgroundJob, job_id)
+        if job.status in ('success', 'failed', 'cancelled'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError('任务未结束')
+
+
+def test_cancel_running_job(app):
+    queue = JobQueue(app, max_workers=1)
+    try:
+        job = queue.submit('test_wait')
+        time.sleep(0.1)
+        queue.cancel(job.id)
+        assert wait_finished(job.id).status == 'cancelled'
+    finally:
+        queue.shutdown(wait=True)
+
+
+def test_skipped_manual_auto_job_fails(app):
+    job = AutoJob(name='获取', job_type='fetch_messages', schedule_type='interval', interval_minutes=60)
+    db.session.add(job)
+    db.session.commit()
+    acquire_lease(f'auto_job_{job.id}', ttl=60)
+
+    queue = JobQueue(app, max_workers=1)
+    try:
+        background_job = queue.submit('run_auto_job', {'auto_job_id': job.id})
+        finished = wait_finished(background_job.id)
+    finally:
+        queue.shutdown(wait=True)
+    assert finished.status == 'failed'
+    assert finished.error == '上一次执行尚未结束，跳过'
+
+
+def test_only_orphaned_jobs_are_failed(app):
+    live = 'job_queue:live'
+    acquire_lease(live, ttl=60)
+    jobs = {
+        'live': BackgroundJob(job_type='test_wait', status='running', worker=live),
+        'dead': BackgroundJob(job_type='test_wait', status='running', worker='job_queue:dead'),
+        'legacy': BackgroundJob(job_type='test_wait', status='pending'),
+        'done': BackgroundJob(job_type='test_wait', status='success', worker='job_queue:dead'),
+    }
+    db.session.add_all(jobs.values())
+    db.session.commit()
+
+    assert fail_orphaned_jobs() == 2
+    db.session.expire_all()
+    assert {name: job.status for name, job in jobs.items()} == {
+        'live': 'running', 'dead': 'failed', 'legacy': 'failed', 'done': 'success'
+    }
+
+
+class SlowChatService:
+    """每个聊天的获取耗时 0.2 秒"""
+
+    def __init__(self):
+        self.started = []
+        self._lock = threading.Lock()
+
+    def get_client(self):
+        pass
+
+    def iter_raw_messages(self, chat_type, peer_id, peer_uid, days, since):
+        with self._lock:
+            self.started.append(peer_id)
+        time.sleep(0.2)
+        return iter(())
+
+    def normalize_message(self, msg):
+        return msg
+
+
+def test_cancel_stops_remaining_fetches(app):
+    chats = [MonitoredChat(chat_type=2, peer_id=str(i), peer_uid=str(i), name=f'群{i}') for i in range(6)]
+    db.session.add_all(chats)
+    db.session.commit()
+    chat_service = SlowChatService()
+
+    def on_progress(done, total, result):
+        raise JobCancelled()
+
+    start = time.monotonic()
+    with pytest.raises(JobCancelled):
+        Pipeline(Settings.get_settings()).ingest(chats, days=1, chat_service=chat_service,
+                                                 max_workers=2, on_progress=on_progress)
+    assert time.monotonic() - start < 0.4
+    time.sleep(0.3)
+    # 取消时已在进行中的获取（每个线程最多一个）之外，其余聊天不再获取
+    assert len(chat_service.started) <= 4
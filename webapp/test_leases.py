@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+import scheduler
+from leases import acquire_lease, job_lease, keep_lease, release_lease
+from models import db, AutoJob, AutoJobRun, JobLease
+
+
+def test_lease_is_exclusive_until_released(app):
+    owner = acquire_lease('job', ttl=60)
+    assert owner
+    assert acquire_lease('job', ttl=60) is None
+    release_lease('job', owner)
+    assert acquire_lease('job', ttl=60)
+
+
+def test_expired_lease_is_taken_over(app):
+    assert acquire_lease('job', ttl=0)
+    time.sleep(0.01)
+    assert acquire_lease('job', ttl=60)
+
+
+def test_lease_is_renewed_while_running(app):
+    owner = acquire_lease('job', ttl=1.5)
+    with keep_lease('job', owner, ttl=1.5):
+        time.sleep(2)
+        # 超过最初的有效期仍未被接管
+        assert acquire_lease('job', ttl=60) is None
+    release_lease('job', owner)
+
+
+def test_job_lease_released_on_error(app):
+    with pytest.raises(RuntimeError):
+        with job_lease('job', ttl=60) as acquired:
+            assert acquired
+            raise RuntimeError('boom')
+    assert JobLease.query.count() == 0
+
+
+def test_auto_job_releases_lease_when_recording_fails(app, monkeypatch):
+    job = AutoJob(name='获取', job_type='unknown', schedule_type='interval', interval_minutes=60)
+    db.session.add(job)
+    db.session.commit()
+
+    def broken_finish(*args, **kwargs):
+        raise RuntimeError('db error')
+
+    monkeypatch.setattr(scheduler, '_finish_run', broken_finish)
+    with pytest.raises(RuntimeError):
+        scheduler.execute_auto_job(app, job.id)
+    assert JobLease.query.count() == 0
+
+    monkeypatch.undo()
+    assert scheduler.execute_auto_job(app, job.id) == '未知任务类型: unknown'
+    assert AutoJobRun.query.filter_by(status='success').count() == 1
+
+
+def test_manual_run_fails_when_job_is_running_elsewhere(app):
+    job = AutoJob(name='获取', job_type='unknown', schedule_type='interval', interval_minutes=60)
+    db.session.add(job)
+    db.session.commit()
+    acquire_lease(f'auto_job_{job.id}', ttl=60)
+
+    assert scheduler.execute_auto_job(app, job.id) == '上一次执行尚未结束，跳过'
+    with pytest.raises(scheduler.AutoJobSkipped):
+        scheduler.execute_auto_job(app, job.id, trigger='manual')
+    assert AutoJobRun.query.filter_by(status='skipped').count() == 2
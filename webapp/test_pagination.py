@@ -0,0 +1,47 @@
+import pytest
+
+import pagination
+from conftest import make_messages
+from ingestion import ingest_messages
+from models import db, ChatMessage
+from pagination import keyset_paginate, InvalidCursor
+
+COLUMNS = (ChatMessage.msg_time, ChatMessage.id)
+
+
+@pytest.fixture
+def messages(chat):
+    ingest_messages(chat, make_messages(25))
+    db.session.commit()
+    return ChatMessage.query.filter_by(chat_id=chat.id)
+
+
+def test_keyset_pages_cover_all_rows(messages):
+    seen, cursor = [], None
+    while True:
+        items, cursor = keyset_paginate(messages, COLUMNS, 10, cursor)
+        seen.extend(m.msg_id for m in items)
+        if cursor is None:
+            break
+    assert len(seen) == 25 and len(set(seen)) == 25
+    assert seen[0] == 'm24'
+
+
+@pytest.mark.parametrize('per_page, expected', [(0, 1), (-1, 1), (10 ** 6, 25)])
+def test_per_page_is_clamped(messages, monkeypatch, per_page, expected):
+    monkeypatch.setattr(pagination, 'MAX_PER_PAGE', 25)
+    items, _ = keyset_paginate(messages, COLUMNS, per_page)
+    assert len(items) == expected
+
+
+def test_invalid_cursor(messages):
+    with pytest.raises(InvalidCursor):
+        keyset_paginate(messages, COLUMNS, 10, 'not-a-cursor')
+
+
+def test_messages_endpoint_rejects_non_positive_per_page(app, chat, messages):
+    from api import api_bp
+    app.register_blueprint(api_bp, url_prefix='/api')
+    response = app.test_client().get(f'/api/messages/{chat.id}?cursor=&per_page=0')
+    assert response.status_code == 200
+    assert len(response.json['messages']) == 1
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+from conftest import make_messages
+from ingestion import ingest_messages
+from models import db, ChatMessage, ChatDailyStats, MonitoredChat, Settings, Task
+from pipeline import Pipeline
+
+
+class FakeAIService:
+    """不调用 AI，每段消息提取一个任务"""
+
+    def __init__(self):
+        self.client = SimpleNamespace(config=SimpleNamespace(max_concurrency=4))
+        self.tokens_used = 0
+
+    def generate_summary(self, messages):
+        return f'{len(messages)} 条消息'
+
+    def extract_tasks_chunked(self, messages):
+        return [{'title': f'任务 {messages[0].chat_id}'}], messages
+
+
+def test_process_chats_marks_processed_in_bulk(app):
+    chats = [MonitoredChat(chat_type=2, peer_id=str(i), peer_uid=str(i), name=f'群{i}') for i in range(3)]
+    db.session.add_all(chats)
+    db.session.commit()
+    for chat in chats:
+        ingest_messages(chat, make_messages(200))
+    db.session.commit()
+
+    pipeline = Pipeline(Settings.get_settings())
+    pipeline._ai_service = FakeAIService()
+    end_time = datetime.now()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        pipeline.process_chats(chats, end_time - timedelta(days=1), end_time, summarize=False, extract=True)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    # 每个聊天提交后不会逐条重新加载其他聊天的消息
+    assert len(statements) < 40
+    assert ChatMessage.query.filter(ChatMessage.ai_processed == True).count() == 600
+    assert db.session.query(db.func.sum(ChatDailyStats.processed_count)).scalar() == 600
+    assert Task.query.count() == 3
+    assert pipeline.run.counts['messages_processed'] == 600